@@ -6,6 +6,8 @@ import TaskCompletionStatus from "./TaskCompletionStatus";
 function TaskManager(){
     const [categories, setCategories]=useState([]);
     const [tasks, setTasks]=useState([]);
+    const [nextCursor, setNextCursor]=useState(null);
+    const [isLoadingMore, setIsLoadingMore]=useState(false);
     const [selectedCategoryId, setSelectedCategoryId]=useState(null);
     const [isSidebarOpen, setIsSidebarOpen]=useState(false);
 
@@ -38,9 +40,14 @@ function TaskManager(){
         }
     }
 
-    async function fetchTasks(){
+    async function fetchTasks(cursor=null){
+        // one page per request: the first on load, the next ones when "Load more" is clicked
+        setIsLoadingMore(true);
         try{
-            const response=await fetch("https://taskhub-server.onrender.com/tasks", {
+            const url=cursor
+                ? `https://taskhub-server.onrender.com/tasks?cursor=${encodeURIComponent(cursor)}`
+                : "https://taskhub-server.onrender.com/tasks";
+            const response=await fetch(url, {
                 method:"GET",
                 credentials:"include",
                 headers:{
@@ -49,16 +56,20 @@ function TaskManager(){
             });
             if(response.ok){
                 const data=await response.json();
-                setTasks(data);
+                setTasks(previous=>cursor ? [...previous, ...data.tasks] : data.tasks);
+                setNextCursor(data.next_cursor);
             } else {
                 if(response.status===401){
                     console.log("User needs to login again");
                 }
+                // the tasks already shown stay, "Load more" can be retried (e.g. after a 429)
                 const errorData=await response.json();
                 console.error(errorData);
             }
         } catch(error){
             console.error(error);
+        } finally {
+            setIsLoadingMore(false);
         }
     }
 
@@ -122,6 +133,17 @@ function TaskManager(){
                         <AddTask categories={categories} tasks={tasks} setTasks={setTasks}/>
                         <TaskCompletionStatus tasks={tasks} selectedCategoryId={selectedCategoryId}/>
                         <Tasks tasks={filteredTasks} setTasks={setTasks} categories={categories}/>
+                        {nextCursor && (
+                            <div className="flex justify-center">
+                                <button
+                                    onClick={() => fetchTasks(nextCursor)}
+                                    disabled={isLoadingMore}
+                                    className="px-4 py-2 text-sm bg-white border border-gray-200 rounded-lg hover:bg-gray-100 disabled:opacity-50"
+                                    >
+                                        {isLoadingMore ? "Loading..." : "Load more"}
+                                </button>
+                            </div>
+                        )}
                     </div>
             </div>
         </div>
@@ -1,23 +1,57 @@
 from models import db
-from models.user import User
+from models.user import User, user_serializer
 from models.task import Task
-from models.category import Category
-from flask import Flask, request, session, jsonify, make_response
+from models.category import Category, DEFAULT_CATEGORIES
+from models.recurrence import Recurrence
+from models.passwords import password_hasher
+from models.identity import identity_cache, load_principal
+from models.versions import get_data_version
+from models.response_cache import response_cache
+from models.reminders import reminder_scheduler
+from models.sync import get_changes
+from models.tombstone import Tombstone
+from models.search import include_object
+from models.engine import resolve_profile, engine_options, tune_engine
+from flask import Flask, request, session, make_response
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_restful import Api, Resource
+from json_provider import FastJSONProvider
+from compression import Compress, etag_variants
+from instrumentation import Instrumentation, sample, query_budget
+from ratelimit import RateLimits
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import functools
+import logging
+import signal
+import click
+import hashlib
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 #load environment variables
 load_dotenv()
 
 app=Flask(__name__)
+app.json=FastJSONProvider(app)  # compact output, orjson when installed
 
 app.config['SQLALCHEMY_DATABASE_URI']=os.getenv('database_url')  #store the database url in .env
 # app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///todo.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS']=False
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+# engine tuning profile: auto, sqlite, postgres or default (see models/engine.py)
+app.config['DATABASE_PROFILE']=os.getenv('DATABASE_PROFILE', 'auto')
+app.config['DATABASE_PROFILE_OVERRIDES']={
+    key:int(os.getenv(env)) for key, env in (
+        ('pool_size', 'DATABASE_POOL_SIZE'),
+        ('max_overflow', 'DATABASE_MAX_OVERFLOW'),
+        ('statement_timeout', 'DATABASE_STATEMENT_TIMEOUT'),  # ms
+        ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),  # ms
+    ) if os.getenv(env)
+}
+# responses above this many bytes are sent gzip/brotli encoded when the client accepts it
+app.config['COMPRESS_MIN_SIZE']=int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+# comma separated list of categories created for every new account
+app.config['DEFAULT_CATEGORIES']=[name.strip() for name in os.getenv('DEFAULT_CATEGORIES', ','.join(DEFAULT_CATEGORIES)).split(',') if name.strip()]
 
 # Local development configuration
 app.config['SESSION_COOKIE_DOMAIN'] = 'taskhub-server.onrender.com'   # Make sure this matches your API domain
@@ -25,16 +59,67 @@ app.config['SESSION_COOKIE_SECURE'] = True  # Set to True on production
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # CSRF protection
 app.config['SESSION_COOKIE_HTTPONLY'] = True  # Prevent JavaScript access
 
+# password hashing runs in a process pool so bursts of logins do not block other requests
+app.config['PASSWORD_HASH_METHOD']=os.getenv('PASSWORD_HASH_METHOD', 'scrypt')  # any werkzeug method, e.g. pbkdf2:sha256:600000
+app.config['PASSWORD_HASH_WORKERS']=int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline in the request worker
+app.config['PASSWORD_HASH_MAX_PENDING']=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8))  # beyond this requests get a 503
+
+# rate limits per route class, "<burst>/second;<sustained>/minute"; auth is counted per client address, read/write per user
+app.config['RATELIMIT_ENABLED']=os.getenv('RATELIMIT_ENABLED', 'true').lower()=='true'
+app.config['RATELIMIT_AUTH']=os.getenv('RATELIMIT_AUTH', '5/second;30/minute')  # /login, signup and password changes
+app.config['RATELIMIT_WRITE']=os.getenv('RATELIMIT_WRITE', '20/second;300/minute')
+app.config['RATELIMIT_READ']=os.getenv('RATELIMIT_READ', '50/second;1200/minute')
+app.config['RATELIMIT_STORAGE_URI']=os.getenv('RATELIMIT_STORAGE_URI', 'memory://')  # per process; redis://host:6379 shares counters between workers
+# reverse proxies in front of the app whose X-Forwarded-For is trusted, so limits see the real client address; 1 on Render, see render.yaml
+app.config['TRUSTED_PROXIES']=int(os.getenv('TRUSTED_PROXIES', 0))
+
+# authenticated requests resolve the user from this cache instead of the database
+app.config['IDENTITY_CACHE_TTL']=int(os.getenv('IDENTITY_CACHE_TTL', 60))  # seconds, 0 disables the cache
+app.config['IDENTITY_CACHE_SIZE']=int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+
+# serialized list/detail responses, per user, dropped on every change to the user's tasks or categories
+app.config['RESPONSE_CACHE_TTL']=int(os.getenv('RESPONSE_CACHE_TTL', 300))  # seconds, 0 disables the cache
+app.config['RESPONSE_CACHE_SIZE']=int(os.getenv('RESPONSE_CACHE_SIZE', 5000))  # entries
+
+# reminder hooks fire as tasks come due, from `flask run-reminders`; run exactly one, every one running fires every reminder
+app.config['REMINDER_HORIZON']=int(os.getenv('REMINDER_HORIZON', 3600))  # seconds of upcoming deadlines held in memory
+app.config['REMINDER_BATCH_SIZE']=int(os.getenv('REMINDER_BATCH_SIZE', 5000))  # rows per query when loading the window
+app.config['REMINDER_POLL_INTERVAL']=int(os.getenv('REMINDER_POLL_INTERVAL', 10))  # seconds between checks for changed tasks
+
+# deletions are kept this long for /sync; older cursors get a full reset
+app.config['SYNC_TOMBSTONE_DAYS']=int(os.getenv('SYNC_TOMBSTONE_DAYS', 30))
+
+# per-request timings as a Server-Timing header, aggregated per route on /metrics
+app.config['SERVER_TIMING']=os.getenv('SERVER_TIMING', 'true').lower()=='true'
+app.config['METRICS_TOKEN']=os.getenv('METRICS_TOKEN')  # when set, /metrics requires "Authorization: Bearer <token>"
+# off in production; warn logs, raise fails the request when a handler exceeds its @query_budget or repeats a statement (N+1)
+app.config['QUERY_BUDGET_MODE']=os.getenv('QUERY_BUDGET_MODE', 'off')
+
 app.secret_key=os.getenv('SECRET_KEY')
+engine_profile=resolve_profile(app.config['SQLALCHEMY_DATABASE_URI'], app.config['DATABASE_PROFILE'], app.config['DATABASE_PROFILE_OVERRIDES'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS']=engine_options(engine_profile)
 db.init_app(app)
-migrate=Migrate(app, db)
-
+with app.app_context():
+    tune_engine(db.engine, engine_profile)
+password_hasher.init_app(app)
+identity_cache.init_app(app)
+response_cache.init_app(app)
+reminder_scheduler.init_app(app)
+rate_limits=RateLimits(app)
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app=ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+migrate=Migrate(app, db, include_object=include_object)
+Compress(app)
+instrumentation=Instrumentation(app, db)
+
+
+app.config['CORS_ORIGINS']=["https://taskhub-gwdw.onrender.com"]  #Should match your frontend URL
 
 CORS(
     app,
     resources={
         r"/*": {
-            "origins": ["https://taskhub-gwdw.onrender.com"],  #Should match your frontend URL
+            "origins": app.config['CORS_ORIGINS'],
             "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
             "supports_credentials": True,
@@ -44,17 +129,31 @@ CORS(
     },
     supports_credentials=True)
 
-api=Api(app)
+#every Resource counts against the read or write class by HTTP method
+api=Api(app, decorators=[rate_limits.read, rate_limits.write])
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    #resources that return plain dicts go through the same JSON provider as jsonify
+    response=app.json.response(data)
+    response.status_code=code
+    response.headers.extend(headers or {})
+    return response
 
 
 class UserResource(Resource):
+    decorators=[rate_limits.route_class('auth', ['POST'])] #signup hashes a password
+
+    @query_budget(2)
     def post(self):
         data=request.get_json()
         name=data.get('name')
         email=data.get('email')
         password=data.get('password')
-        return User.add_user(name, email, password)
+        timezone=data.get('timezone')
+        return User.add_user(name, email, password, app.config['DEFAULT_CATEGORIES'], timezone)
 
+    @query_budget(1)
     def get(self):
         return User.get_users()
 
@@ -62,6 +161,8 @@ api.add_resource(UserResource, '/users')
 
 
 @app.route('/login', methods=['POST'])
+@rate_limits.auth
+@query_budget(1)
 def login():
     data=request.get_json()
     email=data.get('email')
@@ -85,20 +186,56 @@ def login():
     session.clear() #clear any existing session
 
     session['user_id']=user.id
-    response=make_response(user.to_dict())
+    profile=user_serializer(user)
+    identity_cache.set(user.id, profile)
+    response=make_response(profile)
     return response, 200
 
+@app.route('/metrics/hashing', methods=['GET'])
+@query_budget(0)
+def hashing_metrics():
+    return password_hasher.stats(), 200
+
+def hashing_collector():
+    stats=password_hasher.stats()
+    yield from sample('taskhub_password_rejected_total', 'Password operations rejected because the pool was full', stats['rejected'], 'counter')
+    for kind in ('hash', 'verify', 'rehash'):
+        yield from sample(f'taskhub_password_{kind}_total', f'Password {kind} operations', stats[kind]['count'], 'counter')
+
+instrumentation.add_collector(hashing_collector)
+
+@app.route('/metrics/cache', methods=['GET'])
+@query_budget(0)
+def cache_metrics():
+    return response_cache.stats(), 200
+
+def response_cache_collector():
+    stats=response_cache.stats()
+    for kind in ('hits', 'misses', 'invalidations'):
+        yield from sample(f'taskhub_response_cache_{kind}_total', f'Response cache {kind}', stats[kind], 'counter')
+    if 'entries' in stats:
+        yield from sample('taskhub_response_cache_entries', 'Entries in the in-process response cache', stats['entries'])
+
+instrumentation.add_collector(response_cache_collector)
+
+@reminder_scheduler.hook
+def log_reminder(reminder):
+    app.logger.info('Task %s of user %s is due at %s', reminder.task_id, reminder.user_id, reminder.due_at)
+
 @app.route('/check_session', methods=['GET'])
+@query_budget(1)
 def check_session():
-    user=User.query.filter(User.id==session.get('user_id')).first()
-    if user:
-        return user.to_dict(),200
+    user_id=session.get('user_id')
+    principal=load_principal(user_id) if user_id else None
+    if principal:
+        return principal.profile,200
     else:
         return {
             'msg':'401: Not Authorized'
         }, 401
 
 @app.route('/logout', methods=['DELETE'])
+@query_budget(0)
 def logout():
     session['user_id']=None
     return {
@@ -114,26 +251,68 @@ def login_required(f):
                 'error':'Unauthorized'
             }, 401
 
-        user=db.session.execute(db.select(User).filter_by(id=user_id)).scalar_one_or_none()
-        if not user:
+        #handlers mostly need current_user.id, the User row is only loaded if they touch more
+        principal=load_principal(user_id)
+        if not principal:
             return {
                 'error':'Unauthorized'
             }, 401
-        kwargs['current_user']=user
+        kwargs['current_user']=principal
         return f(*args, **kwargs)
     return decorated_function
 
+def resource_etag(user_id, version, full_path):
+    url_digest=hashlib.blake2s(full_path.encode(), digest_size=8).hexdigest()
+    return f'{user_id}-{version}-{url_digest}'
+
+
+def conditional(f):
+    # Strong ETag from the user's data version and the request URL. A matching
+    # If-None-Match gets a 304 before the query or serializer run; otherwise
+    # the body comes from the response cache when it was built at this version.
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        current_user=kwargs['current_user']
+        version=get_data_version(current_user.id)
+        etag=resource_etag(current_user.id, version, request.full_path)
+        if any(request.if_none_match.contains(variant) for variant in etag_variants(etag)):
+            response=make_response('', 304)
+        else:
+            data=response_cache.get(current_user.id, version, request.full_path)
+            if data is not None:
+                response=app.response_class(data, mimetype='application/json')
+            else:
+                response=f(*args, **kwargs)
+                if response.status_code!=200:
+                    return response
+                response_cache.set(current_user.id, version, request.full_path, response.get_data())
+        response.set_etag(etag)
+        response.headers['Cache-Control']='private, no-cache'
+        return response
+    return decorated_function
+
+
+def includes(relation):
+    #opt-in expansion of related collections, e.g. ?include=tasks
+    return relation in request.args.get('include', '').split(',')
+
 
 class SingleUser(Resource):
+    decorators=[rate_limits.route_class('auth', ['PATCH'])] #may hash a new password
+
+    @query_budget(1)
     def get(self, id):
         return User.get_user(id)
 
+    @query_budget(4)
     def patch(self, id):
         data=request.get_json()
         name=data.get('name')
         password=data.get('password')
-        return User.update_user(id, name, password)
+        timezone=data.get('timezone')
+        return User.update_user(id, name, password, timezone)
 
+    @query_budget(5)
     def delete(self, id):
         return User.delete_user(id)
 
@@ -141,6 +320,7 @@ api.add_resource(SingleUser, '/user/<int:id>')
 
 
 class TaskResource(Resource):
+    @query_budget(4)
     @login_required
     def post(self, current_user):
         data=request.get_json()
@@ -150,17 +330,98 @@ class TaskResource(Resource):
         category_id=data.get('category_id')
         return Task.add_task(task, date, time, category_id, current_user.id)
 
+    @query_budget(3)
     @login_required
+    @conditional
     def get(self, current_user):
-        return Task.get_tasks(current_user.id)
+        args=request.args
+        return Task.get_tasks(
+            current_user.id,
+            limit=args.get('limit'),
+            cursor=args.get('cursor'),
+            is_complete=args.get('is_complete'),
+            category_id=args.get('category_id'),
+            date_from=args.get('date_from'),
+            date_to=args.get('date_to')
+        )
 
 api.add_resource(TaskResource, '/tasks')
 
+class TaskBatch(Resource):
+    @query_budget(6)
+    @login_required
+    def post(self, current_user):
+        data=request.get_json()
+        return Task.add_tasks(data.get('tasks'), current_user.id)
+
+    @query_budget(5)
+    @login_required
+    def patch(self, current_user):
+        data=request.get_json()
+        return Task.update_tasks(data.get('tasks'), current_user.id)
+
+    @query_budget(4)
+    @login_required
+    def delete(self, current_user):
+        data=request.get_json()
+        return Task.delete_tasks(data.get('ids'), current_user.id)
+
+api.add_resource(TaskBatch, '/tasks/batch')
+
+class TaskExport(Resource):
+    @query_budget(2)
+    @login_required
+    def get(self, current_user):
+        return Task.export_tasks(current_user.id, request.args.get('format', 'ndjson'))
+
+api.add_resource(TaskExport, '/tasks/export')
+
+class TaskStats(Resource):
+    @query_budget(5)
+    @login_required
+    def get(self, current_user):
+        return Task.get_stats(current_user.id, request.args.get('bucket', 'day'))
+
+api.add_resource(TaskStats, '/tasks/stats')
+
+class TaskImport(Resource):
+    @query_budget(None, repeated=None)
+    @login_required
+    def post(self, current_user):
+        #accepts a multipart "file" field or the raw request body
+        upload=request.files.get('file')
+        default_format='csv' if (upload.mimetype if upload else request.mimetype)=='text/csv' else 'ndjson'
+        import_format=request.args.get('format', default_format)
+        stream=upload.stream if upload else request.stream
+        return Task.import_tasks(stream, import_format, current_user.id)
+
+api.add_resource(TaskImport, '/tasks/import')
+
+class TaskSearch(Resource):
+    @query_budget(2)
+    @login_required
+    def get(self, current_user):
+        args=request.args
+        return Task.search_tasks(current_user.id, args.get('q'), limit=args.get('limit', type=int), offset=args.get('offset', type=int))
+
+api.add_resource(TaskSearch, '/tasks/search')
+
+class Sync(Resource):
+    @query_budget(6)
+    @login_required
+    def get(self, current_user):
+        return get_changes(current_user.id, request.args.get('since'))
+
+api.add_resource(Sync, '/sync')
+
 class SingleTask(Resource):
+    @query_budget(3)
     @login_required
+    @conditional
     def get(self, id, current_user):
         return Task.get_task(id, current_user.id)
 
+    @query_budget(4)
     @login_required
     def patch(self, id, current_user):
         data=request.get_json()
@@ -171,48 +432,132 @@ class SingleTask(Resource):
         is_complete=data.get('is_complete')
         return Task.update_task(id, current_user.id, updated_task, updated_date, updated_time, updated_category, is_complete)
 
+    @query_budget(4)
     @login_required
     def delete(self, id, current_user):
-        task=Task.query.filter(Task.id==id, Task.user_id==current_user.id).first()
-        if not task:
-            return make_response(jsonify({
-                'error':f'Task {id} not found or does not belong to the current user'
-            }), 404)
         return Task.delete_task(id, user_id=current_user.id)
 
 api.add_resource(SingleTask, '/task/<int:id>')
 
+class RecurrenceResource(Resource):
+    @query_budget(4)
+    @login_required
+    def post(self, current_user):
+        return Recurrence.add_recurrence(request.get_json(), current_user.id)
+
+    @query_budget(3)
+    @login_required
+    @conditional
+    def get(self, current_user):
+        return Recurrence.get_recurrences(current_user.id)
+
+api.add_resource(RecurrenceResource, '/recurrences')
+
+class SingleRecurrence(Resource):
+    @query_budget(4)
+    @login_required
+    def patch(self, id, current_user):
+        return Recurrence.update_recurrence(id, request.get_json(), current_user.id)
+
+    @query_budget(5)
+    @login_required
+    def delete(self, id, current_user):
+        return Recurrence.delete_recurrence(id, current_user.id)
+
+api.add_resource(SingleRecurrence, '/recurrence/<int:id>')
+
+class Occurrences(Resource):
+    #occurrences of every recurrence in a date window, virtual ones have id null;
+    #not @conditional, the default window moves with the date and not with the data version
+    @query_budget(3)
+    @login_required
+    def get(self, current_user):
+        args=request.args
+        return Recurrence.get_occurrences(current_user.id, args.get('date_from'), args.get('date_to'))
+
+api.add_resource(Occurrences, '/occurrences')
+
+class Occurrence(Resource):
+    #completes or edits one occurrence by saving it as a task
+    @query_budget(4)
+    @login_required
+    def post(self, id, occurrence_date, current_user):
+        return Recurrence.materialize(id, occurrence_date, request.get_json(silent=True), current_user.id)
+
+api.add_resource(Occurrence, '/recurrence/<int:id>/occurrence/<occurrence_date>')
+
 
 class CategoryResource(Resource):
+    @query_budget(3)
     @login_required
     def post(self, current_user):
         data=request.get_json()
         name=data.get('name')
         return Category.add_category(name, current_user.id)
 
+    @query_budget(4)
     @login_required
+    @conditional
     def get(self, current_user):
-        return Category.get_categories(current_user.id)
+        return Category.get_categories(current_user.id, include_tasks=includes('tasks'))
 
 api.add_resource(CategoryResource, '/categories')
 
 class SingleCategory(Resource):
+    @query_budget(4)
     @login_required
+    @conditional
     def get(self, id, current_user):
-        return Category.get_category(id, current_user.id)
+        return Category.get_category(id, current_user.id, include_tasks=includes('tasks'))
 
+    @query_budget(3)
     @login_required
     def patch(self, id, current_user):
         data=request.get_json()
         updated_name=data.get('updated_name')
         return Category.update_category(id, updated_name, current_user.id)
 
+    @query_budget(7)
     @login_required
     def delete(self, id, current_user):
         return Category.delete_category(id, current_user.id) 
 
 api.add_resource(SingleCategory, '/category/<int:id>')
 
+@app.cli.command('import-tasks')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user-id', type=int, required=True, help='Owner of the imported tasks')
+@click.option('--format', 'import_format', type=click.Choice(['ndjson', 'csv']), help='Defaults to the file extension')
+def import_tasks_command(path, user_id, import_format):
+    """Bulk import tasks from an NDJSON or CSV file."""
+    import_format=import_format or ('csv' if path.endswith('.csv') else 'ndjson')
+    with open(path, encoding='utf-8', newline='') as text_stream:
+        result=Task.import_rows(Task._read_import(text_stream, import_format), user_id)
+    click.echo(f"Imported {result['imported']} tasks, {result['failed']} failed")
+    for error in result['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}")
+
+@app.cli.command('prune-tombstones')
+@click.option('--days', type=int, help='Defaults to SYNC_TOMBSTONE_DAYS')
+def prune_tombstones_command(days):
+    """Delete sync tombstones older than the retention period."""
+    days=days if days is not None else app.config['SYNC_TOMBSTONE_DAYS']
+    removed=Tombstone.prune(datetime.utcnow() - timedelta(days=days))
+    click.echo(f'Removed {removed} tombstones older than {days} days')
+
+@app.cli.command('run-reminders')
+def run_reminders_command():
+    """Fire reminder hooks as tasks come due, until stopped. Run exactly one."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app.logger.setLevel(logging.INFO)
+    signal.signal(signal.SIGTERM, lambda signum, frame: reminder_scheduler.stop())
+    click.echo('Reminder scheduler running, stop it with Ctrl+C or SIGTERM')
+    try:
+        reminder_scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    click.echo(f'Reminder scheduler stopped: {reminder_scheduler.stats()}')
+
 if __name__=='__main__':
     port=int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
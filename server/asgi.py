@@ -0,0 +1,188 @@
+# Opt-in async serving mode:
+#
+#     uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# The read endpoints that dominate traffic (GET /tasks and GET /categories) run
+# on an async engine so a worker is not tied up while it waits on the
+# database. Every other route is served by the Flask app through
+# WSGIMiddleware. Both paths build their queries and responses with the same
+# model classmethods and serializers, and both count against the same read
+# rate limit buckets and report the same Server-Timing header and /metrics
+# histograms. Over-budget queries are only logged here, never a 500.
+import functools
+from contextlib import asynccontextmanager
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+from app import app as flask_app, engine_profile, resource_etag, rate_limits, instrumentation
+from async_db import create_session_factory
+from compression import choose_encoding, compress, etag_variants
+from instrumentation import DEFAULT_REPEAT_THRESHOLD
+from ratelimit import bucket_key
+from models.metrics import RequestStats, current_stats
+from models.category import Category
+from models.engine import engine_options, tune_engine
+from models.identity import Principal, identity_cache, profile_query, principal_from_row
+from models.response_cache import response_cache
+from models.task import Task
+from models.versions import data_version_query
+
+engine, session_factory=create_session_factory(flask_app.config['SQLALCHEMY_DATABASE_URI'], **engine_options(engine_profile))
+tune_engine(engine.sync_engine, engine_profile)
+instrumentation.instrument_engine(engine.sync_engine)
+session_cookie=flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def json_response(request, body, status_code=200, etag=None, data=None):
+    #data is an already encoded body, e.g. from the response cache
+    config=flask_app.config
+    if data is None:
+        data=flask_app.json.dumps_bytes(body)
+    headers={'Vary':'Accept-Encoding, Cookie'}
+    origin=request.headers.get('origin')
+    if origin in config['CORS_ORIGINS']:
+        headers['Access-Control-Allow-Origin']=origin
+        headers['Access-Control-Allow-Credentials']='true'
+        headers['Vary']+=', Origin'
+    if status_code==200 and len(data) >= config['COMPRESS_MIN_SIZE']:
+        encoding=choose_encoding(parse_accept_header(request.headers.get('accept-encoding')))
+        if encoding:
+            data=compress(data, encoding, config)
+            headers['Content-Encoding']=encoding
+            etag=f'{etag}-{encoding}' if etag else None
+    if etag:
+        headers['ETag']=quote_etag(etag)
+        headers['Cache-Control']='private, no-cache'
+    return Response(data, status_code, headers, media_type='application/json')
+
+
+def client_address(request):
+    #what ProxyFix gives the Flask routes: the address TRUSTED_PROXIES hops back in X-Forwarded-For
+    trusted=flask_app.config['TRUSTED_PROXIES']
+    forwarded=[address.strip() for address in request.headers.get('x-forwarded-for', '').split(',') if address.strip()]
+    if trusted and len(forwarded) >= trusted:
+        return forwarded[-trusted]
+    return request.client.host if request.client else None
+
+
+def session_user_id(request):
+    cookie=request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return None
+    try:
+        data=session_cookie.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    return data.get('user_id')
+
+
+async def current_principal(session, user_id):
+    if not user_id:
+        return None
+    profile=identity_cache.get(user_id)
+    if profile is not None:
+        return Principal(user_id, profile)
+    return principal_from_row(user_id, (await session.execute(profile_query(user_id))).first())
+
+
+def async_resource(budget):
+    # Async counterpart of the read rate limit, login_required, conditional and
+    # the instrumentation hooks: counts the request against the read bucket,
+    # resolves the session user, answers If-None-Match with 304, serves the
+    # response cache and renders the handler's (status, body) as JSON. budget
+    # is the @query_budget of the Flask handler for the same route.
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def endpoint(request):
+            stats=RequestStats(track_statements=flask_app.config['QUERY_BUDGET_MODE']!='off')
+            token=current_stats.set(stats)
+            try:
+                response=await respond(handler, request)
+            finally:
+                current_stats.reset(token)
+            labels=(request.method, request.url.path)
+            elapsed=instrumentation.observe(labels, str(response.status_code), stats, (budget, DEFAULT_REPEAT_THRESHOLD), False)
+            if flask_app.config['SERVER_TIMING']:
+                response.headers['Server-Timing']=instrumentation.server_timing(elapsed, stats)
+            return response
+        return endpoint
+    return decorator
+
+
+async def respond(handler, request):
+    user_id=session_user_id(request)
+    limited=rate_limits.check('read', bucket_key(user_id, client_address(request)))
+    if limited is not None:
+        body, retry_after=limited
+        response=json_response(request, body, 429)
+        response.headers['Retry-After']=str(retry_after)
+        return response
+
+    async with session_factory() as session:
+        principal=await current_principal(session, user_id)
+        if principal is None:
+            return json_response(request, {'error':'Unauthorized'}, 401)
+
+        version=(await session.execute(data_version_query(principal.id))).scalar()
+        full_path=f'{request.url.path}?{request.url.query}'
+        etag=resource_etag(principal.id, version, full_path)
+        if_none_match=parse_etags(request.headers.get('if-none-match'))
+        if any(if_none_match.contains(variant) for variant in etag_variants(etag)):
+            return Response(status_code=304, headers={'ETag':quote_etag(etag), 'Cache-Control':'private, no-cache'})
+
+        data=response_cache.get(principal.id, version, full_path)
+        if data is not None:
+            return json_response(request, None, 200, etag, data)
+
+        status_code, body=await handler(request, session, principal)
+        if status_code!=200:
+            return json_response(request, body, status_code)
+        data=flask_app.json.dumps_bytes(body)
+        response_cache.set(principal.id, version, full_path, data)
+        return json_response(request, body, status_code, etag, data)
+
+
+@async_resource(3)
+async def tasks(request, session, principal):
+    args=request.query_params
+    try:
+        query, limit=Task.tasks_query(
+            principal.id,
+            limit=args.get('limit'),
+            cursor=args.get('cursor'),
+            is_complete=args.get('is_complete'),
+            category_id=args.get('category_id'),
+            date_from=args.get('date_from'),
+            date_to=args.get('date_to')
+        )
+    except ValueError as e:
+        return 400, {'error':str(e)}
+    rows=(await session.execute(query)).all()
+    return 200, Task.tasks_page(rows, limit)
+
+
+@async_resource(4)
+async def categories(request, session, principal):
+    include_tasks='tasks' in request.query_params.get('include', '').split(',')
+    result=await session.execute(Category.categories_query(principal.id, include_tasks))
+    return 200, Category.categories_body(result, include_tasks)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+application=Starlette(
+    routes=[
+        #GET only; other methods on these paths fall through to Flask
+        Route('/tasks', tasks, methods=['GET']),
+        Route('/categories', categories, methods=['GET']),
+        Mount('/', WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,21 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+#async driver for each database the sync app supports
+ASYNC_DRIVERS={
+    'sqlite':'sqlite+aiosqlite',
+    'postgresql':'postgresql+asyncpg',
+}
+
+
+def async_url(database_url):
+    url=make_url(database_url)
+    backend=url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for "{backend}" databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_session_factory(database_url, **engine_options):
+    engine=create_async_engine(async_url(database_url), **engine_options)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
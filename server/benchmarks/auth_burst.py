@@ -0,0 +1,124 @@
+# Simulates a credential-stuffing burst: attacker threads hammer /login with
+# wrong passwords while signed-in readers keep fetching /tasks. Reports how
+# the burst was answered (200/401/429/503) and the readers' latency, with the
+# rate limits on and off:
+#
+#     python -m benchmarks.auth_burst --attackers 32 --duration 5
+#     python -m benchmarks.auth_burst --attackers 32 --duration 5 --no-limits
+import argparse
+import http.client
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from .bench_endpoints import populate, BENCH_EMAIL, BENCH_PASSWORD
+from .common import percentile
+
+
+class Client:
+    def __init__(self, port):
+        self.connection=http.client.HTTPConnection('127.0.0.1', port)
+        self.cookie=None
+
+    def request(self, method, path, body=None):
+        headers={}
+        data=None
+        if body is not None:
+            data=json.dumps(body)
+            headers['Content-Type']='application/json'
+        if self.cookie:
+            headers['Cookie']=self.cookie
+        self.connection.request(method, path, data, headers)
+        response=self.connection.getresponse()
+        response.read()
+        set_cookie=response.getheader('Set-Cookie')
+        if set_cookie:
+            self.cookie=set_cookie.split(';', 1)[0]
+        return response.status
+
+
+def attacker(port, deadline, statuses, lock):
+    client=Client(port)
+    seen=Counter()
+    while time.perf_counter() < deadline:
+        seen[client.request('POST', '/login', {'email':BENCH_EMAIL, 'password':'wrong-password'})]+=1
+    with lock:
+        statuses.update(seen)
+
+
+def reader(client, deadline, latencies, lock):
+    samples=[]
+    while time.perf_counter() < deadline:
+        start=time.perf_counter()
+        status=client.request('GET', '/tasks?limit=50')
+        samples.append((time.perf_counter() - start, status))
+    with lock:
+        latencies.extend(samples)
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--attackers', type=int, default=32)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--no-limits', action='store_true', help='disable the rate limits to see the unprotected baseline')
+    args=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['database_url']=f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        os.environ.setdefault('SECRET_KEY', 'benchmark')
+        os.environ['RATELIMIT_ENABLED']='false' if args.no_limits else 'true'
+        #app.py reads its configuration at import time
+        from app import app
+        from models import db
+        from models.user import User
+        from models.category import Category
+        from models.task import Task
+        from models.passwords import password_hasher
+        from werkzeug.serving import make_server
+        app.config['SESSION_COOKIE_DOMAIN']=None
+        app.config['SESSION_COOKIE_SECURE']=False
+        #the readers are all the benchmark user, only the burst should hit a limit
+        app.config['RATELIMIT_READ']='10000/second'
+
+        with app.app_context():
+            db.create_all()
+            populate(db, (User, Category, Task, password_hasher), args.tasks, 10)
+
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server=make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port=server.server_port
+        #readers sign in before the burst, they share an address with the attackers
+        readers=[Client(port) for _ in range(args.readers)]
+        for client in readers:
+            client.request('POST', '/login', {'email':BENCH_EMAIL, 'password':BENCH_PASSWORD})
+
+        statuses=Counter()
+        latencies=[]
+        lock=threading.Lock()
+        deadline=time.perf_counter() + args.duration
+        threads=[threading.Thread(target=reader, args=(client, deadline, latencies, lock)) for client in readers]
+        threads+=[threading.Thread(target=attacker, args=(port, deadline, statuses, lock)) for _ in range(args.attackers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.shutdown()
+        password_hasher.shutdown()
+
+    print(f"rate limits {'off' if args.no_limits else 'on'}, {args.attackers} attackers, {args.readers} readers, {args.duration:.0f}s")
+    print('login responses: ' + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
+    samples=sorted(elapsed for elapsed, status in latencies if status==200)
+    failed=sum(1 for _, status in latencies if status!=200)
+    if samples:
+        print(f'GET /tasks: {len(samples) / args.duration:.1f} req/s  p50 {percentile(samples, 50) * 1000:.1f} ms  '
+              f'p95 {percentile(samples, 95) * 1000:.1f} ms  p99 {percentile(samples, 99) * 1000:.1f} ms  {failed} failed')
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,273 @@
+# Per-endpoint latency, throughput and SQL statement counts for the routes in
+# app.py, driven through the Flask test client or a local WSGI server. The
+# dataset is generated deterministically into a temporary SQLite file (or an
+# empty database given with --database-url), so runs are comparable. The
+# response cache is off, so repeated reads run their handlers; the "(cached)"
+# endpoints measure the same reads with it on:
+#
+#     python -m benchmarks.bench_endpoints --tasks 100000 --output before.json
+#     python -m benchmarks.bench_endpoints --tasks 100000 --compare before.json
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from sqlalchemy import event, insert
+from .common import percentile
+
+BENCH_EMAIL='bench@example.com'
+BENCH_PASSWORD='benchmark-password'
+CATEGORIES_PER_USER=4
+
+
+def populate(db, models, n_tasks, n_users, batch=50_000):
+    User, Category, Task, password_hasher=models
+    rng=random.Random(42)
+    #only the benchmark user logs in, everyone else gets a cheap placeholder hash
+    db.session.execute(insert(User), [{
+        'name':f'user{u}',
+        'email':BENCH_EMAIL if u==0 else f'user{u}@example.com',
+        'password':password_hasher.hash(BENCH_PASSWORD) if u==0 else 'x' * 20
+    } for u in range(n_users)])
+    db.session.execute(insert(Category), [
+        {'name':f'Category {c}', 'created_by':u + 1} for u in range(n_users) for c in range(CATEGORIES_PER_USER)
+    ])
+    words=('buy', 'call', 'email', 'review', 'meeting', 'report', 'pay', 'book', 'plan', 'send', 'groceries', 'invoice')
+    start=date(2024, 1, 1)
+    for offset in range(0, n_tasks, batch):
+        rows=[]
+        for i in range(offset, min(offset + batch, n_tasks)):
+            user=i % n_users
+            day=start + timedelta(days=rng.randrange(365))
+            hour=rng.randrange(24)
+            rows.append({
+                'task':' '.join(rng.choices(words, k=4)),
+                'date':day,
+                'time':f'{hour:02d}:00',
+                'due_at':datetime.combine(day, dt_time(hour)),
+                'category_id':user * CATEGORIES_PER_USER + rng.randrange(CATEGORIES_PER_USER) + 1,
+                'user_id':user + 1,
+                'is_complete':rng.random() < 0.3
+            })
+        db.session.execute(insert(Task), rows)
+    db.session.commit()
+
+
+class TestClientDriver:
+    name='test-client'
+
+    def __init__(self, app):
+        self.client=app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response=self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.headers.get('ETag')
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    # Real HTTP over a keep-alive connection to a threaded werkzeug server in
+    # this process, so the SQL counter still sees every statement.
+    name='wsgi'
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server=make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread=threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection=http.client.HTTPConnection('127.0.0.1', self.server.server_port)
+        self.cookie=None
+
+    def request(self, method, path, body=None, headers=None):
+        headers=dict(headers or {})
+        data=None
+        if body is not None:
+            data=json.dumps(body)
+            headers['Content-Type']='application/json'
+        if self.cookie:
+            headers['Cookie']=self.cookie
+        self.connection.request(method, path, data, headers)
+        response=self.connection.getresponse()
+        response.read()
+        set_cookie=response.getheader('Set-Cookie')
+        if set_cookie:
+            self.cookie=set_cookie.split(';', 1)[0]
+        return response.status, response.getheader('ETag')
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+
+
+def endpoints(user_id, task_id, category_id):
+    # (name, method, path, body factory). Bodies are built per request so
+    # creating endpoints never collide.
+    counter=iter(range(10**9))
+    return [
+        ('POST /login', 'POST', '/login', lambda: {'email':BENCH_EMAIL, 'password':BENCH_PASSWORD}),
+        ('GET /check_session', 'GET', '/check_session', None),
+        ('GET /tasks', 'GET', '/tasks', None),
+        ('GET /tasks?limit=200', 'GET', '/tasks?limit=200', None),
+        ('GET /tasks (304)', 'GET', '/tasks', None),
+        ('GET /tasks (cached)', 'GET', '/tasks', None),
+        ('GET /task/<id>', 'GET', f'/task/{task_id}', None),
+        ('GET /task/<id> (cached)', 'GET', f'/task/{task_id}', None),
+        ('PATCH /task/<id>', 'PATCH', f'/task/{task_id}', lambda: {'is_complete':next(counter) % 2==0}),
+        ('POST /tasks', 'POST', '/tasks', lambda: {'task':'benchmark', 'date':'2024-06-01', 'time':'09:00', 'category_id':category_id}),
+        ('GET /tasks/search', 'GET', '/tasks/search?q=invoice%20review', None),
+        ('GET /tasks/stats', 'GET', '/tasks/stats', None),
+        ('GET /categories', 'GET', '/categories', None),
+        ('GET /categories?include=tasks', 'GET', '/categories?include=tasks', None),
+        ('GET /categories?include=tasks (cached)', 'GET', '/categories?include=tasks', None),
+        ('GET /category/<id>', 'GET', f'/category/{category_id}', None),
+        ('GET /users', 'GET', '/users', None),
+        ('GET /user/<id>', 'GET', f'/user/{user_id}', None),
+        ('POST /users', 'POST', '/users', lambda: {'name':'bench user', 'email':f'signup{next(counter)}@example.com', 'password':BENCH_PASSWORD}),
+    ]
+
+
+def measure(driver, statements, name, method, path, body, n, warmup):
+    from models.cache import TTLCache
+    from models.response_cache import response_cache
+    if name.endswith('(cached)'):
+        backend=response_cache.backend
+        response_cache.backend=TTLCache(ttl=3600, max_size=5000)
+        try:
+            return measure(driver, statements, name[:-len(' (cached)')], method, path, body, n, warmup)
+        finally:
+            response_cache.backend=backend
+    headers=None
+    if name.endswith('(304)'):
+        _, etag=driver.request(method, path)
+        headers={'If-None-Match':etag}
+    for _ in range(warmup):
+        driver.request(method, path, body() if body else None, headers)
+    statements[0]=0
+    latencies=[]
+    errors=0
+    started=time.perf_counter()
+    for _ in range(n):
+        start=time.perf_counter()
+        status, _=driver.request(method, path, body() if body else None, headers)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors+=1
+    elapsed=time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests':n,
+        'errors':errors,
+        'rps':round(n / elapsed, 1),
+        'p50_ms':round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms':round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms':round(percentile(latencies, 99) * 1000, 3),
+        'sql_per_request':round(statements[0] / n, 2),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline=json.load(f)['endpoints']
+    print(f'\n{"vs " + baseline_path:<40} {"p50":>9} {"p95":>9} {"sql/req":>9}')
+    for name, entry in results.items():
+        before=baseline.get(name)
+        if not before:
+            continue
+        deltas=[
+            f"{(entry[key] - before[key]) / before[key] * 100:+8.1f}%" if before[key] else f'{"n/a":>9}'
+            for key in ('p50_ms', 'p95_ms')
+        ]
+        deltas.append(f"{entry['sql_per_request'] - before['sql_per_request']:+9.2f}")
+        print(f'{name:<40} {" ".join(deltas)}')
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=1_000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--driver', choices=['test-client', 'wsgi'], default='test-client')
+    parser.add_argument('--only', help='comma separated endpoint names to run')
+    parser.add_argument('--database-url', help='an empty database to populate instead of a temporary SQLite file')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run')
+    args=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['database_url']=args.database_url or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        os.environ.setdefault('SECRET_KEY', 'benchmark')
+        #measure the handlers, not the rate limiter
+        os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+        #every repeated GET would be a cache hit, the (cached) endpoints turn it on
+        os.environ.setdefault('RESPONSE_CACHE_TTL', '0')
+        #app.py reads its configuration at import time
+        from app import app
+        from models import db
+        from models.user import User
+        from models.category import Category
+        from models.task import Task
+        from models.passwords import password_hasher
+        app.config['SESSION_COOKIE_DOMAIN']=None
+        app.config['SESSION_COOKIE_SECURE']=False
+
+        with app.app_context():
+            db.create_all()
+            start=time.perf_counter()
+            populate(db, (User, Category, Task, password_hasher), args.tasks, args.users)
+            print(f'populated {args.tasks} tasks for {args.users} users in {time.perf_counter() - start:.1f}s')
+            task_id=db.session.execute(db.select(Task.id).filter(Task.user_id==1).limit(1)).scalar()
+            engine=db.engine
+
+        statements=[0]
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements[0]+=1
+
+        driver=(ServerDriver if args.driver=='wsgi' else TestClientDriver)(app)
+        driver.request('POST', '/login', {'email':BENCH_EMAIL, 'password':BENCH_PASSWORD})
+        only=set(args.only.split(',')) if args.only else None
+        results={}
+        print(f'{"endpoint":<40} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"sql/req":>9}')
+        try:
+            for name, method, path, body in endpoints(1, task_id, 1):
+                if only and name not in only:
+                    continue
+                entry=measure(driver, statements, name, method, path, body, args.requests, args.warmup)
+                results[name]=entry
+                errors=f"  {entry['errors']} errors" if entry['errors'] else ''
+                print(f"{name:<40} {entry['rps']:9.1f} {entry['p50_ms']:9.2f} {entry['p95_ms']:9.2f} {entry['p99_ms']:9.2f} {entry['sql_per_request']:9.2f}{errors}")
+        finally:
+            driver.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta':{
+                    'tasks':args.tasks,
+                    'users':args.users,
+                    'requests':args.requests,
+                    'driver':args.driver,
+                    'response_cache_ttl':app.config['RESPONSE_CACHE_TTL'],
+                    'database':engine.dialect.name,
+                    'python':platform.python_version(),
+                    'timestamp':time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'endpoints':results,
+            }, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__=='__main__':
+    main()
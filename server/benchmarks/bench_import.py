@@ -0,0 +1,44 @@
+# Import throughput for Task.import_rows on a file-backed SQLite database.
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert
+from .common import make_app, db, User, Task
+
+
+def ndjson_upload(n):
+    start=date(2024, 1, 1)
+    lines=(json.dumps({
+        'task':f'Imported task {i}',
+        'date':(start + timedelta(days=i % 365)).isoformat(),
+        'time':'09:00',
+        'category_name':f'Project {i % 20}',
+        'is_complete':i % 2 == 0
+    }) for i in range(n))
+    return io.StringIO('\n'.join(lines))
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    args=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app=make_app(f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(User), [{'name':'bench', 'email':'bench@example.com', 'password':'x' * 20}])
+            db.session.commit()
+            upload=ndjson_upload(args.rows)
+            start=time.perf_counter()
+            result=Task.import_rows(Task._read_import(upload, 'ndjson'), 1)
+            elapsed=time.perf_counter() - start
+            print(f"imported {result['imported']} rows in {elapsed:.2f}s: {result['imported'] / elapsed:,.0f} rows/s")
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,54 @@
+# Bytes on the wire and encode time for a 10k-task list: the old pretty-printed
+# stdlib output against the compact provider, raw and compressed.
+import argparse
+import gzip
+import json
+import time
+from datetime import date, timedelta
+from flask import Flask
+from json_provider import FastJSONProvider, orjson
+from compression import brotli
+
+
+def sample_tasks(n):
+    start=date(2024, 1, 1)
+    return {'tasks':[{
+        'id':i,
+        'task':f'Task number {i} with a realistic description',
+        'date':(start + timedelta(days=i % 365)).isoformat(),
+        'time':'09:00',
+        'category_id':i % 4 + 1,
+        'is_complete':i % 3 == 0,
+        'user_id':1,
+        'category':{'id':i % 4 + 1, 'name':'Work', 'created_by':1, 'created_at':'2024-01-01'}
+    } for i in range(n)], 'next_cursor':None}
+
+
+def measure(label, encode, payload, repeat=5):
+    best=None
+    for _ in range(repeat):
+        start=time.perf_counter()
+        body=encode(payload)
+        elapsed=time.perf_counter() - start
+        best=elapsed if best is None else min(best, elapsed)
+    sizes=f'raw {len(body):>9}  gzip {len(gzip.compress(body, 6)):>8}'
+    if brotli is not None:
+        sizes+=f'  br {len(brotli.compress(body, quality=4)):>8}'
+    print(f'{label:<26} {best * 1000:8.1f} ms  {sizes}')
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=10_000)
+    args=parser.parse_args()
+
+    payload=sample_tasks(args.tasks)
+    provider=FastJSONProvider(Flask(__name__))
+    print(f'{args.tasks} tasks, orjson {"available" if orjson else "missing"}, brotli {"available" if brotli else "missing"}')
+    measure('stdlib indent=2 (before)', lambda obj: json.dumps(obj, indent=2, sort_keys=True).encode(), payload)
+    measure('stdlib compact', lambda obj: json.dumps(obj, separators=(',', ':')).encode(), payload)
+    measure('FastJSONProvider', provider.dumps_bytes, payload)
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,57 @@
+# Cost of the reminder scheduler on a large table: how long loading the
+# upcoming window takes and how many rows it reads, then what reloading the
+# deadlines of changed users costs, in statements and time.
+#
+#     python -m benchmarks.bench_reminders --tasks 1000000 --users 10000
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=365, help='deadlines are spread over this many days from now')
+    parser.add_argument('--horizon', type=int, default=3600)
+    parser.add_argument('--changed-users', type=int, default=1000)
+    args=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['database_url']=f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        os.environ.setdefault('SECRET_KEY', 'benchmark')
+        #app.py reads its configuration at import time, seed imports it
+        from app import app
+        from models import db
+        from models.reminders import ReminderScheduler
+        from seed import generate
+        app.config['REMINDER_HORIZON']=args.horizon
+        scheduler=ReminderScheduler(app)
+        statements=[0]
+        with app.app_context():
+            db.create_all()
+            #the same generator as seed.py, with deadlines spread over the days from today
+            with db.engine.begin() as connection:
+                generate(connection, args.users, args.tasks, days=args.days, start=datetime.utcnow().date())
+            event.listen(db.engine, 'before_cursor_execute', lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+            now=datetime.utcnow()
+            start=time.perf_counter()
+            scheduler._load_window(now, now + timedelta(seconds=args.horizon))
+            elapsed=time.perf_counter() - start
+            print(f'window load: {len(scheduler._scheduled)} of {args.tasks} tasks in {elapsed * 1000:.1f} ms, {statements[0]} statements')
+
+            statements[0]=0
+            changed=set(random.Random(1).sample(range(1, args.users + 1), min(args.changed_users, args.users)))
+            start=time.perf_counter()
+            scheduler._refresh(changed)
+            elapsed=time.perf_counter() - start
+            print(f'refresh of {len(changed)} changed users: {elapsed * 1000:.1f} ms, {statements[0]} statements')
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,62 @@
+# Full-text search against a LIKE scan on a large synthetic corpus (SQLite).
+import argparse
+import os
+import random
+import tempfile
+from datetime import date
+from sqlalchemy import insert
+from .common import make_app, timed, db, User, Category, Task
+
+COMMON=('buy', 'call', 'email', 'review', 'meeting', 'report', 'pay', 'book', 'plan', 'send')
+
+
+def populate(n_tasks, n_users, batch=50_000):
+    rng=random.Random(42)
+    #a few very common verbs plus a long tail of rarer words, roughly like real task lists
+    vocabulary=[f'{a}{b}{c}' for a in 'bcdfgklmnprst' for b in 'aeiou' for c in ('ber', 'dle', 'ment', 'ice', 'ing', 'ory', 'ster', 'ton')]
+    db.session.execute(insert(User), [{'name':f'user{u}', 'email':f'user{u}@example.com', 'password':'x' * 20} for u in range(n_users)])
+    db.session.execute(insert(Category), [{'name':'Work', 'created_by':u + 1} for u in range(n_users)])
+    for start in range(0, n_tasks, batch):
+        db.session.execute(insert(Task), [{
+            'task':f'{rng.choice(COMMON)} ' + ' '.join(rng.choices(vocabulary, k=5)),
+            'date':date(2024, 1, 1),
+            'time':'09:00',
+            'category_id':i % n_users + 1,
+            'user_id':i % n_users + 1,
+            'is_complete':False
+        } for i in range(start, min(start + batch, n_tasks))])
+    db.session.commit()
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--query', default='buy dament')
+    args=parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app=make_app(f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        with app.app_context():
+            db.create_all()
+            timed(f'populate {args.tasks} tasks', lambda: populate(args.tasks, args.users), repeat=1)
+
+            words=args.query.split()
+
+            def like_scan():
+                query=Task.query.filter(Task.user_id==1)
+                for word in words:
+                    query=query.filter(Task.task.ilike(f'%{word}%'))
+                #ranking needs every match, so the scan cannot stop early
+                return query.all()
+
+            def full_text():
+                with app.test_request_context():
+                    return Task.search_tasks(1, args.query, limit=50)
+
+            timed('LIKE scan (all matches)', like_scan)
+            timed('FTS5 search (ranked)', full_text)
+
+
+if __name__=='__main__':
+    main()
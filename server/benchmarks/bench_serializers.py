@@ -0,0 +1,55 @@
+# Compares SerializerMixin.to_dict with the precompiled serializers on a large task list.
+import argparse
+from datetime import date, timedelta
+from sqlalchemy import insert
+from .common import make_app, timed, db, User, Category, Task
+from models.task import task_serializer
+
+
+def populate(n_tasks):
+    db.session.execute(insert(User), [{'name':'bench', 'email':'bench@example.com', 'password':'x' * 20, 'created_at':date.today()}])
+    db.session.execute(insert(Category), [{'name':f'Category {i}', 'created_by':1, 'created_at':date.today()} for i in range(4)])
+    start=date(2024, 1, 1)
+    db.session.execute(insert(Task), [{
+        'task':f'Task number {i}',
+        'date':start + timedelta(days=i % 365),
+        'time':'09:00',
+        'category_id':i % 4 + 1,
+        'is_complete':i % 3 == 0,
+        'user_id':1
+    } for i in range(n_tasks)])
+    db.session.commit()
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=100_000)
+    args=parser.parse_args()
+
+    app=make_app()
+    with app.app_context():
+        db.create_all()
+        populate(args.tasks)
+        print(f'{args.tasks} tasks')
+
+        def orm_to_dict():
+            db.session.expire_all()
+            return [task.to_dict() for task in Task.query.filter_by(user_id=1).all()]
+
+        def orm_serializer():
+            db.session.expire_all()
+            return task_serializer.many(Task.query.filter_by(user_id=1).all())
+
+        def row_serializer():
+            rows=db.session.execute(
+                db.select(*task_serializer.projection()).join(Category, Task.category_id==Category.id).filter(Task.user_id==1)
+            ).all()
+            return task_serializer.from_rows(rows)
+
+        timed('to_dict (ORM objects)', orm_to_dict, repeat=1)
+        timed('Serializer (ORM objects)', orm_serializer)
+        timed('Serializer.from_rows (Row tuples)', row_serializer)
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,54 @@
+# Signup throughput: the old commit-per-category provisioning against User.add_user.
+# Password hashing costs the same in both paths, so --fast-hash configures a
+# cheap method to isolate the database work.
+import argparse
+import os
+import tempfile
+import time
+from models.passwords import password_hasher
+from .common import make_app, db, User, Category
+from models.category import DEFAULT_CATEGORIES
+from models.user import user_serializer
+
+
+def legacy_add_user(name, email, password):
+    #provisioning as it was before bulk insert: one commit for the user, then
+    #a duplicate check, an INSERT and a commit per default category
+    if User.query.filter(User.email==email).first():
+        return
+    new_user=User(name=name, email=email, password=password_hasher.hash(password))
+    db.session.add(new_user)
+    db.session.commit()
+    for category_name in DEFAULT_CATEGORIES:
+        Category.add_category(category_name, new_user.id)
+    user_serializer(new_user)
+
+
+def run(label, signup, n):
+    start=time.perf_counter()
+    for i in range(n):
+        signup(f'user{i}', f'{label}{i}@example.com', 'password123')
+    elapsed=time.perf_counter() - start
+    print(f'{label:<10} {n / elapsed:10.1f} signups/s')
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--signups', type=int, default=500)
+    parser.add_argument('--fast-hash', action='store_true')
+    args=parser.parse_args()
+
+    if args.fast_hash:
+        password_hasher.configure(method='pbkdf2:sha256:1')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        #file-backed database so every commit pays for a real fsync
+        app=make_app(f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        with app.app_context():
+            db.create_all()
+            run('legacy', legacy_add_user, args.signups)
+            run('bulk', User.add_user, args.signups)
+
+
+if __name__=='__main__':
+    main()
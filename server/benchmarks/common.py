@@ -0,0 +1,42 @@
+# Shared helpers for the benchmark scripts. Run them from the server directory,
+# e.g. `python -m benchmarks.bench_serializers`.
+import time
+from flask import Flask
+from models import db
+from models.engine import resolve_profile, engine_options, tune_engine
+from models.user import User
+from models.category import Category
+from models.task import Task
+from models.recurrence import Recurrence  # tasks.recurrence_id points at its table
+
+
+def make_app(database_url='sqlite:///:memory:', profile='default'):
+    app=Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI']=database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS']=False
+    engine_profile=resolve_profile(database_url, profile)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']=engine_options(engine_profile)
+    db.init_app(app)
+    with app.app_context():
+        tune_engine(db.engine, engine_profile)
+    return app
+
+
+def timed(label, fn, repeat=3):
+    best=None
+    result=None
+    for _ in range(repeat):
+        start=time.perf_counter()
+        result=fn()
+        elapsed=time.perf_counter() - start
+        best=elapsed if best is None else min(best, elapsed)
+    print(f'{label:<40} {best * 1000:10.1f} ms')
+    return best, result
+
+
+def percentile(sorted_samples, pct):
+    #nearest-rank percentile of an already sorted list
+    if not sorted_samples:
+        return None
+    index=max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
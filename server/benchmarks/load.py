@@ -0,0 +1,58 @@
+# Concurrency load test against a running server, for comparing the sync and
+# async serving modes on the same database:
+#
+#     gunicorn -w 2 -b 127.0.0.1:5000 app:app
+#     uvicorn asgi:application --workers 2 --port 5001
+#     python -m benchmarks.load http://127.0.0.1:5000 http://127.0.0.1:5001 --email ... --password ...
+#
+# Session cookies are only sent over plain HTTP when SESSION_COOKIE_SECURE and
+# SESSION_COOKIE_DOMAIN are relaxed for local runs.
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def run(base_url, args):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        response=await client.post('/login', json={'email':args.email, 'password':args.password})
+        response.raise_for_status()
+        latencies=[]
+        errors=0
+        deadline=time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start=time.perf_counter()
+                response=await client.get(args.path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code!=200:
+                    errors+=1
+
+        started=time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed=time.perf_counter() - started
+
+    latencies.sort()
+    p95=latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f'{base_url:<28} {len(latencies) / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+          f'p95 {p95 * 1000:7.1f} ms  errors {errors}')
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('base_urls', nargs='+')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--path', default='/tasks')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    args=parser.parse_args()
+    for base_url in args.base_urls:
+        asyncio.run(run(base_url, args))
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,122 @@
+# Concurrent-writer stress test for the engine profiles on a local SQLite
+# file. Each process plays one gunicorn worker: it builds its own app/engine
+# after the fork and runs Task.add_task (insert + data version bump + commit)
+# in a loop while reader processes stream the user's tasks the way
+# /tasks/export does, chunk by chunk with a pause for the client to drain
+# each one. Under the default rollback journal an open read blocks every
+# commit, so a writer waits for the slowest export and fails with "database
+# is locked" once that takes longer than the 5 s lock timeout; under WAL
+# readers never block the writer. Both profiles are reported side by side:
+#
+#     python -m benchmarks.stress_writers --profiles default sqlite
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from .common import make_app, db, User, Category, Task
+
+EXPORT_CHUNK=100
+
+
+def setup(database_url, profile, users, tasks_per_user):
+    app=make_app(database_url, profile)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [{'name':f'user{i}', 'email':f'user{i}@example.com', 'password':'x' * 20} for i in range(users)])
+        db.session.execute(insert(Category), [{'name':'Work', 'created_by':i + 1} for i in range(users)])
+        #enough rows that an export takes several chunks
+        db.session.execute(insert(Task), [
+            {'task':f'Task {n}', 'date':date(2024, 1, 1), 'time':'09:00', 'category_id':i + 1, 'user_id':i + 1}
+            for i in range(users) for n in range(tasks_per_user)
+        ])
+        db.session.commit()
+        #no pooled connections may cross the fork
+        db.engine.dispose()
+
+
+def writer(database_url, profile, user_id, duration, results):
+    app=make_app(database_url, profile)
+    done=failed=0
+    deadline=time.perf_counter() + duration
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                Task.add_task(f'Task {done}', '2024-01-01', '09:00', user_id, user_id)
+                done+=1
+            except OperationalError:
+                #"database is locked"
+                db.session.rollback()
+                failed+=1
+    results.put(('write', done, failed))
+
+
+def reader(database_url, profile, user_id, duration, export_time, results):
+    # One export after another: the rows stream through an open cursor in
+    # chunks, pausing between chunks so the export lasts about export_time
+    # seconds, like a client downloading it over a slow link.
+    app=make_app(database_url, profile)
+    done=failed=0
+    deadline=time.perf_counter() + duration
+    with app.app_context():
+        chunks=max(1, -(-db.session.execute(db.select(db.func.count(Task.id)).filter(Task.user_id==user_id)).scalar() // EXPORT_CHUNK))
+        db.session.rollback()
+        while time.perf_counter() < deadline:
+            try:
+                query=db.select(Task.id, Task.task, Task.date, Task.time).filter(Task.user_id==user_id).order_by(Task.id)
+                for _ in db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK)).partitions():
+                    time.sleep(export_time / chunks)
+                db.session.rollback()
+                done+=1
+            except OperationalError:
+                db.session.rollback()
+                failed+=1
+    results.put(('read', done, failed))
+
+
+def run(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url=f'sqlite:///{os.path.join(tmp, "stress.db")}'
+        setup(database_url, profile, args.writers, args.tasks_per_user)
+        results=multiprocessing.Queue()
+        processes=[
+            multiprocessing.Process(target=writer, args=(database_url, profile, i + 1, args.duration, results))
+            for i in range(args.writers)
+        ] + [
+            multiprocessing.Process(target=reader, args=(database_url, profile, i % args.writers + 1, args.duration, args.export_time, results))
+            for i in range(args.readers)
+        ]
+        for process in processes:
+            process.start()
+        totals={'write':[0, 0], 'read':[0, 0]}
+        for _ in processes:
+            kind, done, failed=results.get()
+            totals[kind][0]+=done
+            totals[kind][1]+=failed
+        for process in processes:
+            process.join()
+    return totals
+
+
+def main():
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--profiles', nargs='+', default=['default', 'sqlite'])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--export-time', type=float, default=6, help='seconds each streamed export stays open')
+    parser.add_argument('--tasks-per-user', type=int, default=1000)
+    args=parser.parse_args()
+    results={profile:run(profile, args) for profile in args.profiles}
+
+    print(f'{"profile":<10} {"writes/s":>10} {"locked":>8} {"exports/s":>10} {"locked":>8}')
+    for profile, totals in results.items():
+        (writes, write_errors), (reads, read_errors)=totals['write'], totals['read']
+        print(f'{profile:<10} {writes / args.duration:10.1f} {write_errors:8d} {reads / args.duration:10.2f} {read_errors:8d}')
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,71 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli=None
+
+DEFAULT_MIN_SIZE=1024
+DEFAULT_MIMETYPES=('application/json', 'application/x-ndjson', 'text/csv')
+ENCODING_SUFFIXES=('-br', '-gzip')
+
+
+def choose_encoding(accept_encoding):
+    #accept_encoding is a parsed werkzeug Accept header
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding=='br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def etag_variants(etag):
+    #a compressed response carries the encoding in its ETag so revalidation must accept each variant
+    return [etag] + [etag + suffix for suffix in ENCODING_SUFFIXES]
+
+
+class Compress:
+    # Content-negotiated brotli/gzip for responses above a size threshold.
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        self.app=app
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        from flask import request
+        config=self.app.config
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code!=200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config['COMPRESS_MIMETYPES']
+            or (response.content_length or 0) < config['COMPRESS_MIN_SIZE']
+        ):
+            return response
+
+        encoding=choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(response.get_data(), encoding, config))
+        response.headers['Content-Encoding']=encoding
+
+        etag, weak=response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
@@ -0,0 +1,241 @@
+import functools
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+from werkzeug.exceptions import InternalServerError
+from models.metrics import RequestStats, CountingCursor, current_stats, record_statement
+
+LATENCY_BUCKETS=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROW_BUCKETS=(0, 1, 10, 50, 100, 200, 500, 1000, 10000)
+CONTENT_TYPE='text/plain; version=0.0.4; charset=utf-8'
+QUERY_BUDGET_MODES=('off', 'warn', 'raise')
+DEFAULT_REPEAT_THRESHOLD=3
+
+
+class QueryBudgetExceeded(InternalServerError):
+    description='The request ran more SQL statements than its query budget allows'
+
+
+def query_budget(statements, repeated=DEFAULT_REPEAT_THRESHOLD):
+    # Declares how many SQL statements a handler may run, and from how many
+    # executions of the same statement it counts as an N+1. None disables
+    # either check. Only enforced when QUERY_BUDGET_MODE is warn or raise.
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            from flask import g
+            g.query_budget=(statements, repeated)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def sample(name, documentation, value, kind='gauge', labelnames=(), labels=()):
+    #exposition lines for a single value read at scrape time
+    yield f'# HELP {name} {documentation}'
+    yield f'# TYPE {name} {kind}'
+    yield f'{name}{_labels(labelnames, labels)} {value}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name=name
+        self.documentation=documentation
+        self.labelnames=labelnames
+        self._values={}
+        self._lock=threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels]=self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values=list(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {value}'
+
+
+class Histogram:
+    # Fixed buckets, per label set: [count per bucket..., +Inf count], sum.
+    # observe() is a bisect plus two additions under a lock.
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name=name
+        self.documentation=documentation
+        self.labelnames=labelnames
+        self.buckets=tuple(buckets)
+        self._series={}
+        self._lock=threading.Lock()
+
+    def observe(self, labels, value):
+        index=bisect_left(self.buckets, value)
+        with self._lock:
+            series=self._series.get(labels)
+            if series is None:
+                series=self._series[labels]=[[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index]+=1
+            series[1]+=value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series=[(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        names=self.labelnames + ('le',)
+        for labels, counts, total in series:
+            cumulative=0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative+=count
+                yield f'{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {total}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Instrumentation:
+    # Per-request wall time, database time, statement count, rows fetched
+    # from the database and serialization time. Reported to the client as a
+    # Server-Timing header and aggregated into Prometheus histograms per route
+    # on /metrics. A streamed response is measured once its body has been
+    # sent, so the queries run inside its generator are included.
+    # Metrics are per process; with several gunicorn workers each scrape sees
+    # the worker that answered it.
+    def __init__(self, app=None, db=None):
+        labels=('method', 'route')
+        self.requests=Counter('taskhub_requests_total', 'Requests handled', labels + ('status',))
+        self.duration=Histogram('taskhub_request_duration_seconds', 'Wall time from routing to response', labels)
+        self.db_time=Histogram('taskhub_request_db_seconds', 'Time spent executing SQL per request', labels)
+        self.statements=Histogram('taskhub_request_sql_statements', 'SQL statements executed per request', labels, STATEMENT_BUCKETS)
+        self.rows=Histogram('taskhub_request_rows', 'Rows fetched from the database per request', labels, ROW_BUCKETS)
+        self.serialize_time=Histogram('taskhub_request_serialize_seconds', 'Time spent building and encoding response bodies', labels)
+        self.metrics=[self.requests, self.duration, self.db_time, self.statements, self.rows, self.serialize_time]
+        self.collectors=[]
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SERVER_TIMING', True)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('QUERY_BUDGET_MODE', 'off')
+        if app.config['QUERY_BUDGET_MODE'] not in QUERY_BUDGET_MODES:
+            raise ValueError(f"QUERY_BUDGET_MODE must be one of {', '.join(QUERY_BUDGET_MODES)}")
+        self.app=app
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+        with app.app_context():
+            self.instrument_engine(db.engine)
+
+    def instrument_engine(self, engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            record_statement(time.perf_counter() - conn.info['query_start'].pop(), statement)
+            #count rows as they are fetched, not as they are serialized
+            if cursor.description is not None and current_stats.get() is not None:
+                context.cursor=CountingCursor(cursor)
+
+    def add_collector(self, collector):
+        #collector() yields extra exposition lines, e.g. gauges owned by another component
+        self.collectors.append(collector)
+
+    def before_request(self):
+        from flask import g
+        g.request_stats=RequestStats(track_statements=self.app.config['QUERY_BUDGET_MODE']!='off')
+        g.request_stats_token=current_stats.set(g.request_stats)
+
+    def after_request(self, response):
+        from flask import g, request
+        stats=g.get('request_stats')
+        if stats is None:
+            return response
+        #the rule pattern, not the URL, keeps label cardinality bounded
+        labels=(request.method, request.url_rule.rule if request.url_rule else 'unmatched')
+        budget=g.get('query_budget', (None, DEFAULT_REPEAT_THRESHOLD))
+        if response.is_streamed:
+            # The body is generated after this returns, while the server sends
+            # it; its queries are counted once it is done. The headers are gone
+            # by then, so there is no Server-Timing and over-budget only logs.
+            status=str(response.status_code)
+            response.call_on_close(lambda: self.observe(labels, status, stats, budget, False))
+            return response
+        elapsed=self.observe(labels, str(response.status_code), stats, budget)
+        if self.app.config['SERVER_TIMING']:
+            response.headers['Server-Timing']=self.server_timing(elapsed, stats)
+        return response
+
+    def server_timing(self, elapsed, stats):
+        return (
+            f'app;dur={elapsed * 1000:.2f}, '
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} queries, {stats.rows} rows", '
+            f'serialize;dur={stats.serialize_time * 1000:.2f}'
+        )
+
+    def observe(self, labels, status, stats, budget, can_raise=True):
+        elapsed=time.perf_counter() - stats.start
+        self.requests.inc(labels + (status,))
+        self.duration.observe(labels, elapsed)
+        self.db_time.observe(labels, stats.db_time)
+        self.statements.observe(labels, stats.statements)
+        self.rows.observe(labels, stats.rows)
+        self.serialize_time.observe(labels, stats.serialize_time)
+        if stats.statement_counts is not None:
+            self.check_budget(labels, stats, budget, can_raise)
+        return elapsed
+
+    def check_budget(self, labels, stats, budget, can_raise=True):
+        # Runs after the handler returned, so lazy loads triggered while the
+        # response was built are included. Handlers without a declared budget
+        # are still checked for repeated statements.
+        budget, repeated=budget
+        problems=[]
+        if budget is not None and stats.statements > budget:
+            problems.append(f'{stats.statements} SQL statements, budget is {budget}')
+        if repeated is not None:
+            for statement, count in stats.repeated_statements(repeated).items():
+                problems.append(f'possible N+1, {count} executions of: {" ".join(statement.split())}')
+        if not problems:
+            return
+        message=f'{labels[0]} {labels[1]}: ' + '; '.join(problems)
+        if can_raise and self.app.config['QUERY_BUDGET_MODE']=='raise':
+            raise QueryBudgetExceeded(message)
+        self.app.logger.warning(message)
+
+    def teardown_request(self, exc):
+        from flask import g
+        token=g.pop('request_stats_token', None)
+        if token is not None:
+            current_stats.reset(token)
+
+    def render(self):
+        lines=[]
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        from flask import request
+        token=self.app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return {'error':'Unauthorized'}, 401
+        return self.render(), 200, {'Content-Type':CONTENT_TYPE}
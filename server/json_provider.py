@@ -0,0 +1,54 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from time import perf_counter
+from flask.json.provider import DefaultJSONProvider
+from models.metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson=None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Compact JSON with ISO dates. Uses orjson when it is installed and the
+    # stdlib encoder otherwise; both produce the same output for our payloads.
+    compact=True
+    sort_keys=False
+    ensure_ascii=False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj):
+        start=perf_counter()
+        if orjson is not None:
+            data=orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            data=self.dumps(obj).encode()
+        record_serialization(perf_counter() - start)
+        return data
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj=self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,26 @@
+"""Add users.data_version for conditional GETs
+
+Revision ID: 3f9a1c7d2e41
+Revises: b422f2f75b82
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2e41'
+down_revision = 'b422f2f75b82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,51 @@
+"""Add full-text search over task descriptions
+
+Revision ID: 8c2d4e6f1a93
+Revises: 3f9a1c7d2e41
+Create Date: 2026-10-18 19:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d4e6f1a93'
+down_revision = '3f9a1c7d2e41'
+branch_labels = None
+depends_on = None
+
+# Kept here rather than imported from models.search, so this migration keeps
+# producing the same schema whatever the app code becomes; later migrations
+# that recreate the tasks table carry their own copy.
+SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task, user_id ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(task, user_id, content='tasks', content_rowid='id')")
+        for statement in SEARCH_TRIGGERS:
+            op.execute(statement)
+        # index the rows that already exist
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE INDEX IF NOT EXISTS idx_task_search ON tasks USING GIN (to_tsvector('english', task))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_ai")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_task_search")
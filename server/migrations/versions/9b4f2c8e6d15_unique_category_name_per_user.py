@@ -0,0 +1,43 @@
+"""Make category names unique per user
+
+Revision ID: 9b4f2c8e6d15
+Revises: 5d7e9a1b3c26
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f2c8e6d15'
+down_revision = '5d7e9a1b3c26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Duplicates could be created by concurrent requests before. Keep the
+    # oldest category of each (name, created_by) and move the others' tasks to it.
+    op.execute(
+        "UPDATE tasks SET category_id = ("
+        "SELECT MIN(keep.id) FROM categories keep JOIN categories dup "
+        "ON keep.name = dup.name AND keep.created_by = dup.created_by "
+        "WHERE dup.id = tasks.category_id) "
+        "WHERE category_id IN ("
+        "SELECT dup.id FROM categories dup JOIN categories keep "
+        "ON keep.name = dup.name AND keep.created_by = dup.created_by AND keep.id < dup.id)"
+    )
+    op.execute(
+        "DELETE FROM categories WHERE id IN ("
+        "SELECT dup.id FROM categories dup JOIN categories keep "
+        "ON keep.name = dup.name AND keep.created_by = dup.created_by AND keep.id < dup.id)"
+    )
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_index('idx_category_name_created_by')
+        batch_op.create_index('idx_category_name_created_by', ['name', 'created_by'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_index('idx_category_name_created_by')
+        batch_op.create_index('idx_category_name_created_by', ['name', 'created_by'], unique=False)
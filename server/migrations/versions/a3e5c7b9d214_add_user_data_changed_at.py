@@ -0,0 +1,30 @@
+"""Add users.data_changed_at, polled by the reminder scheduler
+
+Revision ID: a3e5c7b9d214
+Revises: f1c6a8e2d437
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e5c7b9d214'
+down_revision = 'f1c6a8e2d437'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL until the user's next change; the scheduler's first window load
+    # reads the current deadlines anyway
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_changed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_user_data_changed_at', ['data_changed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_data_changed_at')
+        batch_op.drop_column('data_changed_at')
@@ -0,0 +1,29 @@
+"""Add users.timezone, due_at becomes UTC
+
+Revision ID: b8f2d6a4c357
+Revises: a3e5c7b9d214
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f2d6a4c357'
+down_revision = 'a3e5c7b9d214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every existing user starts in UTC, where wall-clock time and UTC are the
+    # same, so tasks.due_at needs no backfill. A later timezone change
+    # recomputes the user's tasks.
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('timezone')
@@ -0,0 +1,87 @@
+"""Add recurrences and link materialized occurrences to tasks
+
+Revision ID: c4e8a2f6b913
+Revises: 9b4f2c8e6d15
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f6b913'
+down_revision = '9b4f2c8e6d15'
+branch_labels = None
+depends_on = None
+
+# The full-text search triggers as created by 8c2d4e6f1a93, frozen here: a
+# migration must keep producing the same schema whatever models.search
+# becomes later.
+SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task, user_id ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+)
+
+
+def restore_search_triggers():
+    # adding or dropping the foreign key recreates the tasks table on SQLite,
+    # which drops the full-text search triggers with it; ids are kept, so the
+    # index still matches
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade():
+    op.create_table('recurrences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task', sa.String(length=1000), nullable=False),
+    sa.Column('time', sa.String(length=100), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('frequency', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('starts_on', sa.Date(), nullable=False),
+    sa.Column('ends_on', sa.Date(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('recurrences', schema=None) as batch_op:
+        batch_op.create_index('idx_recurrence_user_starts_on', ['user_id', 'starts_on'], unique=False)
+        batch_op.create_index('idx_recurrence_user_version', ['user_id', 'version'], unique=False)
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('occurrence_date', sa.Date(), nullable=True))
+        batch_op.create_foreign_key('fk_tasks_recurrence_id_recurrences', 'recurrences', ['recurrence_id'], ['id'])
+        batch_op.create_index('idx_task_recurrence_occurrence', ['recurrence_id', 'occurrence_date'], unique=True)
+
+    restore_search_triggers()
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_recurrence_occurrence')
+        batch_op.drop_constraint('fk_tasks_recurrence_id_recurrences', type_='foreignkey')
+        batch_op.drop_column('occurrence_date')
+        batch_op.drop_column('recurrence_id')
+
+    restore_search_triggers()
+
+    with op.batch_alter_table('recurrences', schema=None) as batch_op:
+        batch_op.drop_index('idx_recurrence_user_version')
+        batch_op.drop_index('idx_recurrence_user_starts_on')
+
+    op.drop_table('recurrences')
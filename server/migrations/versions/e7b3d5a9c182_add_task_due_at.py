@@ -0,0 +1,105 @@
+"""Add tasks.due_at, backfilled from date and time
+
+Revision ID: e7b3d5a9c182
+Revises: c4e8a2f6b913
+Create Date: 2026-10-18 23:50:00.000000
+
+"""
+from datetime import datetime, time
+from functools import lru_cache
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d5a9c182'
+down_revision = 'c4e8a2f6b913'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# How models.due read Task.time when this migration was written, frozen here
+# so the backfill gives the same result whatever the app code becomes.
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p', '%H.%M', '%H')
+
+# The full-text search triggers as created by 8c2d4e6f1a93, frozen here: a
+# migration must keep producing the same schema whatever models.search
+# becomes later.
+SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task, user_id ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+)
+
+tasks = sa.table(
+    'tasks',
+    sa.column('id', sa.Integer()),
+    sa.column('date', sa.Date()),
+    sa.column('time', sa.String()),
+    sa.column('due_at', sa.DateTime()),
+)
+
+
+@lru_cache(maxsize=4096)
+def parse_time(value):
+    # time of day in a free-form Task.time, None for "after lunch"; cached,
+    # the same few spellings repeat across every row
+    text = ' '.join((value or '').upper().split())
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def due_at_for(day, time_text):
+    # date + parsed time, the start of the day when the time does not parse
+    if day is None:
+        return None
+    return datetime.combine(day, parse_time(time_text) or time.min)
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('due_at', sa.DateTime(), nullable=True))
+
+    # Keyset batches by id: every batch is one range read and one executemany
+    # UPDATE, so neither memory nor a single statement grows with the table.
+    # The indexes are built afterwards so the backfill does not maintain them.
+    connection = op.get_bind()
+    update = sa.update(tasks).where(tasks.c.id == sa.bindparam('task_id')).values(due_at=sa.bindparam('task_due_at'))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(tasks.c.id, tasks.c.date, tasks.c.time)
+            .where(tasks.c.id > last_id)
+            .order_by(tasks.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(update, [{'task_id': row.id, 'task_due_at': due_at_for(row.date, row.time)} for row in rows])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('idx_task_user_due_at', ['user_id', 'due_at'], unique=False)
+        batch_op.create_index('idx_task_due_at', ['due_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_due_at')
+        batch_op.drop_index('idx_task_user_due_at')
+        batch_op.drop_column('due_at')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # dropping the column recreates the tasks table on SQLite, which drops the
+        # full-text search triggers with it; ids are kept, so the index still matches
+        for statement in SEARCH_TRIGGERS:
+            op.execute(statement)
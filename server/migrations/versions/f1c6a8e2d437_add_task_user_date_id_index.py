@@ -0,0 +1,27 @@
+"""Index tasks by (user_id, date, id) for keyset pages
+
+Revision ID: f1c6a8e2d437
+Revises: e7b3d5a9c182
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a8e2d437'
+down_revision = 'e7b3d5a9c182'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /tasks filters on user_id and orders by (date, id); with this index a
+    # page is a range scan of limit + 1 entries instead of a sort of the account
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('idx_task_user_date_id', ['user_id', 'date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_user_date_id')
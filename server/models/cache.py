@@ -0,0 +1,66 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class CacheBackend(ABC):
+    # Storage behind ResponseCache: keys are strings, values opaque tuples.
+    # The default is an in-process TTLCache; a shared store (Redis, memcached)
+    # implements the same three methods with its own size bound and expiry so
+    # every worker sees the same entries. Missing or expired keys return None.
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, value):
+        pass
+
+    @abstractmethod
+    def invalidate(self, key):
+        pass
+
+
+class TTLCache(CacheBackend):
+    # Thread-safe in-process LRU with a per-entry TTL. A ttl or max_size of 0
+    # disables caching.
+    def __init__(self, ttl, max_size):
+        self.ttl=ttl
+        self.max_size=max_size
+        self._entries=OrderedDict()
+        self._lock=threading.Lock()
+        self.hits=0
+        self.misses=0
+
+    def get(self, key):
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses+=1
+                return None
+            self._entries.move_to_end(key)
+            self.hits+=1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key]=(time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,10 +1,19 @@
 from . import db
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates, selectinload
 from sqlalchemy_serializer import SerializerMixin
-from sqlalchemy import Integer, String, Date, ForeignKey, Index
+from sqlalchemy import Integer, String, Date, DateTime, ForeignKey, Index, update, delete
+from sqlalchemy.exc import IntegrityError
 from datetime import date, datetime
 from flask import make_response, jsonify
 from typing import List
+from .serializers import Serializer
+from .versions import bump_data_version
+from .tombstone import Tombstone
+from .conflicts import insert_unless_exists
+
+#categories every new account starts with
+DEFAULT_CATEGORIES=('Work', 'Personal', 'Shopping', 'Health')
+
 class Category(db.Model, SerializerMixin):
     __tablename__='categories'
 
@@ -13,13 +22,16 @@ class Category(db.Model, SerializerMixin):
     name: Mapped[str]=mapped_column(String(100), nullable=False)
     created_by: Mapped[int]=mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     created_at: Mapped[date]=mapped_column(Date, default=datetime.utcnow)
+    updated_at: Mapped[datetime]=mapped_column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version: Mapped[int]=mapped_column(Integer, nullable=False, default=0, server_default='0') #owner's data_version at the last change, see /sync
 
     user: Mapped['User']=relationship('User', back_populates='categories')
     tasks: Mapped[List['Task']]=relationship('Task', back_populates='category', cascade='all, delete-orphan')
 
     __table_args__=(
         Index('idx_category_created_by', 'created_by'), #for filtering categories by user
-        Index('idx_category_name_created_by', 'name', 'created_by'), #for searching categories by name for a specific user
+        Index('idx_category_name_created_by', 'name', 'created_by', unique=True), #category names are unique per user, also for searching by name
+        Index('idx_category_created_by_version', 'created_by', 'version'), #for /sync, rows changed after a version
     )
 
     def __repr__(self):
@@ -33,24 +45,30 @@ class Category(db.Model, SerializerMixin):
 
     @classmethod
     def add_category(cls, name, created_by):
-        category=cls.query.filter(cls.name==name, cls.created_by==created_by).first()
-        if category:
+        if not name:
+            return make_response(jsonify({
+                'error':'Category name cannot be empty'
+            }), 400)
+        #the unique (name, created_by) index decides, a concurrent request cannot slip in between a check and the INSERT
+        new_category=insert_unless_exists(
+            cls,
+            {'name':name, 'created_by':created_by, 'version':bump_data_version(created_by)},
+            ['name', 'created_by'],
+            cls.id
+        )
+        if new_category is None:
+            db.session.rollback()
             response_body={
                 'error':'You already have a category with this name'
             }
             status_code=409
         else:
-            new_category=cls(
-                name=name,
-                created_by=created_by
-            )
-            db.session.add(new_category)
             db.session.commit()
 
             response_body={
                 'msg':'Category created successfully',
                 'id':new_category.id,
-                'name':new_category.name
+                'name':name
             }
             status_code=201
 
@@ -58,18 +76,29 @@ class Category(db.Model, SerializerMixin):
 
     @classmethod
     def delete_category(cls, id, created_by):
-        category=cls.query.filter(cls.id==id, cls.created_by==created_by).first()
-        if category is None:
+        from .task import Task
+        from .recurrence import Recurrence
+        #bump first, every mutation takes the owner's row lock before any other
+        version=bump_data_version(created_by)
+        owned=db.select(cls.id).filter(cls.id==id, cls.created_by==created_by)
+        #recurrences and tasks go first, nothing cascades in the database
+        recurrence_ids=Recurrence.delete_rules(created_by, version, Recurrence.category_id.in_(owned))
+        task_ids=db.session.execute(delete(Task).where(Task.category_id.in_(owned)).returning(Task.id)).scalars().all()
+        name=db.session.execute(
+            delete(cls).where(cls.id==id, cls.created_by==created_by).returning(cls.name)
+        ).scalar()
+        if name is None:
+            db.session.rollback()
             response_body={
                 'error':f'Category {id} does not exist or does not belong to you'
             }
             status_code=404
         else:
-            db.session.delete(category)
+            Tombstone.record(created_by, version, tasks=task_ids, categories=[id], recurrences=recurrence_ids)
             db.session.commit()
 
             response_body={
-                'msg':f'Category "{category.name}" deleted successfully'
+                'msg':f'Category "{name}" deleted successfully'
             }
             status_code=200
 
@@ -77,53 +106,86 @@ class Category(db.Model, SerializerMixin):
 
     @classmethod
     def update_category(cls, id, updated_name, created_by):
-        category=cls.query.filter(cls.id==id, cls.created_by==created_by).first()
-        if category is None:
+        if not updated_name:
+            return make_response(jsonify({
+                'error':'Category name cannot be empty'
+            }), 400)
+        try:
+            updated_id=db.session.execute(
+                update(cls)
+                .where(cls.id==id, cls.created_by==created_by)
+                .values(name=updated_name, version=bump_data_version(created_by))
+                .returning(cls.id)
+            ).scalar()
+        except IntegrityError:
+            #the unique (name, created_by) index
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':'You already have a category with this name'
+            }), 409)
+        if updated_id is None:
+            db.session.rollback()
             response_body={
                 'error':f'Category {id} does not exist or does not belong to you'
             }
             status_code=404
         else:
-            updated_category_name_check=cls.query.filter_by(name=updated_name, created_by=created_by).first()
-            if updated_category_name_check:
-                response_body={
-                    'error':'You already have a category with this name'
-                    }
-                status_code=409
-            else:
-                category.name=updated_name
-                db.session.commit()
-
-                response_body={
-                    'msg':'Category name updated successfully',
-                    'name':updated_name,
-                    'id':id
-                }
-                status_code=200
+            db.session.commit()
+
+            response_body={
+                'msg':'Category name updated successfully',
+                'name':updated_name,
+                'id':id
+            }
+            status_code=200
         return make_response(jsonify(response_body), status_code)
 
     @classmethod
-    def get_category(cls, id, created_by):
-        category=cls.query.filter_by(id=id, created_by=created_by).first()
+    def get_category(cls, id, created_by, include_tasks=False):
+        query=cls.query.filter_by(id=id, created_by=created_by)
+        if include_tasks:
+            query=query.options(selectinload(cls.tasks))
+        category=query.first()
         if category is None:
             response_body={
                 'error':f'Category {id} does not exist or does not belong to you'
             }
             status_code=404
         else:
-            response_body=category.to_dict()
+            response_body=_serializer_for(include_tasks)(category)
             status_code=200
 
         return make_response(jsonify(response_body), status_code)
 
     @classmethod
-    def get_categories(cls, created_by):
-        categories=[]
-        for category in cls.query.filter_by(created_by=created_by).all():
-            category_dict=category.to_dict()
-            categories.append(category_dict)
+    def categories_query(cls, created_by, include_tasks=False):
+        #shared with the async server, see categories_body
+        if include_tasks:
+            #one SELECT for the categories and one SELECT ... IN for all of their tasks
+            return db.select(cls).filter(cls.created_by==created_by).options(selectinload(cls.tasks))
+        return db.select(*category_serializer.projection()).filter(cls.created_by==created_by)
+
+    @classmethod
+    def categories_body(cls, result, include_tasks=False):
+        if include_tasks:
+            return _serializer_for(True).many(result.scalars().all())
+        return category_serializer.from_rows(result.all())
+
+    @classmethod
+    def get_categories(cls, created_by, include_tasks=False):
+        result=db.session.execute(cls.categories_query(created_by, include_tasks))
+        return make_response(jsonify(cls.categories_body(result, include_tasks)), 200)
+
+
+category_serializer=Serializer(Category, exclude=('version',))
+
 
-        return make_response(jsonify(categories), 200)
+def _serializer_for(include_tasks):
+    if not include_tasks:
+        return category_serializer
+    #task.py imports this module, so the nested serializer lives there
+    from .task import category_with_tasks_serializer
+    return category_with_tasks_serializer
 
 
 
@@ -0,0 +1,27 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+#dialects with INSERT ... ON CONFLICT DO NOTHING
+CONFLICT_INSERTS={
+    'postgresql':postgresql.insert,
+    'sqlite':sqlite.insert,
+}
+
+
+def insert_unless_exists(model, values, conflict_columns, *returning):
+    # One INSERT ... ON CONFLICT (conflict_columns) DO NOTHING RETURNING. Returns
+    # the returned row, or None when a row with the same unique key already
+    # exists, without an exception and with the transaction still usable.
+    # Replaces SELECT-then-INSERT, which lets two concurrent requests both pass
+    # the check. Other dialects fall back to a savepoint around a plain INSERT.
+    dialect=db.session.get_bind().dialect.name
+    if dialect in CONFLICT_INSERTS:
+        statement=CONFLICT_INSERTS[dialect](model).values(values).on_conflict_do_nothing(index_elements=conflict_columns)
+        return db.session.execute(statement.returning(*returning)).first()
+    try:
+        with db.session.begin_nested():
+            return db.session.execute(insert(model).values(values).returning(*returning)).first()
+    except IntegrityError:
+        return None
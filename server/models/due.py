@@ -0,0 +1,60 @@
+from datetime import datetime, time, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+#accepted spellings of Task.time, tried in order
+TIME_FORMATS=('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p', '%H.%M', '%H')
+DEFAULT_TIMEZONE='UTC'
+
+
+@lru_cache(maxsize=4096)
+def parse_time(value):
+    # Time of day in a free-form Task.time, or None when it is not one of
+    # TIME_FORMATS ("after lunch"). Cached: the same few spellings repeat
+    # across millions of rows in backfills and imports.
+    text=' '.join((value or '').upper().split())
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def check_time(value):
+    #Task.time and Recurrence.time are free-form text, anything else is the client's error
+    if not value:
+        raise ValueError('Time is required')
+    if not isinstance(value, str):
+        raise ValueError('Time must be a string, e.g. "14:30" or "after lunch"')
+    return value
+
+
+def check_timezone(name):
+    #an IANA zone name, what User.timezone holds
+    if not isinstance(name, str) or not name:
+        raise ValueError('Timezone must be an IANA name such as "Europe/Paris"')
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Unknown timezone "{name}", use an IANA name such as "Europe/Paris"')
+    return name
+
+
+def user_timezone(user_id):
+    #from the cached profile, so a request that already loaded its user runs no query for it
+    from .identity import load_principal
+    principal=load_principal(user_id)
+    return principal.profile.get('timezone', DEFAULT_TIMEZONE) if principal else DEFAULT_TIMEZONE
+
+
+def due_at_for(day, time_text, timezone=DEFAULT_TIMEZONE):
+    # The due moment of a task as naive UTC: date and time are wall-clock
+    # time in the owner's timezone. An unparseable time counts as the start
+    # of the day.
+    if day is None:
+        return None
+    due=datetime.combine(day, parse_time(time_text) or time.min)
+    if timezone==DEFAULT_TIMEZONE:
+        return due
+    return due.replace(tzinfo=ZoneInfo(timezone)).astimezone(dt_timezone.utc).replace(tzinfo=None)
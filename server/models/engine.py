@@ -0,0 +1,92 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Named engine profiles, selected with DATABASE_PROFILE. "auto" picks the
+# profile matching the database_url backend; "default" leaves SQLAlchemy's
+# own settings untouched.
+ENGINE_PROFILES={
+    'default':{},
+    'sqlite':{
+        #WAL lets readers run alongside the single writer, busy_timeout makes
+        #concurrent writers wait for the lock instead of failing immediately
+        'pragmas':{
+            'journal_mode':'WAL',
+            'synchronous':'NORMAL',
+            'busy_timeout':5000,  # ms
+            'mmap_size':268435456,  # 256 MiB
+            'cache_size':-65536,  # negative is KiB, 64 MiB
+            'temp_store':'MEMORY',
+        },
+    },
+    'postgres':{
+        'options':{
+            'pool_size':10,
+            'max_overflow':10,
+            'pool_timeout':10,
+            'pool_recycle':1800,  # below typical proxy/LB idle timeouts
+            'pool_pre_ping':True,
+        },
+        'statement_timeout':30000,  # ms
+    },
+}
+
+PROFILE_BACKENDS={
+    'sqlite':'sqlite',
+    'postgresql':'postgres',
+}
+
+
+def resolve_profile(database_url, name='auto', overrides=None):
+    # Returns a copy of the named profile with any non-None overrides applied.
+    # Overrides use the keys of the "options" dict plus "statement_timeout" and
+    # "busy_timeout".
+    if name=='auto':
+        name=PROFILE_BACKENDS.get(make_url(database_url).get_backend_name(), 'default') if database_url else 'default'
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f'Unknown database profile "{name}", expected one of {", ".join(ENGINE_PROFILES)}')
+    base=ENGINE_PROFILES[name]
+    profile={'name':name, 'options':dict(base.get('options', {})), 'pragmas':dict(base.get('pragmas', {}))}
+    if 'statement_timeout' in base:
+        profile['statement_timeout']=base['statement_timeout']
+    for key, value in (overrides or {}).items():
+        if value is None:
+            continue
+        if key=='busy_timeout' and profile['pragmas']:
+            profile['pragmas']['busy_timeout']=value
+        elif key=='statement_timeout' and 'statement_timeout' in profile:
+            profile['statement_timeout']=value
+        elif key in profile['options']:
+            profile['options'][key]=value
+    return profile
+
+
+def engine_options(profile):
+    #create_engine keyword arguments, i.e. SQLALCHEMY_ENGINE_OPTIONS
+    return dict(profile['options'])
+
+
+def connect_statements(profile):
+    statements=[f'PRAGMA {key}={value}' for key, value in profile['pragmas'].items()]
+    if profile.get('statement_timeout') is not None:
+        statements.append(f"SET statement_timeout={int(profile['statement_timeout'])}")
+    return statements
+
+
+def tune_engine(engine, profile):
+    # Runs the profile's per-connection settings on every new DBAPI connection.
+    # Works for sync engines and for async_engine.sync_engine.
+    statements=connect_statements(profile)
+    if not statements:
+        return
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor=dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        #a rolled back transaction would undo SET, so commit before the pool hands it out
+        dbapi_connection.commit()
+
+    event.listen(engine, 'connect', on_connect)
@@ -0,0 +1,85 @@
+import json
+from werkzeug.exceptions import Unauthorized
+from .cache import TTLCache
+
+DEFAULT_TTL=60
+DEFAULT_MAX_SIZE=10000
+
+
+class IdentityCache(TTLCache):
+    # In-process LRU of user_id -> public profile with a TTL, so authenticated
+    # requests do not need a users lookup. User.update_user/delete_user
+    # invalidate entries; other processes see the change once the TTL expires.
+    def __init__(self, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        super().__init__(ttl, max_size)
+
+    def init_app(self, app):
+        self.ttl=app.config.get('IDENTITY_CACHE_TTL', DEFAULT_TTL)
+        self.max_size=app.config.get('IDENTITY_CACHE_SIZE', DEFAULT_MAX_SIZE)
+        self.clear()
+
+
+class UserGone(Unauthorized):
+    # Raised by a write whose user was deleted while this process still had
+    # them cached: a 401 with the handlers' JSON body instead of an
+    # IntegrityError further down the transaction.
+    def __init__(self):
+        super().__init__()
+        self.data={'error':'Unauthorized'}
+
+    def get_body(self, environ=None, scope=None):
+        return json.dumps(self.data, separators=(',', ':'))
+
+    def get_headers(self, environ=None, scope=None):
+        return [('Content-Type', 'application/json')]
+
+
+class Principal:
+    # The authenticated user as seen by handlers. id and the public profile
+    # fields come from the cache; the full User row is only loaded when
+    # something else is accessed.
+    def __init__(self, id, profile):
+        self.id=id
+        self.profile=profile
+        self._user=None
+
+    @property
+    def user(self):
+        if self._user is None:
+            from . import db
+            from .user import User
+            self._user=db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        profile=self.__dict__.get('profile') or {}
+        if name in profile:
+            return profile[name]
+        return getattr(self.user, name)
+
+
+identity_cache=IdentityCache()
+
+
+def profile_query(user_id):
+    from . import db
+    from .user import User, user_serializer
+    return db.select(*user_serializer.projection()).filter(User.id==user_id)
+
+
+def principal_from_row(user_id, row):
+    if row is None:
+        return None
+    from .user import user_serializer
+    profile=user_serializer.from_row(row)
+    identity_cache.set(user_id, profile)
+    return Principal(user_id, profile)
+
+
+def load_principal(user_id):
+    #returns None when the user no longer exists
+    profile=identity_cache.get(user_id)
+    if profile is not None:
+        return Principal(user_id, profile)
+    from . import db
+    return principal_from_row(user_id, db.session.execute(profile_query(user_id)).first())
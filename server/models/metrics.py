@@ -0,0 +1,94 @@
+import time
+from contextvars import ContextVar
+
+
+class RequestStats:
+    # Work done on behalf of the current request, filled in by the engine
+    # event hooks (statements, rows fetched from cursors), the serializers
+    # and the JSON provider.
+    __slots__=('start', 'db_time', 'statements', 'rows', 'serialize_time', 'statement_counts')
+
+    def __init__(self, track_statements=False):
+        self.start=time.perf_counter()
+        self.db_time=0.0
+        self.statements=0
+        self.rows=0
+        self.serialize_time=0.0
+        #SQL text -> executions, only kept in query budget mode
+        self.statement_counts={} if track_statements else None
+
+    def repeated_statements(self, threshold):
+        # Statements run at least threshold times: the same SQL with different
+        # parameters, which is what a lazy load inside a loop looks like.
+        if not self.statement_counts:
+            return {}
+        return {statement:count for statement, count in self.statement_counts.items() if count >= threshold}
+
+
+#None outside a request, so CLI commands and background threads record nothing
+current_stats=ContextVar('current_stats', default=None)
+
+
+def record_statement_time(elapsed):
+    stats=current_stats.get()
+    if stats is not None:
+        stats.db_time+=elapsed
+
+
+def record_statement(elapsed, statement=None):
+    stats=current_stats.get()
+    if stats is not None:
+        stats.db_time+=elapsed
+        stats.statements+=1
+        if stats.statement_counts is not None:
+            stats.statement_counts[statement]=stats.statement_counts.get(statement, 0) + 1
+
+
+def record_rows(rows):
+    stats=current_stats.get()
+    if stats is not None:
+        stats.rows+=rows
+
+
+def record_serialization(elapsed):
+    stats=current_stats.get()
+    if stats is not None:
+        stats.serialize_time+=elapsed
+
+
+class CountingCursor:
+    # Stands in for a DB-API cursor once a statement has run and counts the
+    # rows fetched through it, however the result is consumed (all at once,
+    # partitions of a streamed export, a single first()). Fetch time counts
+    # as database time, a server-side cursor does its I/O there.
+    __slots__=('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor=cursor
+
+    def _fetched(self, start, rows):
+        record_statement_time(time.perf_counter() - start)
+        record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        start=time.perf_counter()
+        return self._fetched(start, self._cursor.fetchall())
+
+    def fetchmany(self, *args):
+        start=time.perf_counter()
+        return self._fetched(start, self._cursor.fetchmany(*args))
+
+    def fetchone(self):
+        start=time.perf_counter()
+        row=self._cursor.fetchone()
+        record_statement_time(time.perf_counter() - start)
+        if row is not None:
+            record_rows(1)
+        return row
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE=50
+MAX_PAGE_SIZE=200
+
+
+def parse_int(value, name):
+    #query string integers; a malformed one is a client error, not a missing filter
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name} "{value}", expected an integer')
+
+
+def clamp_limit(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(parse_int(limit, 'limit'), MAX_PAGE_SIZE))
+
+
+def _encode(payload):
+    data=json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    padded=cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(task_date, task_id):
+    #opaque token holding the (date, id) position of the last row on a page
+    return _encode({'d':task_date.isoformat(), 'i':task_id})
+
+
+def decode_cursor(cursor):
+    try:
+        payload=_decode(cursor)
+        return datetime.strptime(payload['d'], '%Y-%m-%d').date(), int(payload['i'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def encode_sync_cursor(version, issued_at):
+    #opaque token holding the data version a client has seen and when it was issued
+    return _encode({'v':version, 't':int(issued_at)})
+
+
+def decode_sync_cursor(cursor):
+    try:
+        payload=_decode(cursor)
+        return int(payload['v']), int(payload['t'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    value=str(value).strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'Invalid boolean value "{value}"')
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD='scrypt'
+DEFAULT_SALT_LENGTH=16
+LATENCY_WINDOW=1024
+
+
+class HasherBusy(ServiceUnavailable):
+    # 503 with Retry-After and the same JSON error body as the handlers, from
+    # plain views (get_response) and Resources (Flask-RESTful reads .data) alike.
+    description='Too many password operations in progress, please retry shortly'
+
+    def __init__(self, retry_after=None):
+        super().__init__(retry_after=retry_after)
+        self.data={'error':self.description}
+
+    def get_body(self, environ=None, scope=None):
+        return json.dumps(self.data, separators=(',', ':'))
+
+    def get_headers(self, environ=None, scope=None):
+        headers=[(key, value) for key, value in super().get_headers(environ, scope) if key.lower()!='content-type']
+        return [('Content-Type', 'application/json')] + headers
+
+
+class PasswordHasher:
+    # Runs password hashing in a bounded process pool so a signup/login burst
+    # cannot pin the request workers. With workers=0 hashing runs inline.
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH, workers=0, max_pending=None):
+        self._pool=None
+        self._rehash_pool=None
+        self._lock=threading.Lock()
+        self._latencies={'hash':deque(maxlen=LATENCY_WINDOW), 'verify':deque(maxlen=LATENCY_WINDOW)}
+        self._totals={'hash':[0, 0.0], 'verify':[0, 0.0], 'rehash':[0, 0.0]}
+        self._rejected=0
+        self.configure(method, salt_length, workers, max_pending)
+
+    def configure(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH, workers=0, max_pending=None):
+        self.shutdown()
+        self.method=method
+        self.salt_length=salt_length
+        self.workers=workers
+        self.max_pending=max_pending if max_pending is not None else max(workers, 1) * 4
+        self._slots=threading.BoundedSemaphore(self.max_pending)
+        self._prefix=None
+
+    def init_app(self, app):
+        self.configure(
+            method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            salt_length=app.config.get('PASSWORD_HASH_SALT_LENGTH', DEFAULT_SALT_LENGTH),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', 0),
+            max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING')
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool=None
+
+    def _executor(self):
+        #created lazily so every gunicorn worker gets its own pool after the fork
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool=ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def _run(self, kind, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected+=1
+            raise HasherBusy(retry_after=1)
+        start=time.perf_counter()
+        try:
+            if self.workers:
+                return self._executor().submit(fn, *args).result()
+            return fn(*args)
+        finally:
+            self._slots.release()
+            self._record(kind, time.perf_counter() - start)
+
+    def _record(self, kind, elapsed):
+        #request threads and the rehash thread record concurrently
+        with self._lock:
+            totals=self._totals[kind]
+            totals[0]+=1
+            totals[1]+=elapsed
+            if kind in self._latencies:
+                self._latencies[kind].append(elapsed)
+
+    def hash(self, password):
+        return self._run('hash', generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run('verify', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        #werkzeug stores the fully expanded parameters before the first "$"
+        if self._prefix is None:
+            self._prefix=generate_password_hash('', self.method, 1).split('$', 1)[0]
+        return password_hash.split('$', 1)[0]!=self._prefix
+
+    def rehash_in_background(self, app, user_id, old_hash, password):
+        if self._rehash_pool is None:
+            with self._lock:
+                if self._rehash_pool is None:
+                    self._rehash_pool=ThreadPoolExecutor(1, thread_name_prefix='rehash')
+        self._rehash_pool.submit(self._rehash, app, user_id, old_hash, password)
+
+    def _rehash(self, app, user_id, old_hash, password):
+        from . import db
+        from .user import User
+        try:
+            #counted under rehash only, not as a signup/password-change hash
+            new_hash=self._run('rehash', generate_password_hash, password, self.method, self.salt_length)
+        except HasherBusy:
+            #try again on the next login
+            return
+        with app.app_context():
+            #compare-and-set so a concurrent password change is never overwritten
+            db.session.execute(
+                db.update(User).where(User.id==user_id, User.password==old_hash).values(password=new_hash)
+            )
+            db.session.commit()
+
+    def stats(self):
+        with self._lock:
+            rejected=self._rejected
+            totals={kind:tuple(values) for kind, values in self._totals.items()}
+            windows={kind:sorted(latencies) for kind, latencies in self._latencies.items()}
+        stats={'method':self.method, 'workers':self.workers, 'max_pending':self.max_pending, 'rejected':rejected}
+        for kind, (count, total) in totals.items():
+            entry={'count':count, 'avg_ms':round(total / count * 1000, 2) if count else None}
+            window=windows.get(kind, ())
+            if window:
+                entry['p50_ms']=round(window[len(window) // 2] * 1000, 2)
+                entry['p95_ms']=round(window[min(len(window) - 1, int(len(window) * 0.95))] * 1000, 2)
+                entry['max_ms']=round(window[-1] * 1000, 2)
+            stats[kind]=entry
+        return stats
+
+
+password_hasher=PasswordHasher()
@@ -0,0 +1,397 @@
+from . import db
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Index, update, delete, or_
+from datetime import date, datetime, timedelta
+from flask import make_response, jsonify
+import calendar
+from zoneinfo import ZoneInfo
+from .category import Category, category_serializer
+from .pagination import parse_bool
+from .serializers import Serializer, DATE_FORMAT, DATETIME_FORMAT
+from .versions import bump_data_version
+from .tombstone import Tombstone
+from .conflicts import insert_unless_exists
+from .due import check_time, due_at_for, user_timezone
+
+FREQUENCIES=('daily', 'weekly', 'monthly')
+MAX_COUNT=10000
+MAX_INTERVAL=1000
+DEFAULT_WINDOW_DAYS=30
+MAX_WINDOW_DAYS=366
+
+class Recurrence(db.Model):
+    # A repeating task stored once: every `interval` days, weeks or months from
+    # starts_on until ends_on (open-ended when NULL). A count end condition is
+    # turned into ends_on when the rule is created, so every rule is a date
+    # range. Occurrences are expanded per requested window and only become
+    # Task rows (recurrence_id + occurrence_date) once completed or edited.
+    __tablename__='recurrences'
+
+    id: Mapped[int]=mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int]=mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    task: Mapped[str]=mapped_column(String(1000), nullable=False)
+    time: Mapped[str]=mapped_column(String(100), nullable=False)
+    category_id: Mapped[int]=mapped_column(Integer, ForeignKey('categories.id'), nullable=False)
+    frequency: Mapped[str]=mapped_column(String(10), nullable=False)
+    interval: Mapped[int]=mapped_column(Integer, nullable=False, default=1)
+    starts_on: Mapped[date]=mapped_column(Date, nullable=False)
+    ends_on: Mapped[date]=mapped_column(Date, nullable=True)
+    count: Mapped[int]=mapped_column(Integer, nullable=True) #as requested, already folded into ends_on
+    created_at: Mapped[date]=mapped_column(Date, default=datetime.utcnow)
+    updated_at: Mapped[datetime]=mapped_column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version: Mapped[int]=mapped_column(Integer, nullable=False, default=0, server_default='0') #owner's data_version at the last change, see /sync
+
+    category: Mapped['Category']=relationship('Category')
+
+    __table_args__=(
+        Index('idx_recurrence_user_starts_on', 'user_id', 'starts_on'), #rules already started by the end of a window
+        Index('idx_recurrence_user_version', 'user_id', 'version'), #for /sync, rows changed after a version
+    )
+
+    def __repr__(self):
+        return f"<Recurrence {self.id}: {self.task}>"
+
+    @classmethod
+    def _rule_values(cls, data, category):
+        #validate a new rule and map it to column values
+        if not isinstance(data, dict):
+            raise ValueError('Provide the recurrence as an object')
+        if not data.get('task'):
+            raise ValueError('Task description cannot be empty. Please provide a task description')
+        check_time(data.get('time'))
+        if category is None:
+            raise ValueError(f'Category {data.get("category_id")} does not exist or does not belong to you')
+        if data.get('frequency') not in FREQUENCIES:
+            raise ValueError(f'Frequency must be one of: {", ".join(FREQUENCIES)}')
+        interval=int(data.get('interval') or 1)
+        if not 1 <= interval <= MAX_INTERVAL:
+            raise ValueError(f'Interval must be between 1 and {MAX_INTERVAL}')
+        if not data.get('starts_on'):
+            raise ValueError('starts_on is required')
+        starts_on=date.fromisoformat(data['starts_on'])
+        ends_on=date.fromisoformat(data['until']) if data.get('until') else None
+        if ends_on is not None and ends_on < starts_on:
+            raise ValueError('until cannot be before starts_on')
+        count=None
+        if data.get('count') is not None:
+            count=int(data['count'])
+            if not 1 <= count <= MAX_COUNT:
+                raise ValueError(f'count must be between 1 and {MAX_COUNT}')
+            try:
+                last=occurrence(starts_on, data['frequency'], interval, count - 1)
+            except OverflowError:
+                raise ValueError('The last occurrence would be after the year 9999, use a lower count or interval')
+            ends_on=last if ends_on is None else min(ends_on, last)
+        return {
+            'task':data['task'],
+            'time':data['time'],
+            'category_id':category.id,
+            'frequency':data['frequency'],
+            'interval':interval,
+            'starts_on':starts_on,
+            'ends_on':ends_on,
+            'count':count
+        }
+
+    @classmethod
+    def _owned_category(cls, category_id, user_id):
+        return db.session.execute(
+            db.select(Category).filter(Category.id==category_id, Category.created_by==user_id)
+        ).scalar()
+
+    @classmethod
+    def add_recurrence(cls, data, user_id):
+        try:
+            category=cls._owned_category(data.get('category_id'), user_id) if isinstance(data, dict) else None
+            values=cls._rule_values(data, category)
+        except (ValueError, TypeError, OverflowError) as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+
+        new_rule=cls(user_id=user_id, version=bump_data_version(user_id), **values)
+        new_rule.category=category
+        db.session.add(new_rule)
+        db.session.flush()
+        #serialize before commit so the expired instance is not reloaded
+        response_body=recurrence_serializer(new_rule)
+        db.session.commit()
+        return make_response(jsonify(response_body), 201)
+
+    @classmethod
+    def get_recurrences(cls, user_id):
+        rows=db.session.execute(
+            db.select(*recurrence_serializer.projection())
+            .join(Category, cls.category_id==Category.id)
+            .filter(cls.user_id==user_id)
+            .order_by(cls.starts_on, cls.id)
+        ).all()
+        return make_response(jsonify(recurrence_serializer.from_rows(rows)), 200)
+
+    @classmethod
+    def update_recurrence(cls, id, data, user_id):
+        # Description, time and category change every occurrence not yet
+        # materialized; until (null for open-ended) moves the end of the series
+        # and replaces a count end condition, which is cleared.
+        if not isinstance(data, dict):
+            data={}
+        values={key:data[key] for key in ('task', 'time') if data.get(key)}
+        try:
+            if 'time' in values:
+                check_time(values['time'])
+            if 'until' in data:
+                values['ends_on']=date.fromisoformat(data['until']) if data['until'] else None
+                values['count']=None
+            if data.get('category_id') is not None:
+                if cls._owned_category(data['category_id'], user_id) is None:
+                    raise ValueError(f'Category {data["category_id"]} does not exist or does not belong to you')
+                values['category_id']=data['category_id']
+        except (ValueError, TypeError, OverflowError) as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+        if not values:
+            return make_response(jsonify({
+                'error':'Nothing to update'
+            }), 400)
+
+        values['version']=bump_data_version(user_id)
+        query=update(cls).where(cls.id==id, cls.user_id==user_id)
+        if values.get('ends_on') is not None:
+            #checked in the UPDATE, starts_on is not loaded
+            query=query.where(cls.starts_on <= values['ends_on'])
+        updated_id=db.session.execute(query.values(values).returning(cls.id)).scalar()
+        if updated_id is None:
+            db.session.rollback()
+            if values.get('ends_on') is not None and db.session.execute(
+                db.select(cls.id).filter(cls.id==id, cls.user_id==user_id)
+            ).first() is not None:
+                response_body={
+                    'error':'until cannot be before starts_on'
+                }
+                status_code=400
+            else:
+                response_body={
+                    'error':f'Recurrence {id} not found or does not belong to the current user'
+                }
+                status_code=404
+        else:
+            db.session.commit()
+            response_body={
+                'msg':f'Recurrence {id} updated successfully',
+                'id':id
+            }
+            status_code=200
+        return make_response(jsonify(response_body), status_code)
+
+    @classmethod
+    def delete_rules(cls, user_id, version, *criteria):
+        # Deletes the owner's rules matching criteria and returns their ids.
+        # Occurrences already materialized stay as ordinary tasks.
+        from .task import Task
+        rules=db.select(cls.id).filter(cls.user_id==user_id, *criteria)
+        db.session.execute(
+            update(Task).where(Task.recurrence_id.in_(rules)).values(recurrence_id=None, version=version),
+            execution_options={'synchronize_session':False}
+        )
+        return db.session.execute(
+            delete(cls).where(cls.user_id==user_id, *criteria).returning(cls.id)
+        ).scalars().all()
+
+    @classmethod
+    def delete_recurrence(cls, id, user_id):
+        version=bump_data_version(user_id)
+        if not cls.delete_rules(user_id, version, cls.id==id):
+            db.session.rollback()
+            response_body={
+                'error':f'Recurrence {id} not found or does not belong to the current user'
+            }
+            status_code=404
+        else:
+            Tombstone.record(user_id, version, recurrences=[id])
+            db.session.commit()
+            response_body={
+                'msg':f'Successfully deleted recurrence {id}'
+            }
+            status_code=200
+        return make_response(jsonify(response_body), status_code)
+
+    @classmethod
+    def get_occurrences(cls, user_id, date_from=None, date_to=None):
+        # Every occurrence in [date_from, date_to]: virtual ones expanded from
+        # the rules (id null) and the materialized Task rows replacing them.
+        # Both queries are range scans bounded by the window, and expansion
+        # jumps straight to the window, so old rules cost nothing extra.
+        from .task import Task, task_serializer
+        timezone=user_timezone(user_id)
+        try:
+            #the default window starts on the user's today
+            date_from=date.fromisoformat(date_from) if date_from else datetime.now(ZoneInfo(timezone)).date()
+            date_to=date.fromisoformat(date_to) if date_to else date_from + timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+        except ValueError as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+        if date_to < date_from or (date_to - date_from).days >= MAX_WINDOW_DAYS:
+            return make_response(jsonify({
+                'error':f'date_to must be on or after date_from and at most {MAX_WINDOW_DAYS} days later'
+            }), 400)
+
+        rules=db.session.execute(
+            db.select(*recurrence_serializer.projection())
+            .join(Category, cls.category_id==Category.id)
+            .filter(cls.user_id==user_id, cls.starts_on <= date_to, or_(cls.ends_on.is_(None), cls.ends_on >= date_from))
+        ).all()
+        occurrences=[]
+        if rules:
+            rows=db.session.execute(
+                db.select(*task_serializer.projection())
+                .join(Category, Task.category_id==Category.id)
+                .filter(
+                    Task.user_id==user_id,
+                    Task.recurrence_id.in_([rule.id for rule in rules]),
+                    Task.occurrence_date.between(date_from, date_to)
+                )
+            ).all()
+            occurrences=task_serializer.from_rows(rows)
+            materialized={(row.recurrence_id, row.occurrence_date) for row in rows}
+            for rule, body in zip(rules, recurrence_serializer.from_rows(rules)):
+                for day in expand(rule.starts_on, rule.frequency, rule.interval, rule.ends_on, date_from, date_to):
+                    if (rule.id, day) in materialized:
+                        continue
+                    occurrences.append(dict(
+                        dict.fromkeys(task_serializer.fields),
+                        task=rule.task,
+                        date=day.isoformat(),
+                        time=rule.time,
+                        due_at=due_at_for(day, rule.time, timezone).strftime(DATETIME_FORMAT),
+                        category_id=rule.category_id,
+                        is_complete=False,
+                        user_id=user_id,
+                        recurrence_id=rule.id,
+                        occurrence_date=day.isoformat(),
+                        category=body['category']
+                    ))
+        occurrences.sort(key=lambda occurrence: (occurrence['date'], occurrence['recurrence_id'] or 0))
+        return make_response(jsonify({
+            'date_from':date_from,
+            'date_to':date_to,
+            'occurrences':occurrences
+        }), 200)
+
+    @classmethod
+    def materialize(cls, id, occurrence_date, data, user_id):
+        # Turns one occurrence into a Task row, optionally completed or with a
+        # different description or time. Later edits go through /task/<id>.
+        from .task import Task
+        if not isinstance(data, dict):
+            data={}
+        try:
+            day=date.fromisoformat(occurrence_date)
+            is_complete=parse_bool(data.get('is_complete')) or False
+            if data.get('time'):
+                check_time(data['time'])
+        except ValueError as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+
+        version=bump_data_version(user_id)
+        rule=db.session.execute(
+            db.select(cls.task, cls.time, cls.category_id, cls.frequency, cls.interval, cls.starts_on, cls.ends_on)
+            .filter(cls.id==id, cls.user_id==user_id)
+        ).first()
+        if rule is None:
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':f'Recurrence {id} not found or does not belong to the current user'
+            }), 404)
+        if not is_occurrence(rule.starts_on, rule.frequency, rule.interval, rule.ends_on, day):
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':f'{day.isoformat()} is not an occurrence of recurrence {id}'
+            }), 400)
+
+        values={
+            'task':data.get('task') or rule.task,
+            'date':day,
+            'time':data.get('time') or rule.time,
+            'category_id':rule.category_id,
+            'is_complete':is_complete,
+            'user_id':user_id,
+            'recurrence_id':id,
+            'occurrence_date':day,
+            'version':version
+        }
+        values['due_at']=due_at_for(day, values['time'], user_timezone(user_id))
+        #the unique (recurrence_id, occurrence_date) index keeps concurrent requests to one row
+        new_task=insert_unless_exists(Task, values, ['recurrence_id', 'occurrence_date'], Task.id)
+        if new_task is None:
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':'This occurrence is already a task, edit it with PATCH /task/<id>'
+            }), 409)
+        db.session.commit()
+        del values['version']
+        #same date formats as task_serializer
+        values.update(
+            id=new_task.id,
+            date=day.strftime(DATE_FORMAT),
+            occurrence_date=day.strftime(DATE_FORMAT),
+            due_at=values['due_at'].strftime(DATETIME_FORMAT)
+        )
+        return make_response(jsonify(values), 201)
+
+
+recurrence_serializer=Serializer(Recurrence, exclude=('version',), nested={'category':category_serializer})
+
+
+def _add_months(day, months):
+    #same day of the month, or the month's last day when it is shorter
+    month_index=day.month - 1 + months
+    year=day.year + month_index // 12
+    month=month_index % 12 + 1
+    if year > date.max.year:
+        raise OverflowError('date value out of range')
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(starts_on, frequency, interval, n):
+    #the n-th occurrence, counting from 0, without walking the ones before it
+    if frequency=='monthly':
+        return _add_months(starts_on, n * interval)
+    return starts_on + timedelta(days=n * interval * (7 if frequency=='weekly' else 1))
+
+
+def _first_index(starts_on, frequency, interval, day):
+    #index of the first occurrence on or after day
+    if day <= starts_on:
+        return 0
+    if frequency=='monthly':
+        n=((day.year - starts_on.year) * 12 + day.month - starts_on.month) // interval
+    else:
+        n=(day - starts_on).days // (interval * (7 if frequency=='weekly' else 1))
+    while occurrence(starts_on, frequency, interval, n) < day:
+        n+=1
+    return n
+
+
+def expand(starts_on, frequency, interval, ends_on, date_from, date_to):
+    #occurrence dates in [date_from, date_to]; costs the occurrences in the window, not the rule's age
+    last=date_to if ends_on is None else min(date_to, ends_on)
+    n=_first_index(starts_on, frequency, interval, date_from)
+    day=occurrence(starts_on, frequency, interval, n)
+    while day <= last:
+        yield day
+        n+=1
+        try:
+            day=occurrence(starts_on, frequency, interval, n)
+        except OverflowError:
+            #the series runs past date.max
+            return
+
+
+def is_occurrence(starts_on, frequency, interval, ends_on, day):
+    if day < starts_on or (ends_on is not None and day > ends_on):
+        return False
+    return occurrence(starts_on, frequency, interval, _first_index(starts_on, frequency, interval, day))==day
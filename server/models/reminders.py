@@ -0,0 +1,232 @@
+import heapq
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from . import db
+
+DEFAULT_HORIZON=3600
+DEFAULT_BATCH_SIZE=5000
+DEFAULT_POLL_INTERVAL=10
+#changes are re-read this far back: a transaction stamps users.data_changed_at before it commits
+POLL_OVERLAP=timedelta(seconds=60)
+RETRY_DELAY=5 #seconds after a failed iteration
+USERS_PER_REFRESH=500
+TASKS_PER_CHECK=500
+
+logger=logging.getLogger(__name__)
+
+Reminder=namedtuple('Reminder', ('task_id', 'user_id', 'task', 'due_at'))
+
+
+class ReminderScheduler:
+    # Calls the registered hooks with a Reminder when an incomplete task
+    # comes due. Runs in a process of its own, `flask run-reminders`, never
+    # in the web workers: every running scheduler fires every reminder.
+    # Only the deadlines of the next REMINDER_HORIZON seconds are held, in a
+    # heap ordered by due_at; the window is read in keyset batches off the
+    # due_at index as it advances, so each task is read about once, not once
+    # per poll. Every REMINDER_POLL_INTERVAL seconds the users whose data
+    # changed since the last poll are read off the users.data_changed_at
+    # index, which every task/category change stamps whatever process made
+    # it, and only their part of the window is reloaded. Entries made stale
+    # by a reload stay in the heap and are skipped when popped. Due reminders
+    # are checked against the database before they fire, so a task completed
+    # or deleted after the last poll does not fire.
+    def __init__(self, app=None):
+        self.hooks=[]
+        self.app=None
+        self.fired=0
+        self.refreshes=0
+        self.failures=0
+        self._heap=[]
+        self._scheduled={} #task id -> its current Reminder
+        self._by_user={} #user id -> scheduled task ids
+        self._loaded_until=None
+        self._fired_until=None #everything due up to here has been fired or skipped
+        self._polled_until=None
+        self._seen={} #user id -> data_changed_at already refreshed, inside the poll overlap
+        self._stopping=threading.Event()
+        self._running=False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REMINDER_HORIZON', DEFAULT_HORIZON)
+        app.config.setdefault('REMINDER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        app.config.setdefault('REMINDER_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        self.app=app
+
+    def hook(self, fn):
+        #decorator; hooks run on the scheduler's loop, inside an app context
+        self.hooks.append(fn)
+        return fn
+
+    def run(self):
+        # The scheduler loop, until stop() is called from another thread or a
+        # signal handler. A failed iteration is logged and retried.
+        horizon=timedelta(seconds=self.app.config['REMINDER_HORIZON'])
+        poll_interval=timedelta(seconds=self.app.config['REMINDER_POLL_INTERVAL'])
+        self._stopping.clear()
+        self._running=True
+        try:
+            while not self._stopping.is_set():
+                delay=RETRY_DELAY
+                try:
+                    with self.app.app_context():
+                        delay=self.step(horizon, poll_interval)
+                except Exception:
+                    logger.exception('Reminder scheduler iteration failed')
+                    self.failures+=1
+                self._stopping.wait(delay)
+        finally:
+            self._running=False
+
+    def stop(self):
+        self._stopping.set()
+
+    def step(self, horizon, poll_interval):
+        #one iteration; returns the seconds until the next one is due
+        now=datetime.utcnow()
+        #load ahead once half of the window has passed
+        if self._loaded_until is None or self._loaded_until - now < horizon / 2:
+            self._load_window(now, now + horizon)
+            logger.info('Reminder window loaded: %s', self.stats())
+        self._poll(now)
+        self._fire(now)
+        return self._next_wakeup(horizon, poll_interval)
+
+    def _query(self):
+        from .task import Task
+        return db.select(Task.id, Task.user_id, Task.task, Task.due_at).filter(Task.is_complete.is_not(True))
+
+    def _load_window(self, now, until):
+        # Deadlines in (loaded_until, until], batch by batch in (due_at, id)
+        # order; the first load starts at now, what is already due is skipped.
+        from .task import Task
+        if self._loaded_until is None:
+            self._loaded_until=self._fired_until=self._polled_until=now
+        start=self._loaded_until
+        batch_size=self.app.config['REMINDER_BATCH_SIZE']
+        after=None
+        while True:
+            query=self._query().filter(Task.due_at > start, Task.due_at <= until)
+            if after is not None:
+                query=query.filter(or_(Task.due_at > after[0], and_(Task.due_at==after[0], Task.id > after[1])))
+            rows=db.session.execute(query.order_by(Task.due_at, Task.id).limit(batch_size)).all()
+            for row in rows:
+                self._schedule(Reminder(*row))
+            if len(rows) < batch_size:
+                break
+            after=(rows[-1].due_at, rows[-1].id)
+        self._loaded_until=until
+
+    def _poll(self, now):
+        # Users changed since the last poll, less the overlap, so a change
+        # stamped before the previous poll but committed after it is still
+        # seen. A user is reloaded once per stamp, not once per poll.
+        from .user import User
+        since=self._polled_until - POLL_OVERLAP
+        rows=db.session.execute(
+            db.select(User.id, User.data_changed_at).filter(User.data_changed_at > since)
+        ).all()
+        changed=[user_id for user_id, changed_at in rows if self._seen.get(user_id)!=changed_at]
+        if changed:
+            self._refresh(changed)
+        self._seen={user_id:changed_at for user_id, changed_at in rows}
+        self._polled_until=now
+
+    def _refresh(self, user_ids):
+        #replaces the users' scheduled reminders with what the database holds now
+        from .task import Task
+        for user_id in user_ids:
+            for task_id in self._by_user.pop(user_id, ()):
+                self._scheduled.pop(task_id, None)
+        user_ids=list(user_ids)
+        for offset in range(0, len(user_ids), USERS_PER_REFRESH):
+            rows=db.session.execute(
+                self._query().filter(
+                    Task.user_id.in_(user_ids[offset:offset + USERS_PER_REFRESH]),
+                    Task.due_at > self._fired_until,
+                    Task.due_at <= self._loaded_until
+                )
+            ).all()
+            for row in rows:
+                self._schedule(Reminder(*row))
+        self.refreshes+=len(user_ids)
+        if len(self._heap) > 2 * len(self._scheduled) + 1024:
+            #mostly stale entries, rebuild from the live ones
+            self._heap=[(reminder.due_at, task_id, reminder) for task_id, reminder in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def _schedule(self, reminder):
+        self._scheduled[reminder.task_id]=reminder
+        self._by_user.setdefault(reminder.user_id, set()).add(reminder.task_id)
+        heapq.heappush(self._heap, (reminder.due_at, reminder.task_id, reminder))
+
+    def _unschedule(self, reminder):
+        del self._scheduled[reminder.task_id]
+        user_tasks=self._by_user[reminder.user_id]
+        user_tasks.discard(reminder.task_id)
+        if not user_tasks:
+            del self._by_user[reminder.user_id]
+
+    def _pending(self, reminders):
+        #(task id, due_at) of the reminders whose task is still incomplete and due then
+        from .task import Task
+        pending=set()
+        for offset in range(0, len(reminders), TASKS_PER_CHECK):
+            ids=[reminder.task_id for reminder in reminders[offset:offset + TASKS_PER_CHECK]]
+            pending.update(db.session.execute(
+                db.select(Task.id, Task.due_at).filter(Task.id.in_(ids), Task.is_complete.is_not(True))
+            ).all())
+        return pending
+
+    def _fire(self, now):
+        due=[]
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id, reminder=heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) is reminder:
+                due.append(reminder)
+        if due:
+            try:
+                pending=self._pending(due)
+            except Exception:
+                #still scheduled, the next iteration tries again
+                for reminder in due:
+                    heapq.heappush(self._heap, (reminder.due_at, reminder.task_id, reminder))
+                raise
+            for reminder in due:
+                self._unschedule(reminder)
+                if (reminder.task_id, reminder.due_at) not in pending:
+                    #completed, deleted or moved since it was loaded
+                    continue
+                self.fired+=1
+                for hook in self.hooks:
+                    try:
+                        hook(reminder)
+                    except Exception:
+                        logger.exception('Reminder hook %r failed for task %s', hook, reminder.task_id)
+        self._fired_until=now
+
+    def _next_wakeup(self, horizon, poll_interval):
+        #seconds until the next deadline, poll or window load, whichever is first
+        now=datetime.utcnow()
+        wakeup=min(self._loaded_until - horizon / 2, now + poll_interval)
+        if self._heap:
+            wakeup=min(wakeup, self._heap[0][0])
+        return max(0, (wakeup - now).total_seconds())
+
+    def stats(self):
+        return {
+            'running':self._running,
+            'scheduled':len(self._scheduled),
+            'fired':self.fired,
+            'refreshes':self.refreshes,
+            'failures':self.failures,
+            'loaded_until':self._loaded_until.strftime('%Y-%m-%d %H:%M:%S') if self._loaded_until else None
+        }
+
+
+reminder_scheduler=ReminderScheduler()
@@ -0,0 +1,72 @@
+import threading
+import uuid
+from .cache import CacheBackend, TTLCache
+
+DEFAULT_TTL=300
+DEFAULT_MAX_SIZE=5000
+
+
+class ResponseCache:
+    # Serialized 200 bodies of the conditional GET endpoints, per user and URL.
+    # Keys carry a per-user generation: invalidate(user_id), called by every
+    # task/category mutation, replaces it so all of that user's entries become
+    # unreachable at once and age out of the backend. Entries also remember
+    # the data_version they were built at and only hit while it is current,
+    # so a write handled by another worker is never served stale. The store
+    # is any CacheBackend given to init_app, an in-process TTLCache by default.
+    def __init__(self, backend=None):
+        self.backend=backend
+        self.hits=0
+        self.misses=0
+        self.invalidations=0
+        self._lock=threading.Lock()
+
+    def init_app(self, app, backend=None):
+        app.config.setdefault('RESPONSE_CACHE_TTL', DEFAULT_TTL)
+        app.config.setdefault('RESPONSE_CACHE_SIZE', DEFAULT_MAX_SIZE)
+        if backend is None:
+            backend=TTLCache(app.config['RESPONSE_CACHE_TTL'], app.config['RESPONSE_CACHE_SIZE'])
+        if not isinstance(backend, CacheBackend):
+            raise TypeError(f'Response cache backend must be a CacheBackend, not {type(backend).__name__}')
+        self.backend=backend
+
+    def _generation(self, user_id, renew=False):
+        key=f'generation:{user_id}'
+        generation=None if renew else self.backend.get(key)
+        if generation is None:
+            #also after eviction, so entries from before it can never be reached
+            generation=uuid.uuid4().hex
+            self.backend.set(key, generation)
+        return generation
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, user_id, version, path):
+        if self.backend is None:
+            return None
+        entry=self.backend.get(f'response:{user_id}:{self._generation(user_id)}:{path}')
+        if entry is None or entry[0]!=version:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry[1]
+
+    def set(self, user_id, version, path, data):
+        if self.backend is not None:
+            self.backend.set(f'response:{user_id}:{self._generation(user_id)}:{path}', (version, data))
+
+    def invalidate(self, user_id):
+        if self.backend is not None:
+            self._generation(user_id, renew=True)
+            self._count('invalidations')
+
+    def stats(self):
+        stats={'hits':self.hits, 'misses':self.misses, 'invalidations':self.invalidations}
+        if isinstance(self.backend, TTLCache):
+            stats['entries']=len(self.backend)
+        return stats
+
+
+response_cache=ResponseCache()
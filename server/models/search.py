@@ -0,0 +1,93 @@
+import re
+from sqlalchemy import DDL, event, func, literal_column, table, column
+
+# SQLite: external-content FTS5 table over tasks.task kept in sync by triggers.
+# user_id is indexed as a token so a search only walks the owner's postings.
+SQLITE_DDL=(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(task, user_id, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task, user_id ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, task, user_id) VALUES ('delete', old.id, old.task, old.user_id); "
+    "INSERT INTO tasks_fts(rowid, task, user_id) VALUES (new.id, new.task, new.user_id); END",
+)
+
+# Postgres: GIN index on the tsvector expression the search query uses.
+POSTGRES_DDL=(
+    "CREATE INDEX IF NOT EXISTS idx_task_search ON tasks USING GIN (to_tsvector('english', task))",
+)
+
+SQLITE_TRIGGERS=('tasks_fts_ai', 'tasks_fts_ad', 'tasks_fts_au')
+
+tasks_fts=table('tasks_fts', column('rowid'))
+TOKEN_RE=re.compile(r'\w+', re.UNICODE)
+
+
+def register_search_ddl(tasks_table):
+    #db.create_all() builds the index too, migrations do the same for existing databases
+    for statement in SQLITE_DDL:
+        event.listen(tasks_table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    for statement in POSTGRES_DDL:
+        event.listen(tasks_table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+def has_sqlite_search(connection):
+    return connection.dialect.name=='sqlite' and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name='tasks_fts'"
+    ).first() is not None
+
+
+def suspend_search_triggers(connection):
+    # For bulk loads on SQLite: per-row trigger maintenance costs more than the
+    # insert itself, and DELETE without WHERE only takes the fast truncate path
+    # when no triggers are attached. Call rebuild_search_index afterwards.
+    for name in SQLITE_TRIGGERS:
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def rebuild_search_index(connection):
+    #re-reads every row of the content table and puts the triggers back
+    connection.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    for statement in SQLITE_DDL[1:]:
+        connection.exec_driver_sql(statement)
+
+
+def fts5_query(q, user_id):
+    # Quote every word so user input can never be FTS5 syntax; the last word
+    # is a prefix match for search-as-you-type.
+    tokens=TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    quoted=[f'"{token}"' for token in tokens]
+    quoted[-1]+='*'
+    return f'user_id:"{int(user_id)}" AND task:({" ".join(quoted)})'
+
+
+def search_clauses(dialect, text_column, q, user_id):
+    # Returns (match condition, rank ordering) for the current database, or
+    # None when q has nothing searchable.
+    if dialect=='sqlite':
+        match=fts5_query(q, user_id)
+        if match is None:
+            return None
+        fts_column=literal_column('tasks_fts')
+        #only the task column contributes to the score
+        return fts_column.op('MATCH')(match), func.bm25(fts_column, 1.0, 0.0)
+    if dialect=='postgresql':
+        #the literal config keeps the expression identical to the GIN index
+        vector=func.to_tsvector(literal_column("'english'"), text_column)
+        tsquery=func.websearch_to_tsquery(literal_column("'english'"), q)
+        return vector.op('@@')(tsquery), func.ts_rank(vector, tsquery).desc()
+    #no full-text support, fall back to a substring scan
+    return text_column.ilike(f'%{q}%'), text_column
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    #keep alembic autogenerate from dropping the search objects it cannot see in the models
+    if type_=='table' and name.startswith('tasks_fts'):
+        return False
+    if type_=='index' and name=='idx_task_search':
+        return False
+    return True
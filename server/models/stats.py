@@ -0,0 +1,36 @@
+from collections import defaultdict
+from .cache import TTLCache
+
+STATS_BUCKETS=('day', 'week', 'month')
+
+#user_id -> {'version': data_version, 'buckets': {bucket: stats}}
+stats_cache=TTLCache(ttl=300, max_size=1000)
+
+
+def summarize(total, completed):
+    return {
+        'total':total,
+        'completed':completed,
+        'percentage':round(completed / total * 100, 1) if total else 0
+    }
+
+
+def bucket_key(task_date, bucket):
+    if bucket=='month':
+        return task_date.strftime('%Y-%m')
+    if bucket=='week':
+        year, week, _=task_date.isocalendar()
+        return f'{year}-W{week:02d}'
+    return task_date.isoformat()
+
+
+def rollup_dates(day_counts, bucket):
+    # day_counts holds (date, is_complete, count) rows grouped by the database;
+    # weeks and months are rolled up here so the SQL stays portable.
+    buckets=defaultdict(lambda: [0, 0])
+    for task_date, is_complete, count in day_counts:
+        totals=buckets[bucket_key(task_date, bucket)]
+        totals[0]+=count
+        if is_complete:
+            totals[1]+=count
+    return [dict(bucket=key, **summarize(total, completed)) for key, (total, completed) in sorted(buckets.items())]
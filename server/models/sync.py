@@ -0,0 +1,79 @@
+import time
+from flask import make_response, jsonify, current_app
+from . import db
+from .task import Task, task_serializer
+from .category import Category, category_serializer
+from .recurrence import Recurrence, recurrence_serializer
+from .tombstone import Tombstone, TASK, CATEGORY, RECURRENCE
+from .pagination import encode_sync_cursor, decode_sync_cursor
+from .versions import get_data_version
+
+DEFAULT_TOMBSTONE_DAYS=30
+
+
+def get_changes(user_id, since=None):
+    # Tasks, categories and recurrences created, changed or deleted after the version in
+    # the since cursor, up to the current version returned as the next cursor.
+    # Clients apply "deleted" first, then upsert the rows. Without a cursor, or
+    # with one older than the tombstone retention, the response asks for a
+    # full reload ("reset": true); fetch the cursor before reloading so no
+    # change in between is missed.
+    version=get_data_version(user_id)
+    now=time.time()
+    body={
+        'cursor':encode_sync_cursor(version, now),
+        'reset':False,
+        'tasks':[],
+        'categories':[],
+        'recurrences':[],
+        'deleted':{'tasks':[], 'categories':[], 'recurrences':[]}
+    }
+    if since is None:
+        body['reset']=True
+        return make_response(jsonify(body), 200)
+    try:
+        since_version, issued_at=decode_sync_cursor(since)
+    except ValueError as e:
+        return make_response(jsonify({
+            'error':str(e)
+        }), 400)
+
+    retention=current_app.config.get('SYNC_TOMBSTONE_DAYS', DEFAULT_TOMBSTONE_DAYS) * 86400
+    if issued_at < now - retention or since_version > version:
+        #deletions may have been pruned, or the cursor is from another database
+        body['reset']=True
+        return make_response(jsonify(body), 200)
+    if since_version==version:
+        return make_response(jsonify(body), 200)
+
+    #each is a range scan on the (owner, version) indexes, so the cost follows the number of changes
+    tasks=db.session.execute(
+        db.select(*task_serializer.projection())
+        .join(Category, Task.category_id==Category.id)
+        .filter(Task.user_id==user_id, Task.version > since_version, Task.version <= version)
+    ).all()
+    categories=db.session.execute(
+        db.select(*category_serializer.projection())
+        .filter(Category.created_by==user_id, Category.version > since_version, Category.version <= version)
+    ).all()
+    recurrences=db.session.execute(
+        db.select(*recurrence_serializer.projection())
+        .join(Category, Recurrence.category_id==Category.id)
+        .filter(Recurrence.user_id==user_id, Recurrence.version > since_version, Recurrence.version <= version)
+    ).all()
+    tombstones=db.session.execute(
+        db.select(Tombstone.entity, Tombstone.entity_id)
+        .filter(Tombstone.user_id==user_id, Tombstone.version > since_version, Tombstone.version <= version)
+    ).all()
+
+    body['tasks']=task_serializer.from_rows(tasks)
+    body['categories']=category_serializer.from_rows(categories)
+    body['recurrences']=recurrence_serializer.from_rows(recurrences)
+    for entity, entity_id in tombstones:
+        if entity==TASK:
+            body['deleted']['tasks'].append(entity_id)
+        elif entity==CATEGORY:
+            body['deleted']['categories'].append(entity_id)
+        elif entity==RECURRENCE:
+            body['deleted']['recurrences'].append(entity_id)
+    return make_response(jsonify(body), 200)
@@ -1,9 +1,28 @@
 from . import db
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
-from sqlalchemy import String, Integer, Boolean, Date, ForeignKey, Index
+from sqlalchemy import String, Integer, Boolean, Date, DateTime, ForeignKey, Index, and_, or_, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from datetime import date, datetime
-from flask import make_response, jsonify
+import csv
+import io
+import json
+from flask import make_response, jsonify, current_app, stream_with_context
+from .pagination import clamp_limit, encode_cursor, decode_cursor, parse_bool, parse_int
+from .serializers import Serializer
+from .category import Category, category_serializer
+from .versions import bump_data_version, get_data_version
+from .stats import STATS_BUCKETS, stats_cache, summarize, rollup_dates
+from .search import register_search_ddl, search_clauses, tasks_fts
+from .tombstone import Tombstone
+from .due import DEFAULT_TIMEZONE, check_time, due_at_for, user_timezone
+
+MAX_BATCH_SIZE=500
+EXPORT_CHUNK_SIZE=1000
+EXPORT_FORMATS={'ndjson':'application/x-ndjson', 'csv':'text/csv'}
+IMPORT_CHUNK_SIZE=1000
+RESCHEDULE_BATCH_SIZE=5000
+MAX_IMPORT_ERRORS=1000
 class Task(db.Model, SerializerMixin):
     __tablename__='tasks'
 
@@ -13,9 +32,14 @@ class Task(db.Model, SerializerMixin):
     task: Mapped[str]=mapped_column(String(1000), nullable=False)
     date: Mapped[date]=mapped_column(Date, nullable=False, default=datetime.utcnow)
     time: Mapped[str]=mapped_column(String(100), nullable=False)
+    due_at: Mapped[datetime]=mapped_column(DateTime, nullable=True) #date + parsed time in the owner's timezone, as UTC; kept in step with all three
     category_id: Mapped[int]=mapped_column(Integer, ForeignKey('categories.id'), nullable=False)
     is_complete: Mapped[bool]=mapped_column(Boolean, default=False)
     user_id: Mapped[int]=mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    updated_at: Mapped[datetime]=mapped_column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version: Mapped[int]=mapped_column(Integer, nullable=False, default=0, server_default='0') #owner's data_version at the last change, see /sync
+    recurrence_id: Mapped[int]=mapped_column(Integer, ForeignKey('recurrences.id'), nullable=True) #set on a materialized occurrence
+    occurrence_date: Mapped[date]=mapped_column(Date, nullable=True) #the occurrence it replaces, date may be moved later
 
     user: Mapped['User']=relationship('User', back_populates='tasks')
     category: Mapped['Category']=relationship('Category', back_populates='tasks')
@@ -24,7 +48,12 @@ class Task(db.Model, SerializerMixin):
         Index('idx_task_user_id', 'user_id'), #for filtering tasks by user
         Index('idx_task_category_id', 'category_id'), #for filtering tasks by category
         Index('idx_task_date_user', 'date', 'user_id'), #for filtering tasks by date for a specific user
+        Index('idx_task_user_date_id', 'user_id', 'date', 'id'), #GET /tasks pages: owner, then keyset order, no sort
         Index('idx_task_complete_user', 'is_complete', 'user_id'), #for filtering complete/ incomplete tasks
+        Index('idx_task_user_version', 'user_id', 'version'), #for /sync, rows changed after a version
+        Index('idx_task_recurrence_occurrence', 'recurrence_id', 'occurrence_date', unique=True), #one task per occurrence
+        Index('idx_task_user_due_at', 'user_id', 'due_at'), #a user's tasks by due moment
+        Index('idx_task_due_at', 'due_at'), #upcoming deadlines of every user, for the reminder scheduler
     )
 
     def __repr__(self):
@@ -38,29 +67,225 @@ class Task(db.Model, SerializerMixin):
         
     @classmethod
     def add_task(cls, task, date, time, category_id, user_id):
-        date_obj=datetime.strptime(date, '%Y-%m-%d').date()
-        new_task=cls(
-            task=task,
-            date=date_obj,
-            time=time,
-            category_id=category_id,
-            user_id=user_id
-        )
+        #bump first, every mutation takes the owner's row lock before any other
+        version=bump_data_version(user_id)
+        #validated like a batch item; the category must be one of the user's own
+        category=db.session.execute(
+            db.select(Category).filter(Category.id==category_id, Category.created_by==user_id)
+        ).scalar()
+        try:
+            values=cls._batch_values(
+                {'task':task, 'date':date, 'time':time, 'category_id':category_id},
+                {category.id} if category else set(),
+                timezone=user_timezone(user_id)
+            )
+        except (ValueError, TypeError) as e:
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+        new_task=cls(user_id=user_id, version=version, **values)
+        #already loaded, the serializer does not lazy load it
+        new_task.category=category
         db.session.add(new_task)
+        db.session.flush()
+        #serialize before commit so the expired instance is not reloaded
+        response_body=task_serializer(new_task)
         db.session.commit()
-        return make_response(jsonify(new_task.to_dict()), 201)
+        return make_response(jsonify(response_body), 201)
+
+    @classmethod
+    def _batch_values(cls, item, category_ids, partial=False, timezone=DEFAULT_TIMEZONE):
+        #validate one batch item and map it to column values; timezone is the owner's, for due_at
+        if not isinstance(item, dict):
+            raise ValueError('Each item must be an object')
+        values={}
+        if 'task' in item or not partial:
+            if not item.get('task'):
+                raise ValueError('Task description cannot be empty. Please provide a task description')
+            values['task']=item['task']
+        if 'date' in item or not partial:
+            if not item.get('date'):
+                raise ValueError('Date is required')
+            if not isinstance(item['date'], str):
+                raise ValueError('Date must be a string in YYYY-MM-DD format')
+            values['date']=date.fromisoformat(item['date'])
+        if 'time' in item or not partial:
+            values['time']=check_time(item.get('time'))
+        if 'category_id' in item or not partial:
+            if item.get('category_id') not in category_ids:
+                raise ValueError(f'Category {item.get("category_id")} does not exist or does not belong to you')
+            values['category_id']=item['category_id']
+        if item.get('is_complete') not in (None, ''):
+            values['is_complete']=parse_bool(item['is_complete'])
+        elif not partial:
+            #missing, null or an empty CSV cell
+            values['is_complete']=False
+        if partial and not values:
+            raise ValueError('Nothing to update')
+        if not partial:
+            values['due_at']=due_at_for(values['date'], values['time'], timezone)
+        return values
+
+    @classmethod
+    def _is_id(cls, value):
+        #ids reach the IN (...) list as-is, anything but an integer is the item's own error
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    @classmethod
+    def _user_category_ids(cls, user_id):
+        return set(db.session.execute(db.select(Category.id).filter(Category.created_by==user_id)).scalars())
+
+    @classmethod
+    def _batch_too_large(cls, items):
+        if not isinstance(items, list) or not items:
+            return make_response(jsonify({
+                'error':'Provide a non-empty list of items'
+            }), 400)
+        if len(items) > MAX_BATCH_SIZE:
+            return make_response(jsonify({
+                'error':f'A batch can contain at most {MAX_BATCH_SIZE} items'
+            }), 413)
+        return None
+
+    @classmethod
+    def add_tasks(cls, items, user_id):
+        error_response=cls._batch_too_large(items)
+        if error_response:
+            return error_response
+
+        category_ids=cls._user_category_ids(user_id)
+        timezone=user_timezone(user_id)
+        results=[None] * len(items)
+        rows=[]
+        positions=[]
+        for index, item in enumerate(items):
+            try:
+                values=cls._batch_values(item, category_ids, timezone=timezone)
+            except ValueError as e:
+                results[index]={'index':index, 'status':400, 'error':str(e)}
+                continue
+            values['user_id']=user_id
+            rows.append(values)
+            positions.append(index)
+
+        if rows:
+            version=bump_data_version(user_id)
+            for values in rows:
+                values['version']=version
+            #one multi-row INSERT ... RETURNING for every valid item
+            if db.session.get_bind().dialect.name=='sqlite':
+                #SQLite cannot order RETURNING by parameters and would fall back to one
+                #INSERT per row; rowids are assigned in VALUES order, so sorting is equivalent
+                new_ids=sorted(db.session.execute(insert(cls).returning(cls.id), rows).scalars().all())
+            else:
+                new_ids=db.session.execute(
+                    insert(cls).returning(cls.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+            db.session.commit()
+            for index, new_id in zip(positions, new_ids):
+                results[index]={'index':index, 'status':201, 'id':new_id}
+
+        return make_response(jsonify({
+            'results':results
+        }), 200)
+
+    @classmethod
+    def update_tasks(cls, items, user_id):
+        error_response=cls._batch_too_large(items)
+        if error_response:
+            return error_response
+
+        ids=[item.get('id') for item in items if isinstance(item, dict) and cls._is_id(item.get('id'))]
+        #date and time come along so a changed one can be combined with the other into due_at
+        owned={row.id:row for row in db.session.execute(
+            db.select(cls.id, cls.date, cls.time).filter(cls.user_id==user_id, cls.id.in_(ids))
+        )}
+        category_ids=cls._user_category_ids(user_id) if any(isinstance(item, dict) and 'category_id' in item for item in items) else set()
+
+        timezone=user_timezone(user_id)
+        results=[None] * len(items)
+        rows=[]
+        for index, item in enumerate(items):
+            try:
+                values=cls._batch_values(item, category_ids, partial=True)
+            except ValueError as e:
+                results[index]={'index':index, 'status':400, 'error':str(e)}
+                continue
+            task_id=item.get('id')
+            if not cls._is_id(task_id):
+                results[index]={'index':index, 'status':400, 'error':'Task id must be an integer'}
+                continue
+            if task_id not in owned:
+                results[index]={'index':index, 'status':404, 'error':f'Task {task_id} not found or does not belong to the current user'}
+                continue
+            if 'date' in values or 'time' in values:
+                values['due_at']=due_at_for(values.get('date', owned[task_id].date), values.get('time', owned[task_id].time), timezone)
+            values['id']=task_id
+            rows.append(values)
+            results[index]={'index':index, 'status':200, 'id':task_id}
+
+        if rows:
+            version=bump_data_version(user_id)
+            for values in rows:
+                values['version']=version
+            #bulk UPDATE by primary key; ownership was checked with the single SELECT above
+            db.session.execute(update(cls), rows)
+            db.session.commit()
+
+        return make_response(jsonify({
+            'results':results
+        }), 200)
+
+    @classmethod
+    def delete_tasks(cls, ids, user_id):
+        error_response=cls._batch_too_large(ids)
+        if error_response:
+            return error_response
+
+        valid_ids=[task_id for task_id in ids if cls._is_id(task_id)]
+        deleted_ids=set()
+        if valid_ids:
+            #bump first, every mutation takes the owner's row lock before any other
+            version=bump_data_version(user_id)
+            deleted_ids=set(db.session.execute(
+                delete(cls).where(cls.user_id==user_id, cls.id.in_(valid_ids)).returning(cls.id)
+            ).scalars())
+        if deleted_ids:
+            Tombstone.record(user_id, version, tasks=deleted_ids)
+            db.session.commit()
+        else:
+            db.session.rollback()
+
+        results=[]
+        for index, task_id in enumerate(ids):
+            if not cls._is_id(task_id):
+                results.append({'index':index, 'status':400, 'error':'Task id must be an integer'})
+            elif task_id in deleted_ids:
+                results.append({'index':index, 'status':200, 'id':task_id})
+            else:
+                results.append({'index':index, 'status':404, 'error':f'Task {task_id} not found or does not belong to the current user'})
+
+        return make_response(jsonify({
+            'results':results
+        }), 200)
 
     @classmethod
     def delete_task(cls, id, user_id):
-        task=cls.query.filter(cls.id==id, cls.user_id==user_id).first()
+        version=bump_data_version(user_id)
+        #scoped by owner, so a missing task and someone else's task look the same
+        deleted_id=db.session.execute(
+            delete(cls).where(cls.id==id, cls.user_id==user_id).returning(cls.id)
+        ).scalar()
 
-        if task is None:
+        if deleted_id is None:
+            db.session.rollback()
             response_body={
                 'error':f'Task {id} not found or does not belong to the current user'
             }
             status_code=404
         else:
-            db.session.delete(task)
+            Tombstone.record(user_id, version, tasks=[id])
             db.session.commit()
 
             response_body={
@@ -69,35 +294,95 @@ class Task(db.Model, SerializerMixin):
             status_code=200
         return make_response(jsonify(response_body), status_code)
     
+    @classmethod
+    def reschedule(cls, user_id, timezone, version):
+        # Recomputes due_at of every task of the user after their timezone
+        # changed, in keyset batches by id; the caller bumped the data version
+        # and commits.
+        last_id=0
+        while True:
+            rows=db.session.execute(
+                db.select(cls.id, cls.date, cls.time)
+                .filter(cls.user_id==user_id, cls.id > last_id)
+                .order_by(cls.id)
+                .limit(RESCHEDULE_BATCH_SIZE)
+            ).all()
+            if rows:
+                db.session.execute(update(cls), [
+                    {'id':row.id, 'due_at':due_at_for(row.date, row.time, timezone), 'version':version}
+                    for row in rows
+                ])
+            if len(rows) < RESCHEDULE_BATCH_SIZE:
+                break
+            last_id=rows[-1].id
+
     @classmethod
     def update_task(cls, id, user_id, updated_task=None, updated_date=None, updated_time=None, updated_category=None, updated_is_complete=None):
-        task_item=cls.query.filter(cls.id==id, cls.user_id==user_id).first()
+        if updated_time:
+            try:
+                check_time(updated_time)
+            except ValueError as e:
+                return make_response(jsonify({
+                    'error':str(e)
+                }), 400)
+        values={}
+        if updated_task:
+            values['task']=updated_task
+        if updated_date:
+            values['date']=datetime.strptime(updated_date, '%Y-%m-%d').date()
+        if updated_time:
+            values['time']=updated_time
+        if updated_category:
+            values['category_id']=updated_category
+        if updated_is_complete is not None:
+            values['is_complete']=updated_is_complete
+        timezone=user_timezone(user_id) if 'date' in values or 'time' in values else None
+        if 'date' in values and 'time' in values:
+            values['due_at']=due_at_for(values['date'], values['time'], timezone)
+        values['version']=bump_data_version(user_id)
+
+        #one UPDATE ... RETURNING; the category name is only returned for the owner's categories
+        category_name=db.select(Category.name).where(Category.id==cls.category_id, Category.created_by==user_id).scalar_subquery()
+        try:
+            task_item=db.session.execute(
+                update(cls)
+                .where(cls.id==id, cls.user_id==user_id)
+                .values(values)
+                .returning(cls.task, cls.date, cls.time, cls.category_id, category_name, cls.is_complete)
+            ).first()
+        except IntegrityError:
+            #the foreign key, category_id does not exist at all
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':f'Category {updated_category} does not exist or does not belong to you'
+            }), 400)
         if task_item is None:
+            db.session.rollback()
             response_body={
                 'error':f'Task {id} not found or does not belong to the current user'
             }
             status_code=404
+        elif updated_category and task_item[4] is None:
+            db.session.rollback()
+            response_body={
+                'error':f'Category {updated_category} does not exist or does not belong to you'
+            }
+            status_code=400
         else:
-            if updated_task:
-                task_item.task=updated_task
-            if updated_date:
-                date_obj=datetime.strptime(updated_date, '%Y-%m-%d').date()
-                task_item.date=date_obj
-            if updated_time:
-                task_item.time=updated_time
-            if updated_category:
-                task_item.category_id=updated_category
-            if updated_is_complete is not None:
-                task_item.is_complete=updated_is_complete
+            if ('date' in values or 'time' in values) and 'due_at' not in values:
+                #only one of them changed, combine it with the stored other one
+                db.session.execute(
+                    update(cls).where(cls.id==id).values(due_at=due_at_for(task_item[1], task_item[2], timezone))
+                )
             db.session.commit()
 
             response_body={
-                'task':task_item.task,
-                'date':task_item.date,
-                'time':task_item.time,
-                'category_id':task_item.category_id,
-                'category_name':task_item.category.name if task_item.category else None,
-                'is_complete':task_item.is_complete
+                'task':task_item[0],
+                'date':task_item[1],
+                'time':task_item[2],
+                'category_id':task_item[3],
+                'category_name':task_item[4],
+                'is_complete':task_item[5]
             }
             status_code=200
 
@@ -123,13 +408,288 @@ class Task(db.Model, SerializerMixin):
         return make_response(jsonify(response_body), status_code)
 
     @classmethod
-    def get_tasks(cls, user_id):
-        tasks=[]
-        for task in cls.query.filter_by(user_id=user_id).all():
-            task_dict=task.to_dict()
-            tasks.append(task_dict)
+    def tasks_query(cls, user_id, limit=None, cursor=None, is_complete=None, category_id=None, date_from=None, date_to=None):
+        # Builds the page query for get_tasks; shared with the async server.
+        # Raises ValueError for invalid arguments.
+        #keyset pagination ordered by (date, id) so every page is an index range scan instead of an OFFSET
+        limit=clamp_limit(limit)
+        is_complete=parse_bool(is_complete)
+        category_id=parse_int(category_id, 'category_id')
+        #project plain columns (task + category name via join) instead of hydrating ORM objects
+        query=db.select(*task_serializer.projection()).join(Category, cls.category_id==Category.id).filter(cls.user_id==user_id)
+        if is_complete is not None:
+            query=query.filter(cls.is_complete==is_complete)
+        if category_id is not None:
+            query=query.filter(cls.category_id==category_id)
+        if date_from:
+            query=query.filter(cls.date>=date.fromisoformat(date_from))
+        if date_to:
+            query=query.filter(cls.date<=date.fromisoformat(date_to))
+        if cursor:
+            cursor_date, cursor_id=decode_cursor(cursor)
+            query=query.filter(or_(cls.date>cursor_date, and_(cls.date==cursor_date, cls.id>cursor_id)))
+        #fetch one extra row to know whether another page exists
+        return query.order_by(cls.date, cls.id).limit(limit + 1), limit
+
+    @classmethod
+    def tasks_page(cls, rows, limit):
+        page=rows[:limit]
+        next_cursor=None
+        if len(rows) > limit:
+            last=page[-1]
+            next_cursor=encode_cursor(last[TASK_DATE_INDEX], last[TASK_ID_INDEX])
+        return {
+            'tasks':task_serializer.from_rows(page),
+            'next_cursor':next_cursor
+        }
+
+    @classmethod
+    def get_tasks(cls, user_id, limit=None, cursor=None, is_complete=None, category_id=None, date_from=None, date_to=None):
+        try:
+            query, limit=cls.tasks_query(user_id, limit, cursor, is_complete, category_id, date_from, date_to)
+        except ValueError as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+
+        rows=db.session.execute(query).all()
+        return make_response(jsonify(cls.tasks_page(rows, limit)), 200)
+
+    @classmethod
+    def export_tasks(cls, user_id, export_format='ndjson'):
+        if export_format not in EXPORT_FORMATS:
+            return make_response(jsonify({
+                'error':f'Unsupported export format "{export_format}", use one of: {", ".join(EXPORT_FORMATS)}'
+            }), 400)
+
+        #category name comes from the join, so there is no per-row lookup
+        fields=('id', 'task', 'date', 'time', 'category_id', 'category_name', 'is_complete')
+        query=db.select(
+            cls.id, cls.task, cls.date, cls.time, cls.category_id, Category.name, cls.is_complete
+        ).join(Category, cls.category_id==Category.id).filter(cls.user_id==user_id).order_by(cls.id)
+        dumps=current_app.json.dumps
+
+        def generate():
+            #yield_per streams rows through a server-side cursor in fixed-size chunks
+            result=db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            if export_format=='csv':
+                buffer=io.StringIO()
+                writer=csv.writer(buffer)
+                writer.writerow(fields)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            for chunk in result.partitions():
+                if export_format=='csv':
+                    for row in chunk:
+                        writer.writerow((row[0], row[1], row[2].isoformat(), row[3], row[4], row[5], row[6]))
+                    data=buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                else:
+                    data=''.join(dumps(dict(zip(fields, row))) + '\n' for row in chunk)
+                yield data
+
+        response=current_app.response_class(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition']=f'attachment; filename=tasks.{export_format}'
+        return response
+
+    @classmethod
+    def _read_import(cls, text_stream, import_format):
+        #yields (line number, item or parse error) without loading the whole upload
+        if import_format=='csv':
+            reader=csv.DictReader(text_stream)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(text_stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, ValueError('Invalid JSON')
+
+    @classmethod
+    def _resolve_categories(cls, chunk, user_id, categories, version):
+        #one lookup for the names this chunk introduces, then one bulk INSERT for the missing ones
+        #rows whose category_name is not a string are rejected later, in the per-row validation
+        names={
+            item['category_name'].strip() for _, item in chunk
+            if isinstance(item, dict) and isinstance(item.get('category_name'), str) and item['category_name'].strip()
+            and item['category_name'].strip() not in categories
+        }
+        if not names:
+            return
+        categories.update(db.session.execute(
+            db.select(Category.name, Category.id).filter(Category.created_by==user_id, Category.name.in_(names))
+        ).all())
+        missing=[name for name in names if name not in categories]
+        if missing:
+            categories.update(db.session.execute(
+                insert(Category).returning(Category.name, Category.id),
+                [{'name':name, 'created_by':user_id, 'version':version} for name in missing]
+            ).all())
+
+    @classmethod
+    def import_rows(cls, rows, user_id, chunk_size=IMPORT_CHUNK_SIZE):
+        # Validates and inserts (line, item) pairs chunk by chunk with Core
+        # executemany. Bad rows are reported and skipped, every chunk commits.
+        categories={}
+        category_ids=cls._user_category_ids(user_id)
+        timezone=user_timezone(user_id)
+        imported=0
+        failed=0
+        errors=[]
+
+        def flush(chunk):
+            nonlocal imported, failed
+            version=bump_data_version(user_id)
+            cls._resolve_categories(chunk, user_id, categories, version)
+            category_ids.update(categories.values())
+            values=[]
+            for line_no, item in chunk:
+                try:
+                    if isinstance(item, Exception):
+                        raise item
+                    if isinstance(item, dict) and item.get('category_name'):
+                        if not isinstance(item['category_name'], str) or not item['category_name'].strip():
+                            raise ValueError('category_name must be a non-empty string')
+                        item['category_id']=categories[item['category_name'].strip()]
+                    elif isinstance(item, dict) and item.get('category_id') not in (None, ''):
+                        item['category_id']=int(item['category_id'])
+                    row=cls._batch_values(item, category_ids, timezone=timezone)
+                except (ValueError, TypeError) as e:
+                    failed+=1
+                    if len(errors) < MAX_IMPORT_ERRORS:
+                        errors.append({'line':line_no, 'error':str(e)})
+                    continue
+                row['user_id']=user_id
+                row['version']=version
+                values.append(row)
+            if values:
+                db.session.execute(insert(cls.__table__), values)
+                imported+=len(values)
+            db.session.commit()
+
+        chunk=[]
+        for line_no, item in rows:
+            chunk.append((line_no, item))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk=[]
+        if chunk:
+            flush(chunk)
+
+        return {
+            'imported':imported,
+            'failed':failed,
+            'errors':errors
+        }
+
+    @classmethod
+    def import_tasks(cls, stream, import_format, user_id):
+        if import_format not in EXPORT_FORMATS:
+            return make_response(jsonify({
+                'error':f'Unsupported import format "{import_format}", use one of: {", ".join(EXPORT_FORMATS)}'
+            }), 400)
+        text_stream=io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        try:
+            result=cls.import_rows(cls._read_import(text_stream, import_format), user_id)
+        except UnicodeDecodeError:
+            db.session.rollback()
+            return make_response(jsonify({
+                'error':'The upload must be UTF-8 encoded'
+            }), 400)
+        return make_response(jsonify(result), 200)
+
+    @classmethod
+    def search_tasks(cls, user_id, q, limit=None, offset=0):
+        try:
+            limit=clamp_limit(limit)
+            offset=max(0, int(offset or 0))
+        except ValueError as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+        dialect=db.session.get_bind().dialect.name
+        clauses=search_clauses(dialect, cls.task, q or '', user_id)
+        if clauses is None:
+            return make_response(jsonify({
+                'error':'Provide a search query with q'
+            }), 400)
+        match, rank=clauses
+
+        query=db.select(*task_serializer.projection())
+        if dialect=='sqlite':
+            query=query.select_from(tasks_fts).join(cls, cls.id==tasks_fts.c.rowid)
+        query=query.join(Category, cls.category_id==Category.id).filter(match, cls.user_id==user_id)
+        rows=db.session.execute(query.order_by(rank, cls.id).limit(limit + 1).offset(offset)).all()
+
+        return make_response(jsonify({
+            'tasks':task_serializer.from_rows(rows[:limit]),
+            'next_offset':offset + limit if len(rows) > limit else None
+        }), 200)
+
+    @classmethod
+    def get_stats(cls, user_id, bucket='day'):
+        if bucket not in STATS_BUCKETS:
+            return make_response(jsonify({
+                'error':f'Unsupported bucket "{bucket}", use one of: {", ".join(STATS_BUCKETS)}'
+            }), 400)
+
+        #cached per user and keyed by data version, so other processes' writes are never served stale
+        version=get_data_version(user_id)
+        cached=stats_cache.get(user_id)
+        if cached is None or cached['version']!=version:
+            cached={'version':version, 'buckets':{}}
+            stats_cache.set(user_id, cached)
+        if bucket in cached['buckets']:
+            return make_response(jsonify(cached['buckets'][bucket]), 200)
+
+        #GROUP BY in the database; only (category, is_complete) and (date, is_complete) counts come back
+        category_counts=db.session.execute(
+            db.select(cls.category_id, cls.is_complete, func.count())
+            .filter(cls.user_id==user_id)
+            .group_by(cls.category_id, cls.is_complete)
+        ).all()
+        day_counts=db.session.execute(
+            db.select(cls.date, cls.is_complete, func.count())
+            .filter(cls.user_id==user_id)
+            .group_by(cls.date, cls.is_complete)
+        ).all()
+        names=dict(db.session.execute(
+            db.select(Category.id, Category.name).filter(Category.created_by==user_id)
+        ).all())
+
+        per_category={category_id:[0, 0] for category_id in names}
+        for category_id, is_complete, count in category_counts:
+            totals=per_category.setdefault(category_id, [0, 0])
+            totals[0]+=count
+            if is_complete:
+                totals[1]+=count
+        total=sum(totals[0] for totals in per_category.values())
+        completed=sum(totals[1] for totals in per_category.values())
+
+        response_body={
+            **summarize(total, completed),
+            'bucket':bucket,
+            'categories':[
+                dict(category_id=category_id, name=names.get(category_id), **summarize(*totals))
+                for category_id, totals in per_category.items()
+            ],
+            'dates':rollup_dates(day_counts, bucket)
+        }
+        cached['buckets'][bucket]=response_body
+        return make_response(jsonify(response_body), 200)
+
+
+register_search_ddl(Task.__table__)
 
-        return make_response(jsonify(tasks), 200)
+task_serializer=Serializer(Task, exclude=('version',), nested={'category':category_serializer})
+category_with_tasks_serializer=Serializer(Category, exclude=('version',), nested={'tasks':Serializer(Task, exclude=('version',))})
+TASK_ID_INDEX=task_serializer.fields.index('id')
+TASK_DATE_INDEX=task_serializer.fields.index('date')
 
 
 
@@ -0,0 +1,47 @@
+from . import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, insert, delete
+from datetime import datetime
+
+#entity names used in tombstones and in the /sync response
+TASK='task'
+CATEGORY='category'
+RECURRENCE='recurrence'
+
+class Tombstone(db.Model):
+    # One row per deleted task, category or recurrence, stamped with the owner's data
+    # version of the delete, so /sync can report deletions after a version.
+    # Pruned after SYNC_TOMBSTONE_DAYS; older sync cursors get a full reset.
+    __tablename__='tombstones'
+
+    id: Mapped[int]=mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int]=mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    entity: Mapped[str]=mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int]=mapped_column(Integer, nullable=False)
+    version: Mapped[int]=mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime]=mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__=(
+        Index('idx_tombstone_user_version', 'user_id', 'version'), #for /sync, deletions after a version
+        Index('idx_tombstone_deleted_at', 'deleted_at'), #for pruning
+    )
+
+    def __repr__(self):
+        return f"<Tombstone {self.entity} {self.entity_id}>"
+
+    @classmethod
+    def record(cls, user_id, version, tasks=(), categories=(), recurrences=()):
+        #one bulk INSERT in the caller's transaction
+        rows=[
+            {'user_id':user_id, 'entity':entity, 'entity_id':entity_id, 'version':version}
+            for entity, ids in ((TASK, tasks), (CATEGORY, categories), (RECURRENCE, recurrences))
+            for entity_id in ids
+        ]
+        if rows:
+            db.session.execute(insert(cls), rows)
+
+    @classmethod
+    def prune(cls, before):
+        result=db.session.execute(delete(cls).where(cls.deleted_at < before))
+        db.session.commit()
+        return result.rowcount
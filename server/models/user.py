@@ -1,13 +1,19 @@
 from . import db
-from .category import Category
+from .category import Category, DEFAULT_CATEGORIES
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
-from sqlalchemy import String, Integer, Boolean, Date, Index
+from sqlalchemy import String, Integer, Date, DateTime, Index, insert, update, delete, or_
 from datetime import date, datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask import jsonify, make_response
+from flask import jsonify, make_response, current_app
 from typing import List
 from bleach import clean
+from .serializers import Serializer
+from .passwords import password_hasher
+from .identity import identity_cache
+from .versions import bump_data_version
+from .response_cache import response_cache
+from .conflicts import insert_unless_exists
+from .due import DEFAULT_TIMEZONE, check_timezone
 class User(db.Model, SerializerMixin):
     __tablename__='users'
 
@@ -18,6 +24,9 @@ class User(db.Model, SerializerMixin):
     email: Mapped[str]=mapped_column(String(255), nullable=False, unique=True)
     password: Mapped[str]=mapped_column(String(255), nullable=False)
     created_at: Mapped[date]=mapped_column(Date, default=datetime.utcnow)
+    data_version: Mapped[int]=mapped_column(Integer, nullable=False, default=0, server_default='0') #bumped by every task/category change, used for ETags
+    timezone: Mapped[str]=mapped_column(String(64), nullable=False, default=DEFAULT_TIMEZONE, server_default=DEFAULT_TIMEZONE) #IANA name, task dates and times are wall-clock time here
+    data_changed_at: Mapped[datetime]=mapped_column(DateTime, nullable=True) #stamped with every data_version bump, polled by the reminder scheduler
 
     tasks: Mapped[List['Task']]=relationship('Task', back_populates='user', cascade='all, delete-orphan')
     categories: Mapped[List['Category']]=relationship('Category', back_populates='user', cascade='all, delete-orphan')
@@ -25,6 +34,7 @@ class User(db.Model, SerializerMixin):
     __table_args__=(
         Index('idx_user_email', 'email'), #for login and email uniqueness checks
         Index('idx_user_name', 'name'), #for searching users by name
+        Index('idx_user_data_changed_at', 'data_changed_at'), #users changed since the reminder scheduler's last poll
     )
 
     def __repr__(self):
@@ -55,45 +65,77 @@ class User(db.Model, SerializerMixin):
 
     @password_hash.setter
     def password_hash(self, password):
-        self.password=generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+        self.password=password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        if not password_hasher.verify(self.password, password):
+            return False
+        #hashes made with older parameters are upgraded after the response, the user is never locked out
+        if password_hasher.needs_rehash(self.password):
+            password_hasher.rehash_in_background(current_app._get_current_object(), self.id, self.password, password)
+        return True
 
     @classmethod
-    def add_user(cls, name, email, password):
-        user=cls.query.filter(cls.email==email).first()
-        if user:
+    def add_user(cls, name, email, password, default_categories=DEFAULT_CATEGORIES, timezone=None):
+        try:
+            timezone=check_timezone(timezone) if timezone is not None else DEFAULT_TIMEZONE
+        except ValueError as e:
+            return make_response(jsonify({
+                'error':str(e)
+            }), 400)
+        #a transient instance runs the validators, the row itself is written with Core
+        new_user=cls(
+            name=name,
+            email=email,
+            password=password_hasher.hash(password),
+            timezone=timezone
+        )
+        #the unique email index decides, two concurrent signups cannot both pass a check
+        row=insert_unless_exists(
+            cls,
+            {'name':new_user.name, 'email':new_user.email, 'password':new_user.password, 'timezone':timezone},
+            ['email'],
+            cls.id, cls.created_at
+        )
+        if row is None:
+            db.session.rollback()
             response_body={
                 'msg': 'User already exists'
             }
             status_code=409
 
         else:
-            new_user=cls(
-                name=name,
-                email=email,
-                password=generate_password_hash(password)
-            )
-            db.session.add(new_user)
-            db.session.commit()
+            new_user.id, new_user.created_at=row
 
-            #create default categories after user creation
-            default_categories=['Work', 'Personal', 'Shopping', 'Health']
-            for category_name in default_categories:
-                Category.add_category(category_name, new_user.id)
+            #create default categories in the same transaction with one bulk INSERT
+            if default_categories:
+                db.session.execute(insert(Category), [
+                    {'name':category_name, 'created_by':new_user.id}
+                    for category_name in dict.fromkeys(default_categories)
+                ])
 
-            response_body=new_user.to_dict()
+            response_body=user_serializer(new_user)
+            db.session.commit()
             status_code=201
 
         return make_response(jsonify(response_body), status_code)
 
     @classmethod
     def delete_user(cls, id):
-        user=cls.query.filter_by(id=id).first()
-        if user:
-            db.session.delete(user)
+        #same rows the ORM cascade removes, without loading every category's tasks first
+        from .task import Task
+        from .tombstone import Tombstone
+        from .recurrence import Recurrence
+        owned_categories=db.select(Category.id).filter(Category.created_by==id)
+        db.session.execute(delete(Task).where(or_(Task.user_id==id, Task.category_id.in_(owned_categories))))
+        db.session.execute(delete(Recurrence).where(Recurrence.user_id==id))
+        db.session.execute(delete(Tombstone).where(Tombstone.user_id==id))
+        db.session.execute(delete(Category).where(Category.created_by==id))
+        deleted_id=db.session.execute(delete(cls).where(cls.id==id).returning(cls.id)).scalar()
+        if deleted_id is not None:
             db.session.commit()
+            identity_cache.invalidate(id)
+            response_cache.invalidate(id)
 
             response_body={
                 'msg':'User deleted successfully'
@@ -101,6 +143,8 @@ class User(db.Model, SerializerMixin):
             status_code=200
 
         else:
+            #nothing above matched either
+            db.session.rollback()
             response_body={
                 'error':f'User with id {id} not found'
             }
@@ -109,19 +153,39 @@ class User(db.Model, SerializerMixin):
         return make_response(jsonify(response_body), status_code)
 
     @classmethod
-    def update_user(cls, id, new_name=None, new_password=None):
-        user=cls.query.filter(cls.id==id).first()
-        if user is None:
+    def update_user(cls, id, new_name=None, new_password=None, new_timezone=None):
+        # A new timezone moves the due moment of every task of the user, their
+        # dates and times stay the same wall-clock time.
+        values={}
+        if new_timezone is not None:
+            try:
+                values['timezone']=check_timezone(new_timezone)
+            except ValueError as e:
+                return make_response(jsonify({
+                    'error':str(e)
+                }), 400)
+        if new_name is not None:
+            values['name']=new_name
+        if new_password is not None:
+            values['password']=password_hasher.hash(new_password)
+        cls(**values) #a transient instance runs the validators
+        if values:
+            statement=update(cls).where(cls.id==id).values(values).returning(cls.id)
+        else:
+            statement=db.select(cls.id).filter(cls.id==id)
+        updated_id=db.session.execute(statement).scalar()
+        if updated_id is None:
+            db.session.rollback()
             response_body={
                 'error':f'User with id {id} does not exist'
             }
             status_code=404
         else:
-            if new_name is not None:
-                user.name=new_name
-            if new_password is not None:
-                user.password=generate_password_hash(new_password)
+            if 'timezone' in values:
+                from .task import Task
+                Task.reschedule(id, values['timezone'], bump_data_version(id))
             db.session.commit()
+            identity_cache.invalidate(id)
 
             response_body={
                 'msg':f'User {id} has been updated successfully'
@@ -148,10 +212,10 @@ class User(db.Model, SerializerMixin):
 
     @classmethod
     def get_users(cls):
-        users=[]
-        for user in cls.query.all():
-            user_dict=user.to_dict()
-            users.append(user_dict)
+        rows=db.session.execute(db.select(*user_serializer.projection())).all()
+        return make_response(jsonify(user_serializer.from_rows(rows)), 200)
+
 
-        return jsonify(users), 200
+#the password hash never leaves the server
+user_serializer=Serializer(User, exclude=('password', 'data_version', 'data_changed_at'))
 
@@ -0,0 +1,37 @@
+from datetime import datetime
+from . import db
+from .stats import stats_cache
+from .response_cache import response_cache
+from .identity import identity_cache, UserGone
+
+
+def bump_data_version(user_id):
+    # Every task/category mutation bumps the owner's data version in the same
+    # transaction. List and detail ETags are derived from it, so an unchanged
+    # version means a cached response is still current. The user's entries
+    # in the server-side response cache are dropped here too. data_changed_at
+    # tells the reminder scheduler to reload the user's deadlines.
+    # Returns the new version, which the caller stamps on the rows it changes
+    # so /sync can return everything changed after a client's last version.
+    # Raises UserGone (401) when the user no longer exists: another process
+    # deleted them and this one still had the session's user cached.
+    from .user import User
+    version=db.session.execute(
+        db.update(User).where(User.id==user_id).values(data_version=User.data_version + 1, data_changed_at=datetime.utcnow()).returning(User.data_version)
+    ).scalar()
+    if version is None:
+        db.session.rollback()
+        identity_cache.invalidate(user_id)
+        raise UserGone()
+    stats_cache.invalidate(user_id)
+    response_cache.invalidate(user_id)
+    return version
+
+
+def data_version_query(user_id):
+    from .user import User
+    return db.select(User.data_version).filter(User.id==user_id)
+
+
+def get_data_version(user_id):
+    return db.session.execute(data_version_query(user_id)).scalar()
@@ -0,0 +1,95 @@
+import math
+import time
+from flask import jsonify, request, session
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse_many
+
+#route class -> rates; the short window is the burst a client may spend at once,
+#the long one the rate it refills at, which is how a token bucket behaves
+DEFAULT_LIMITS={
+    'auth':'5/second;30/minute',
+    'write':'20/second;300/minute',
+    'read':'50/second;1200/minute',
+}
+READ_METHODS=('GET', 'HEAD')
+WRITE_METHODS=('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def client_address():
+    return f'ip:{get_remote_address()}'
+
+
+def bucket_key(user_id, address):
+    #a signed-in user has one bucket whatever address they come from
+    return f'user:{user_id}' if user_id else f'ip:{address}'
+
+
+def user_or_address():
+    return bucket_key(session.get('user_id'), get_remote_address())
+
+
+#route classes counted per client address rather than per user
+ROUTE_CLASS_KEYS={
+    'auth':client_address,
+}
+
+
+class RateLimits:
+    # Rate limits per route class on top of Flask-Limiter. Every route of a
+    # class shares one bucket per key: auth (password hashing) per client
+    # address, read and write per signed-in user. Rates come from
+    # RATELIMIT_AUTH/READ/WRITE; counters live in RATELIMIT_STORAGE_URI,
+    # memory:// per process by default, redis://... to share them between
+    # workers. Over the limit the client gets a 429 with Retry-After.
+    def __init__(self, app=None):
+        self.limiter=Limiter(key_func=user_or_address, on_breach=self.breach_response)
+        self.auth=self.route_class('auth')
+        self.read=self.route_class('read', READ_METHODS)
+        self.write=self.route_class('write', WRITE_METHODS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_STORAGE_URI', 'memory://')
+        app.config.setdefault('RATELIMIT_STRATEGY', 'moving-window')
+        app.config.setdefault('RATELIMIT_HEADERS_ENABLED', True)
+        for name, limits in DEFAULT_LIMITS.items():
+            app.config.setdefault(f'RATELIMIT_{name.upper()}', limits)
+        self.app=app
+        self.limiter.init_app(app)
+
+    def route_class(self, name, methods=None):
+        # Decorator for a view function or a Resource view. methods restricts
+        # which HTTP methods count against the class; None counts all of them.
+        return self.limiter.shared_limit(
+            lambda: self.app.config[f'RATELIMIT_{name.upper()}'],
+            scope=name,
+            key_func=ROUTE_CLASS_KEYS.get(name),
+            exempt_when=(lambda: request.method not in methods) if methods else None
+        )
+
+    def check(self, name, key):
+        # Counts a request served outside Flask (the ASGI routes) against the
+        # route class, in the bucket its Flask routes use for the same key.
+        # Returns None while under the limit, else the error body and the
+        # seconds until the client may retry.
+        if not self.limiter.enabled:
+            return None
+        prefix=self.app.config.get('RATELIMIT_KEY_PREFIX')
+        args=[prefix, key, name] if prefix else [key, name]
+        for limit in sorted(parse_many(self.app.config[f'RATELIMIT_{name.upper()}'])):
+            if not self.limiter.limiter.hit(limit, *args):
+                reset_at=self.limiter.limiter.get_window_stats(limit, *args)[0]
+                return {
+                    'error':f'Too many requests, the limit is {limit}'
+                }, max(1, math.ceil(reset_at - time.time()))
+        return None
+
+    def breach_response(self, request_limit):
+        #same JSON error shape as the handlers, for views and Resources alike
+        response=jsonify({
+            'error':f'Too many requests, the limit is {request_limit.limit}'
+        })
+        response.status_code=429
+        return response
@@ -1,14 +1,182 @@
+# Deterministic synthetic data generator. Builds N users with the default
+# categories and a configurable spread of tasks, e.g.
+#
+#     python seed.py --users 10000 --tasks 1000000 --distribution zipf
+#
+# Every generated user can log in as user<N>@example.com with --password.
+# The same --seed always produces the same database.
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+import click
+from sqlalchemy import func, insert, select
 from models import db
 from app import app
 from models.category import Category
 from models.user import User
 from models.task import Task
-with app.app_context():
-    Category.query.delete()
-    db.session.commit()
+from models.recurrence import Recurrence
+from models.tombstone import Tombstone
+from models.passwords import password_hasher
+from models.search import has_sqlite_search, suspend_search_triggers, rebuild_search_index
 
-    User.query.delete()
-    db.session.commit()
+VERBS=('Buy', 'Call', 'Email', 'Review', 'Plan', 'Pay', 'Book', 'Send', 'Fix', 'Clean', 'Prepare', 'Schedule', 'Renew', 'Update', 'Finish')
+OBJECTS=(
+    'groceries', 'the dentist', 'quarterly report', 'invoice', 'flights', 'birthday gift', 'team meeting', 'car insurance',
+    'gym membership', 'project proposal', 'tax return', 'laundry', 'budget', 'presentation', 'doctor appointment',
+    'rent', 'newsletter', 'garden', 'code review', 'passport',
+)
+DISTRIBUTIONS=('uniform', 'zipf')
 
-    Task.query.delete()
-    db.session.commit()
+
+def tasks_per_user(rng, n_users, n_tasks, distribution):
+    #zipf gives a few heavy users and a long tail, like real task lists
+    if distribution=='uniform':
+        weights=[1] * n_users
+    else:
+        weights=[1 / (rank ** 1.1) for rank in range(1, n_users + 1)]
+        rng.shuffle(weights)
+    total=sum(weights)
+    counts=[int(n_tasks * weight / total) for weight in weights]
+    #hand the rounding remainder to the heaviest users
+    for index in sorted(range(n_users), key=weights.__getitem__, reverse=True)[:n_tasks - sum(counts)]:
+        counts[index]+=1
+    return counts
+
+
+def truncate(connection):
+    if connection.dialect.name=='postgresql':
+        connection.exec_driver_sql('TRUNCATE tasks, recurrences, tombstones, categories, users RESTART IDENTITY CASCADE')
+        return
+    #children first for foreign keys; DELETE without WHERE is SQLite's truncate
+    for model in (Task, Recurrence, Tombstone, Category, User):
+        connection.execute(model.__table__.delete())
+
+
+def next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def copy_rows(connection, table, columns, rows):
+    # COPY ... FROM STDIN through the psycopg2 cursor, one buffer per batch.
+    buffer=io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor=connection.connection.cursor()
+    cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def write_rows(connection, model, columns, rows):
+    if connection.dialect.name=='postgresql':
+        copy_rows(connection, model.__table__, columns, rows)
+    else:
+        connection.execute(insert(model), [dict(zip(columns, row)) for row in rows])
+
+
+def generate(connection, n_users, n_tasks, distribution='uniform', complete_ratio=0.3, days=365,
+             start=None, categories=None, password='password123', seed=42, batch_size=50_000):
+    rng=random.Random(seed)
+    start=start or date(2024, 1, 1)
+    categories=list(dict.fromkeys(categories or app.config['DEFAULT_CATEGORIES']))
+    today=datetime.utcnow().date()
+    #hashing once keeps 100k users from costing minutes of scrypt
+    password_hash=password_hasher.hash(password)
+
+    user_id=next_id(connection, User)
+    category_id=next_id(connection, Category)
+    task_id=next_id(connection, Task)
+    first_user, first_category=user_id, category_id
+
+    user_columns=('id', 'name', 'email', 'password', 'created_at', 'data_version')
+    category_columns=('id', 'name', 'created_by', 'created_at')
+    task_columns=('id', 'task', 'date', 'time', 'due_at', 'category_id', 'is_complete', 'user_id')
+
+    users=[(first_user + i, f'User {first_user + i}', f'user{first_user + i}@example.com', password_hash, today, 0) for i in range(n_users)]
+    for offset in range(0, n_users, batch_size):
+        write_rows(connection, User, user_columns, users[offset:offset + batch_size])
+
+    category_rows=[]
+    for user in range(first_user, first_user + n_users):
+        for name in categories:
+            category_rows.append((category_id, name, user, today))
+            category_id+=1
+    for offset in range(0, len(category_rows), batch_size):
+        write_rows(connection, Category, category_columns, category_rows[offset:offset + batch_size])
+
+    rows=[]
+    for index, count in enumerate(tasks_per_user(rng, n_users, n_tasks, distribution)):
+        user=first_user + index
+        user_categories=first_category + index * len(categories)
+        for _ in range(count):
+            #keep the draw order, a given --seed must keep producing the same data
+            name=f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}'
+            day=start + timedelta(days=rng.randrange(days))
+            due=dt_time(rng.randrange(24), rng.choice((0, 15, 30, 45)))
+            rows.append((
+                task_id,
+                name,
+                day,
+                due.strftime('%H:%M'),
+                datetime.combine(day, due),
+                user_categories + rng.randrange(len(categories)),
+                rng.random() < complete_ratio,
+                user
+            ))
+            task_id+=1
+            if len(rows)==batch_size:
+                write_rows(connection, Task, task_columns, rows)
+                rows=[]
+    if rows:
+        write_rows(connection, Task, task_columns, rows)
+
+    if connection.dialect.name=='postgresql':
+        #explicit ids were written, move the sequences past them
+        for model in (User, Category, Task):
+            table=model.__table__.name
+            connection.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))")
+    return n_users, len(category_rows), n_tasks
+
+
+@click.command()
+@click.option('--users', 'n_users', type=click.IntRange(0), default=100, show_default=True)
+@click.option('--tasks', 'n_tasks', type=click.IntRange(0), default=10_000, show_default=True, help='Total tasks across all users')
+@click.option('--distribution', type=click.Choice(DISTRIBUTIONS), default='uniform', show_default=True, help='How tasks are spread over users')
+@click.option('--complete-ratio', type=click.FloatRange(0, 1), default=0.3, show_default=True)
+@click.option('--days', type=click.IntRange(1), default=365, show_default=True, help='Task dates are spread over this many days')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First task date, defaults to 2024-01-01')
+@click.option('--password', default='password123', show_default=True, help='Password of every generated user')
+@click.option('--seed', 'random_seed', type=int, default=42, show_default=True)
+@click.option('--batch-size', type=click.IntRange(1), default=50_000, show_default=True)
+@click.option('--truncate/--append', 'empty_first', default=True, show_default=True, help='Empty the tables first')
+def main(n_users, n_tasks, distribution, complete_ratio, days, start, password, random_seed, batch_size, empty_first):
+    """Fill the database with generated users, categories and tasks."""
+    if n_tasks and not n_users:
+        raise click.BadParameter('tasks need at least one user', param_hint='--users')
+    started=time.perf_counter()
+    with app.app_context():
+        #one transaction: a failed run leaves the database as it was
+        with db.engine.begin() as connection:
+            search_index=has_sqlite_search(connection)
+            if search_index:
+                suspend_search_triggers(connection)
+            if empty_first:
+                truncate(connection)
+            counts=generate(
+                connection, n_users, n_tasks,
+                distribution=distribution,
+                complete_ratio=complete_ratio,
+                days=days,
+                start=start.date() if start else None,
+                password=password,
+                seed=random_seed,
+                batch_size=batch_size
+            )
+            if search_index:
+                rebuild_search_index(connection)
+    click.echo('Created {} users, {} categories and {} tasks in {:.1f}s'.format(*counts, time.perf_counter() - started))
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import pytest
+
+#app.py reads its configuration at import; load_dotenv() keeps these over any .env
+#a file, not :memory:, so the ASGI app's async engine sees the same database
+os.environ['database_url']=f'sqlite:///{os.path.join(tempfile.mkdtemp(), "test.db")}'
+os.environ['SECRET_KEY']='test'
+os.environ['PASSWORD_HASH_WORKERS']='0'  # hash inline, no process pool in tests
+os.environ['PASSWORD_HASH_METHOD']='pbkdf2:sha256:1000'
+os.environ['RATELIMIT_ENABLED']='true'  # initialized so the rate limit tests can switch it on
+os.environ['TRUSTED_PROXIES']='1'  # as deployed, behind one proxy
+
+PASSWORD='password123'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, rate_limits
+    from models import db
+    app.config.update(TESTING=True, SESSION_COOKIE_DOMAIN=None, SESSION_COOKIE_SECURE=False)
+    #off unless a test turns it on, see the limited fixture
+    rate_limits.limiter.enabled=False
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clean(app):
+    # Every test starts from empty tables and caches. Ids restart at 1 on
+    # SQLite, so a cached identity or response from an earlier test would
+    # otherwise match.
+    from models import db
+    from models.identity import identity_cache
+    from models.response_cache import response_cache
+    from models.stats import stats_cache
+    yield
+    with app.app_context():
+        db.session.remove()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    identity_cache.clear()
+    stats_cache.clear()
+    response_cache.backend.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def sign_up(client, name='alice', email='alice@example.com'):
+    response=client.post('/users', json={'name':name, 'email':email, 'password':PASSWORD})
+    assert response.status_code==201, response.get_data(as_text=True)
+    response=client.post('/login', json={'email':email, 'password':PASSWORD})
+    assert response.status_code==200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.fixture
+def user(client):
+    #signed up and logged in, with the default categories and five tasks
+    profile=sign_up(client)
+    for i in range(5):
+        response=client.post('/tasks', json={'task':f'task {i}', 'date':f'2025-01-0{i + 1}', 'time':'10:00', 'category_id':1})
+        assert response.status_code==201, response.get_data(as_text=True)
+    return profile
+
+
+@pytest.fixture
+def limited(app, user, monkeypatch):
+    #rate limiting on, from empty counters, once the user fixture has signed in
+    from app import rate_limits
+    monkeypatch.setattr(rate_limits.limiter, 'enabled', True)
+    rate_limits.limiter.reset()
+    yield rate_limits
+    rate_limits.limiter.reset()
+
+
+@pytest.fixture
+def statements(app):
+    #SQL text of every statement executed while the test runs
+    from sqlalchemy import event
+    from models import db
+    executed=[]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app.app_context():
+        engine=db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,36 @@
+import re
+import pytest
+from starlette.testclient import TestClient
+from .conftest import PASSWORD
+
+
+@pytest.fixture
+def asgi_client(app, user):
+    from asgi import application
+    with TestClient(application) as asgi_client:
+        response=asgi_client.post('/login', json={'email':user['email'], 'password':PASSWORD})
+        assert response.status_code==200
+        yield asgi_client
+
+
+@pytest.mark.parametrize('path', ['/tasks', '/categories'])
+def test_async_reads_report_server_timing_and_metrics(app, client, asgi_client, path):
+    response=asgi_client.get(path)
+    assert response.status_code==200
+    #the async engine's statements and rows are counted too
+    queries, rows=re.search(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) rows"', response.headers['Server-Timing']).groups()
+    assert int(queries) > 0 and int(rows) > 0
+    metrics=client.get('/metrics').get_data(as_text=True)
+    assert f'taskhub_requests_total{{method="GET",route="{path}",status="200"}}' in metrics
+
+
+def test_async_reads_share_the_read_bucket(app, asgi_client, limited, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_READ', '2/minute')
+    assert asgi_client.get('/tasks').status_code==200
+    assert asgi_client.get('/categories').status_code==200
+    #the third read is over the limit whether Starlette or Flask serves it
+    response=asgi_client.get('/tasks')
+    assert response.status_code==429
+    assert int(response.headers['Retry-After']) > 0
+    assert response.json()=={'error':'Too many requests, the limit is 2 per 1 minute'}
+    assert asgi_client.get('/task/1').status_code==429
@@ -0,0 +1,92 @@
+import pytest
+
+
+def tasks_by_id(client):
+    return {task['id']:task for task in client.get('/tasks').get_json()['tasks']}
+
+
+def test_batch_create_inserts_valid_items_and_reports_each(client, user):
+    response=client.post('/tasks/batch', json={'tasks':[
+        {'task':'a', 'date':'2025-02-01', 'time':'9:00', 'category_id':2},
+        {'task':'', 'date':'2025-02-01', 'time':'9:00', 'category_id':2},
+        {'task':'c', 'date':'2025-02-02', 'time':'9:00', 'category_id':999},
+        'not an object',
+        {'task':'e', 'date':'2025-02-03', 'time':'after lunch', 'category_id':3, 'is_complete':True},
+    ]})
+    assert response.status_code==200
+    results=response.get_json()['results']
+    assert [result['status'] for result in results]==[201, 400, 400, 400, 201]
+    assert [result['index'] for result in results]==[0, 1, 2, 3, 4]
+    assert results[2]['error']=='Category 999 does not exist or does not belong to you'
+    assert results[3]['error']=='Each item must be an object'
+
+    tasks=tasks_by_id(client)
+    assert len(tasks)==7
+    assert tasks[results[0]['id']]['task']=='a'
+    assert tasks[results[4]['id']]['is_complete'] is True
+    assert tasks[results[4]['id']]['due_at']=='2025-02-03 00:00:00'
+
+
+def test_batch_create_of_only_invalid_items_writes_nothing(client, user):
+    etag=client.get('/tasks').headers['ETag']
+    response=client.post('/tasks/batch', json={'tasks':[{'task':'a'}]})
+    assert response.get_json()['results'][0]['status']==400
+    #no version bump either
+    assert client.get('/tasks', headers={'If-None-Match':etag}).status_code==304
+
+
+@pytest.mark.parametrize('method', ['POST', 'PATCH'])
+@pytest.mark.parametrize('items,status', [([], 400), (None, 400), ([{}] * 501, 413)])
+def test_batch_size_is_bounded(client, user, method, items, status):
+    assert client.open('/tasks/batch', method=method, json={'tasks':items}).status_code==status
+    assert client.delete('/tasks/batch', json={'ids':items}).status_code==status
+
+
+def test_batch_update_changes_only_the_given_fields(client, user):
+    response=client.patch('/tasks/batch', json={'tasks':[
+        {'id':1, 'is_complete':True},
+        {'id':2, 'time':'18:30'},
+        {'id':3, 'category_id':999},
+        {'id':999, 'is_complete':True},
+        {'id':'4', 'is_complete':True},
+        {'id':5},
+    ]})
+    assert response.status_code==200
+    results=response.get_json()['results']
+    assert [result['status'] for result in results]==[200, 200, 400, 404, 400, 400]
+    assert results[5]['error']=='Nothing to update'
+
+    tasks=tasks_by_id(client)
+    assert tasks[1]['is_complete'] is True and tasks[1]['time']=='10:00'
+    #due_at combines the new time with the stored date
+    assert tasks[2]['time']=='18:30' and tasks[2]['due_at']=='2025-01-02 18:30:00'
+    assert tasks[3]['category_id']==1
+    assert [task['is_complete'] for task in tasks.values()]==[True, False, False, False, False]
+
+
+def test_batch_mark_all_complete(client, user):
+    response=client.patch('/tasks/batch', json={'tasks':[{'id':task_id, 'is_complete':True} for task_id in range(1, 6)]})
+    assert {result['status'] for result in response.get_json()['results']}=={200}
+    assert all(task['is_complete'] for task in tasks_by_id(client).values())
+
+
+def test_batch_delete_reports_each_id(client, user):
+    response=client.delete('/tasks/batch', json={'ids':[1, 3, 999, 'x']})
+    assert response.status_code==200
+    assert response.get_json()['results']==[
+        {'index':0, 'status':200, 'id':1},
+        {'index':1, 'status':200, 'id':3},
+        {'index':2, 'status':404, 'error':'Task 999 not found or does not belong to the current user'},
+        {'index':3, 'status':400, 'error':'Task id must be an integer'},
+    ]
+    assert sorted(tasks_by_id(client))==[2, 4, 5]
+
+
+def test_batches_cannot_touch_another_users_tasks(app, client, user):
+    from .conftest import sign_up
+    bob=app.test_client()
+    sign_up(bob, 'bob', 'bob@example.com')
+    assert [result['status'] for result in bob.patch('/tasks/batch', json={'tasks':[{'id':1, 'is_complete':True}]}).get_json()['results']]==[404]
+    assert [result['status'] for result in bob.delete('/tasks/batch', json={'ids':[1, 2]}).get_json()['results']]==[404, 404]
+    tasks=tasks_by_id(client)
+    assert len(tasks)==5 and tasks[1]['is_complete'] is False
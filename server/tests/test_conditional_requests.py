@@ -0,0 +1,48 @@
+import pytest
+from json_provider import FastJSONProvider
+from models.serializers import Serializer
+
+CONDITIONAL_PATHS=('/tasks', '/tasks?limit=2', '/task/1', '/categories?include=tasks', '/category/1?include=tasks', '/recurrences')
+
+
+@pytest.fixture
+def serialized(monkeypatch):
+    #how many times a serializer or the JSON encoder built part of a body
+    calls=[0]
+    methods=[(Serializer, name) for name in ('__call__', 'many', 'from_row', 'from_rows')] + [(FastJSONProvider, 'dumps_bytes')]
+    for owner, name in methods:
+        original=getattr(owner, name)
+
+        def counted(self, *args, original=original, **kwargs):
+            calls[0]+=1
+            return original(self, *args, **kwargs)
+        monkeypatch.setattr(owner, name, counted)
+    return calls
+
+
+@pytest.mark.parametrize('path', CONDITIONAL_PATHS)
+def test_unchanged_refetch_is_304_without_query_or_serializer(client, user, statements, serialized, path):
+    response=client.get(path)
+    assert response.status_code==200
+    assert serialized[0] > 0
+    etag=response.headers['ETag']
+
+    #the identity is cached by now, so the version lookup is all that may run
+    statements.clear()
+    serialized[0]=0
+    response=client.get(path, headers={'If-None-Match':etag})
+    assert response.status_code==304
+    assert response.get_data()==b''
+    assert response.headers['ETag']==etag
+    assert len(statements)==1, statements
+    assert 'data_version' in statements[0] and 'tasks' not in statements[0]
+    assert serialized[0]==0
+
+
+def test_change_invalidates_etag(client, user):
+    etag=client.get('/tasks').headers['ETag']
+    assert client.patch('/task/1', json={'is_complete':True}).status_code==200
+    response=client.get('/tasks', headers={'If-None-Match':etag})
+    assert response.status_code==200
+    assert response.headers['ETag']!=etag
+    assert response.get_json()['tasks'][0]['is_complete'] is True
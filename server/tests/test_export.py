@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+
+
+def test_ndjson_export_streams_every_task(client, user):
+    client.patch('/task/2', json={'is_complete':True})
+    response=client.get('/tasks/export')
+    assert response.status_code==200
+    assert response.is_streamed
+    assert response.mimetype=='application/x-ndjson'
+    assert response.headers['Content-Disposition']=='attachment; filename=tasks.ndjson'
+    rows=[json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows]==[1, 2, 3, 4, 5]
+    assert rows[1]=={'id':2, 'task':'task 1', 'date':'2025-01-02', 'time':'10:00', 'category_id':1, 'category_name':'Work', 'is_complete':True}
+
+
+def test_csv_export_has_a_header_row(client, user):
+    response=client.get('/tasks/export?format=csv')
+    assert response.status_code==200
+    assert response.mimetype=='text/csv'
+    rows=list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows)==5
+    assert rows[0]=={'id':'1', 'task':'task 0', 'date':'2025-01-01', 'time':'10:00', 'category_id':'1', 'category_name':'Work', 'is_complete':'False'}
+
+
+def test_export_spans_several_chunks(client, user, monkeypatch):
+    monkeypatch.setattr('models.task.EXPORT_CHUNK_SIZE', 2)
+    chunks=list(client.get('/tasks/export').response)
+    assert len([chunk for chunk in chunks if chunk])==3
+    assert b''.join(chunks).count(b'\n')==5
+
+
+def test_export_only_includes_the_users_own_tasks(app, client, user):
+    from .conftest import sign_up
+    bob=app.test_client()
+    sign_up(bob, 'bob', 'bob@example.com')
+    assert bob.get('/tasks/export').get_data()==b''
+
+
+def test_export_round_trips_through_import(client, user):
+    exported=client.get('/tasks/export').get_data()
+    response=client.post('/tasks/import', data=exported, content_type='application/x-ndjson')
+    assert response.get_json()=={'imported':5, 'failed':0, 'errors':[]}
+    assert len(client.get('/tasks').get_json()['tasks'])==10
+
+
+def test_unknown_export_format_is_rejected(client, user):
+    response=client.get('/tasks/export?format=xml')
+    assert response.status_code==400
+    assert response.get_json()=={'error':'Unsupported export format "xml", use one of: ndjson, csv'}
@@ -0,0 +1,48 @@
+import time
+from sqlalchemy import text
+
+
+def test_authenticated_requests_skip_the_users_lookup(client, user, statements):
+    #login cached the profile
+    statements.clear()
+    assert client.get('/check_session').get_json()['name']=='alice'
+    assert statements==[]
+
+
+def test_profile_change_is_seen_at_once(client, user):
+    assert client.patch(f'/user/{user["id"]}', json={'name':'alice2'}).status_code==200
+    assert client.get('/check_session').get_json()['name']=='alice2'
+
+
+def test_deleted_user_is_unauthorized_at_once(client, user):
+    assert client.delete(f'/user/{user["id"]}').status_code==200
+    assert client.get('/check_session').status_code==401
+    assert client.get('/tasks').status_code==401
+
+
+def test_deleted_elsewhere_write_is_401_not_500(app, client, user):
+    # Another process deleted the user: this one still has the profile
+    # cached, the write notices when it bumps the data version.
+    from models import db
+    with app.app_context():
+        for statement in ('DELETE FROM tasks', 'DELETE FROM categories', 'DELETE FROM users'):
+            db.session.execute(text(statement))
+        db.session.commit()
+    for response in (
+        client.patch('/task/1', json={'is_complete':True}),
+        client.post('/tasks', json={'task':'a', 'date':'2025-01-01', 'time':'10:00', 'category_id':1}),
+    ):
+        assert response.status_code==401
+        assert response.get_json()=={'error':'Unauthorized'}
+
+
+def test_change_made_elsewhere_is_seen_after_the_ttl(app, client, user, monkeypatch):
+    from models import db
+    with app.app_context():
+        db.session.execute(text("UPDATE users SET name='renamed' WHERE id=:id"), {'id':user['id']})
+        db.session.commit()
+    assert client.get('/check_session').get_json()['name']=='alice'
+
+    now=time.monotonic()
+    monkeypatch.setattr('models.cache.time.monotonic', lambda: now + app.config['IDENTITY_CACHE_TTL'] + 1)
+    assert client.get('/check_session').get_json()['name']=='renamed'
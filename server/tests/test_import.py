@@ -0,0 +1,93 @@
+import io
+import json
+
+from .conftest import sign_up
+
+
+def ndjson(*items):
+    return ''.join(item if isinstance(item, str) else json.dumps(item) + '\n' for item in items)
+
+
+def import_ndjson(client, *items):
+    response=client.post('/tasks/import', data=ndjson(*items), content_type='application/x-ndjson')
+    assert response.status_code==200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def tasks(client):
+    return client.get('/tasks?limit=100').get_json()['tasks']
+
+
+def task_names(client):
+    return sorted(task['task'] for task in tasks(client))
+
+
+def test_duplicate_rows_are_both_imported(client, user):
+    row={'task':'same', 'date':'2025-02-01', 'time':'09:00', 'category_id':1}
+    assert import_ndjson(client, row, row)=={'imported':2, 'failed':0, 'errors':[]}
+    assert task_names(client).count('same')==2
+
+
+def test_bad_rows_are_reported_by_line_and_skipped(client, user, app):
+    other=app.test_client()
+    sign_up(other, 'bob', 'bob@example.com')
+    bobs_category=other.get('/categories').get_json()[0]['id']
+    result=import_ndjson(
+        client,
+        {'task':'good', 'date':'2025-02-01', 'time':'09:00', 'category_id':1},
+        'not json\n',
+        '\n',
+        {'task':'stranger', 'date':'2025-02-01', 'time':'09:00', 'category_id':bobs_category},
+        {'task':'missing', 'date':'2025-02-01', 'time':'09:00', 'category_id':999},
+        {'task':'unnamed', 'date':'2025-02-01', 'time':'09:00', 'category_name':7},
+    )
+    assert result=={'imported':1, 'failed':4, 'errors':[
+        {'line':2, 'error':'Invalid JSON'},
+        {'line':4, 'error':f'Category {bobs_category} does not exist or does not belong to you'},
+        {'line':5, 'error':'Category 999 does not exist or does not belong to you'},
+        {'line':6, 'error':'category_name must be a non-empty string'},
+    ]}
+    assert 'good' in task_names(client) and 'stranger' not in task_names(client)
+
+
+def test_category_names_reuse_or_create_categories(client, user):
+    result=import_ndjson(
+        client,
+        {'task':'a', 'date':'2025-02-01', 'time':'09:00', 'category_name':'Work'},
+        {'task':'b', 'date':'2025-02-01', 'time':'09:00', 'category_name':' Garden '},
+        {'task':'c', 'date':'2025-02-02', 'time':'09:00', 'category_name':'Garden'},
+    )
+    assert result['imported']==3
+    categories={category['name']:category['id'] for category in client.get('/categories').get_json()}
+    assert list(categories)==['Work', 'Personal', 'Shopping', 'Health', 'Garden']
+    by_name={task['task']:task['category_id'] for task in tasks(client)}
+    assert by_name['a']==categories['Work']
+    assert by_name['b']==by_name['c']==categories['Garden']
+
+
+def test_csv_upload(client, user):
+    body='task,date,time,category_id\ncsv one,2025-02-01,09:00,1\ncsv two,2025-02-31,09:00,1\n'
+    response=client.post(
+        '/tasks/import',
+        data={'file':(io.BytesIO(body.encode()), 'tasks.csv', 'text/csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code==200
+    result=response.get_json()
+    assert (result['imported'], result['failed'])==(1, 1)
+    #csv.DictReader counts the header, the bad row is line 3
+    assert [error['line'] for error in result['errors']]==[3]
+    assert 'csv one' in task_names(client)
+
+
+def test_unsupported_format_is_400(client, user):
+    response=client.post('/tasks/import?format=xml', data='<tasks/>', content_type='application/xml')
+    assert response.status_code==400
+    assert 'Unsupported import format "xml"' in response.get_json()['error']
+
+
+def test_non_utf8_upload_is_400(client, user):
+    response=client.post('/tasks/import', data='{"task":"caf\xe9"}\n'.encode('latin-1'), content_type='application/x-ndjson')
+    assert response.status_code==400
+    assert response.get_json()=={'error':'The upload must be UTF-8 encoded'}
+    assert len(tasks(client))==5
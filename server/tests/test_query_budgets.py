@@ -0,0 +1,84 @@
+import pytest
+
+# Every route with a representative request: method, path, JSON body (or
+# NDJSON text for imports) and the expected status. Ids refer to the rows
+# the world fixture creates.
+ROUTES=[
+    ('GET', '/tasks', None, 200),
+    ('GET', '/tasks?limit=2&category_id=1', None, 200),
+    ('POST', '/tasks', {'task':'new', 'date':'2025-02-01', 'time':'9:30', 'category_id':1}, 201),
+    ('GET', '/task/1', None, 200),
+    ('PATCH', '/task/1', {'is_complete':True, 'updated_category':2}, 200),
+    ('DELETE', '/task/1', None, 200),
+    ('POST', '/tasks/batch', {'tasks':[{'task':'a', 'date':'2025-01-01', 'time':'1', 'category_id':1}] * 3}, 200),
+    ('PATCH', '/tasks/batch', {'tasks':[{'id':1, 'is_complete':True}, {'id':2, 'task':'renamed'}]}, 200),
+    ('DELETE', '/tasks/batch', {'ids':[1, 2]}, 200),
+    ('GET', '/tasks/export', None, 200),
+    ('GET', '/tasks/export?format=csv', None, 200),
+    ('POST', '/tasks/import', '{"task":"i","date":"2025-01-01","time":"1","category_name":"New"}\n', 200),
+    ('GET', '/tasks/search?q=task', None, 200),
+    ('GET', '/tasks/stats', None, 200),
+    ('GET', '/categories', None, 200),
+    ('GET', '/categories?include=tasks', None, 200),
+    ('POST', '/categories', {'name':'Errands'}, 201),
+    ('GET', '/category/1?include=tasks', None, 200),
+    ('PATCH', '/category/1', {'updated_name':'Office'}, 200),
+    ('DELETE', '/category/1', None, 200),
+    ('GET', '/recurrences', None, 200),
+    ('POST', '/recurrences', {'task':'read', 'time':'21:00', 'category_id':2, 'frequency':'daily', 'starts_on':'2025-01-01'}, 201),
+    ('PATCH', '/recurrence/1', {'task':'gym!', 'until':'2025-03-01'}, 200),
+    ('DELETE', '/recurrence/1', None, 200),
+    ('GET', '/occurrences?date_from=2025-01-01&date_to=2025-01-31', None, 200),
+    ('POST', '/recurrence/1/occurrence/2025-01-13', {'is_complete':True}, 201),
+    ('GET', '/sync', None, 200),
+    ('GET', '/users', None, 200),
+    ('POST', '/users', {'name':'bobby', 'email':'bob@example.com', 'password':'password123'}, 201),
+    ('GET', '/user/1', None, 200),
+    ('PATCH', '/user/1', {'name':'alice2'}, 200),
+    ('PATCH', '/user/1', {'timezone':'Europe/Paris'}, 200),
+    ('DELETE', '/user/1', None, 200),
+    ('POST', '/login', {'email':'alice@example.com', 'password':'password123'}, 200),
+    ('GET', '/check_session', None, 200),
+    ('DELETE', '/logout', None, 204),
+    ('GET', '/metrics', None, 200),
+    ('GET', '/metrics/cache', None, 200),
+    ('GET', '/metrics/hashing', None, 200),
+]
+
+
+@pytest.fixture
+def world(client, user):
+    response=client.post('/recurrences', json={
+        'task':'gym', 'time':'7:00', 'category_id':1, 'frequency':'weekly', 'starts_on':'2025-01-06', 'count':10
+    })
+    assert response.status_code==201, response.get_data(as_text=True)
+    return user
+
+
+def test_every_route_is_listed(app):
+    adapter=app.url_map.bind('localhost')
+    listed={(adapter.match(path.split('?')[0], method)[0], method) for method, path, _, _ in ROUTES}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint=='static':
+            continue
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            assert (rule.endpoint, method) in listed, f'{method} {rule.rule} has no query budget test'
+
+
+@pytest.mark.parametrize('method,path,body,status', ROUTES, ids=[f'{m} {p}' for m, p, _, _ in ROUTES])
+def test_route_stays_within_query_budget(app, client, world, monkeypatch, caplog, method, path, body, status):
+    # QueryBudgetExceeded turns an over-budget request or a repeated
+    # statement into a 500; a streamed response is checked once its body has
+    # been sent and can only log. The identity cache is emptied first so the
+    # request pays for loading the signed-in user, the uncached worst case.
+    from models.identity import identity_cache
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET_MODE', 'raise')
+    identity_cache.clear()
+    if isinstance(body, str):
+        response=client.open(path, method=method, data=body, content_type='application/x-ndjson')
+    else:
+        response=client.open(path, method=method, json=body)
+    data=response.get_data(as_text=True)
+    response.close()
+    assert response.status_code==status, data
+    assert not [record.getMessage() for record in caplog.records if record.name==app.logger.name]
@@ -0,0 +1,63 @@
+import pytest
+
+#route class -> a request that counts against it
+ROUTE_CLASSES=[
+    ('auth', 'POST', '/login', {'email':'alice@example.com', 'password':'wrong'}),
+    ('auth', 'POST', '/users', {'name':'bobby', 'email':'bob@example.com', 'password':'password123'}),
+    ('read', 'GET', '/tasks', None),
+    ('read', 'GET', '/categories', None),
+    ('write', 'POST', '/tasks', {'task':'new', 'date':'2025-02-01', 'time':'9:30', 'category_id':1}),
+    ('write', 'PATCH', '/task/1', {'is_complete':True}),
+]
+
+
+@pytest.mark.parametrize('route_class,method,path,body', ROUTE_CLASSES, ids=[f'{c} {m} {p}' for c, m, p, _ in ROUTE_CLASSES])
+def test_over_the_limit_is_429_with_retry_after(app, client, limited, monkeypatch, route_class, method, path, body):
+    monkeypatch.setitem(app.config, f'RATELIMIT_{route_class.upper()}', '2/minute')
+    for _ in range(2):
+        assert client.open(path, method=method, json=body).status_code!=429
+    response=client.open(path, method=method, json=body)
+    assert response.status_code==429
+    assert int(response.headers['Retry-After']) > 0
+    assert response.get_json()=={'error':'Too many requests, the limit is 2 per 1 minute'}
+
+
+def test_route_classes_have_separate_buckets(app, client, limited, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_WRITE', '1/minute')
+    assert client.post('/tasks', json={'task':'new', 'date':'2025-02-01', 'time':'9:30', 'category_id':1}).status_code==201
+    assert client.patch('/task/1', json={'is_complete':True}).status_code==429
+    #reads have a bucket of their own
+    assert client.get('/tasks').status_code==200
+
+
+@pytest.mark.parametrize('path,body', [
+    ('/login', {'email':'alice@example.com', 'password':'password123'}),
+    ('/users', {'name':'bobby', 'email':'bob@example.com', 'password':'password123'}),
+])
+def test_busy_hasher_is_503_json_with_retry_after(client, user, path, body):
+    from models.passwords import password_hasher
+    #take every slot, as a burst of in-flight hashes would
+    taken=0
+    while password_hasher._slots.acquire(blocking=False):
+        taken+=1
+    try:
+        response=client.post(path, json=body)
+    finally:
+        for _ in range(taken):
+            password_hasher._slots.release()
+    assert response.status_code==503
+    assert response.headers['Retry-After']=='1'
+    assert response.content_type=='application/json'
+    assert response.get_json()=={'error':'Too many password operations in progress, please retry shortly'}
+
+
+def test_clients_behind_the_proxy_have_separate_auth_buckets(app, client, limited, monkeypatch):
+    #TRUSTED_PROXIES=1, as deployed: the address the proxy appended is the client
+    monkeypatch.setitem(app.config, 'RATELIMIT_AUTH', '2/minute')
+    body={'email':'alice@example.com', 'password':'wrong'}
+    for _ in range(2):
+        assert client.post('/login', json=body, headers={'X-Forwarded-For':'203.0.113.1'}).status_code==401
+    assert client.post('/login', json=body, headers={'X-Forwarded-For':'203.0.113.1'}).status_code==429
+    assert client.post('/login', json=body, headers={'X-Forwarded-For':'203.0.113.2'}).status_code==401
+    #a client cannot pick its bucket by sending the header itself
+    assert client.post('/login', json=body, headers={'X-Forwarded-For':'198.51.100.7, 203.0.113.1'}).status_code==429
@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def rule(client, user):
+    response=client.post('/recurrences', json={
+        'task':'gym', 'time':'7:00', 'category_id':1, 'frequency':'weekly', 'starts_on':'2025-01-06', 'count':10
+    })
+    assert response.status_code==201, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_materialized_occurrence_uses_task_formats(client, rule):
+    response=client.post(f'/recurrence/{rule["id"]}/occurrence/2025-01-13', json={'is_complete':True})
+    assert response.status_code==201
+    body=response.get_json()
+    assert body['date']=='2025-01-13'
+    assert body['occurrence_date']=='2025-01-13'
+    assert body['due_at']=='2025-01-13 07:00:00'
+    task=client.get('/tasks').get_json()['tasks'][-1]
+    assert {key:task[key] for key in ('id', 'date', 'occurrence_date', 'due_at')}=={key:body[key] for key in ('id', 'date', 'occurrence_date', 'due_at')}
+
+    response=client.post(f'/recurrence/{rule["id"]}/occurrence/2025-01-13', json={})
+    assert response.status_code==409
+
+
+def test_until_replaces_count(client, rule):
+    assert rule['count']==10
+    response=client.patch(f'/recurrence/{rule["id"]}', json={'until':'2025-02-01'})
+    assert response.status_code==200
+    updated=client.get('/recurrences').get_json()[0]
+    assert updated['ends_on']=='2025-02-01'
+    assert updated['count'] is None
+
+
+def test_until_before_starts_on_is_rejected(app, client, rule, monkeypatch):
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET_MODE', 'raise')
+    response=client.patch(f'/recurrence/{rule["id"]}', json={'until':'2025-01-01'})
+    assert response.status_code==400
+    assert response.get_json()=={'error':'until cannot be before starts_on'}
+    assert client.get('/recurrences').get_json()[0]['ends_on']==rule['ends_on']
+
+    response=client.patch('/recurrence/999', json={'until':'2025-01-01'})
+    assert response.status_code==404
+
+
+def test_occurrences_are_due_in_the_owner_timezone(client, rule, user):
+    assert client.patch(f'/user/{user["id"]}', json={'timezone':'Asia/Tokyo'}).status_code==200
+    response=client.get('/occurrences?date_from=2025-01-06&date_to=2025-01-13')
+    assert [occurrence['due_at'] for occurrence in response.get_json()['occurrences']]==['2025-01-05 22:00:00', '2025-01-12 22:00:00']
+    response=client.post(f'/recurrence/{rule["id"]}/occurrence/2025-01-13', json={})
+    assert response.get_json()['due_at']=='2025-01-12 22:00:00'
+
+
+@pytest.mark.parametrize('interval,count,error', [
+    (1000000000, 3, 'Interval must be between 1 and 1000'),
+    (-1, 3, 'Interval must be between 1 and 1000'),
+    (1000, 10000, 'The last occurrence would be after the year 9999, use a lower count or interval'),
+])
+def test_interval_out_of_range_is_rejected(client, user, interval, count, error):
+    for frequency in ('daily', 'monthly'):
+        response=client.post('/recurrences', json={
+            'task':'gym', 'time':'7:00', 'category_id':1, 'frequency':frequency, 'starts_on':'2025-01-06', 'interval':interval, 'count':count
+        })
+        assert response.status_code==400
+        assert response.get_json()=={'error':error}
+
+
+def test_expansion_stops_at_the_last_representable_date(client, user):
+    response=client.post('/recurrences', json={
+        'task':'far', 'time':'7:00', 'category_id':1, 'frequency':'monthly', 'starts_on':'9999-01-01', 'interval':1000
+    })
+    assert response.status_code==201
+    response=client.get('/occurrences?date_from=9999-01-01&date_to=9999-12-31')
+    assert response.status_code==200
+    assert [occurrence['date'] for occurrence in response.get_json()['occurrences']]==['9999-01-01']
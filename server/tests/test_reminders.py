@@ -0,0 +1,78 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from models.reminders import ReminderScheduler
+
+HORIZON=timedelta(hours=1)
+
+
+@pytest.fixture
+def scheduler(app):
+    #a scheduler of its own, driven step by step with explicit times
+    scheduler=ReminderScheduler(app)
+    scheduler.reminders=[]
+    scheduler.hook(scheduler.reminders.append)
+    return scheduler
+
+
+def add_task(client, due, name='call'):
+    response=client.post('/tasks', json={
+        'task':name, 'date':due.date().isoformat(), 'time':due.strftime('%H:%M:%S'), 'category_id':1
+    })
+    assert response.status_code==201, response.get_data(as_text=True)
+    return response.get_json()['id']
+
+
+def test_web_app_starts_no_scheduler(app):
+    from models.reminders import reminder_scheduler
+    assert reminder_scheduler.stats()['running'] is False
+    assert not [thread for thread in threading.enumerate() if 'reminder' in thread.name]
+    assert 'run-reminders' in app.cli.commands
+
+
+def test_due_task_fires_once(app, client, user, scheduler):
+    now=datetime.utcnow().replace(microsecond=0)
+    task_id=add_task(client, now + timedelta(minutes=30))
+    with app.app_context():
+        scheduler._load_window(now, now + HORIZON)
+        scheduler._fire(now + timedelta(minutes=29))
+        assert scheduler.reminders==[]
+        scheduler._fire(now + timedelta(minutes=31))
+        scheduler._fire(now + timedelta(minutes=32))
+    assert [reminder.task_id for reminder in scheduler.reminders]==[task_id]
+
+
+def test_changes_are_picked_up_by_polling(app, client, user, scheduler):
+    now=datetime.utcnow().replace(microsecond=0)
+    completed=add_task(client, now + timedelta(minutes=10), 'completed')
+    moved=add_task(client, now + timedelta(minutes=20), 'moved')
+    with app.app_context():
+        scheduler._load_window(now, now + HORIZON)
+        assert scheduler.stats()['scheduled']==2
+
+    #changes made through the API, as another process would
+    added=add_task(client, now + timedelta(minutes=30), 'added')
+    assert client.patch(f'/task/{completed}', json={'is_complete':True}).status_code==200
+    later=now + timedelta(minutes=50)
+    assert client.patch(f'/task/{moved}', json={'updated_date':later.date().isoformat(), 'updated_time':later.strftime('%H:%M:%S')}).status_code==200
+
+    with app.app_context():
+        scheduler._poll(now + timedelta(seconds=10))
+        assert scheduler.stats()['refreshes']==1
+        #the same change is not reloaded again while it is inside the overlap
+        scheduler._poll(now + timedelta(seconds=20))
+        assert scheduler.stats()['refreshes']==1
+        scheduler._fire(now + timedelta(hours=1))
+    assert [reminder.task_id for reminder in scheduler.reminders]==[added, moved]
+
+
+def test_task_changed_after_the_last_poll_does_not_fire(app, client, user, scheduler):
+    now=datetime.utcnow().replace(microsecond=0)
+    task_id=add_task(client, now + timedelta(minutes=10))
+    with app.app_context():
+        scheduler._load_window(now, now + HORIZON)
+    assert client.delete(f'/task/{task_id}').status_code==200
+    with app.app_context():
+        scheduler._fire(now + timedelta(minutes=11))
+    assert scheduler.reminders==[]
+    assert scheduler.stats()['scheduled']==0
@@ -0,0 +1,56 @@
+import pytest
+from models.cache import CacheBackend
+from models.response_cache import ResponseCache, response_cache
+
+
+class DictBackend(CacheBackend):
+    #a stand-in shared store: no expiry, records what was written
+    def __init__(self):
+        self.entries={}
+        self.sets=0
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.sets+=1
+        self.entries[key]=value
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+@pytest.fixture
+def backend(app):
+    original=response_cache.backend
+    backend=DictBackend()
+    response_cache.init_app(app, backend)
+    yield backend
+    response_cache.backend=original
+
+
+def test_injected_backend_serves_the_cached_response(client, user, backend, statements):
+    body=client.get('/tasks').get_data()
+    assert any(key.startswith('response:') for key in backend.entries)
+
+    statements.clear()
+    response=client.get('/tasks')
+    assert response.get_data()==body
+    #the version lookup only, the body came from the backend
+    assert len(statements)==1, statements
+
+
+def test_write_invalidates_through_the_backend(client, user, backend):
+    client.get('/tasks')
+    generations={key:value for key, value in backend.entries.items() if key.startswith('generation:')}
+    assert client.patch('/task/1', json={'is_complete':True}).status_code==200
+    assert all(backend.entries[key]!=value for key, value in generations.items())
+    assert client.get('/tasks').get_json()['tasks'][0]['is_complete'] is True
+
+
+def test_backend_must_implement_the_interface(app):
+    with pytest.raises(TypeError):
+        ResponseCache().init_app(app, {})
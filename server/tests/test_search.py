@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def tasks(client, user):
+    response=client.post('/tasks/batch', json={'tasks':[
+        {'task':'pay the invoice', 'date':'2025-03-01', 'time':'9:00', 'category_id':1},
+        {'task':'invoice invoice invoice reminder', 'date':'2025-03-02', 'time':'9:00', 'category_id':1},
+        {'task':'review the quarterly report', 'date':'2025-03-03', 'time':'9:00', 'category_id':1},
+        {'task':'invoices for the quarterly review', 'date':'2025-03-04', 'time':'9:00', 'category_id':1},
+    ]})
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def search(client, q, **params):
+    response=client.get('/tasks/search', query_string={'q':q, **params})
+    assert response.status_code==200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_results_are_ranked_by_relevance(client, tasks):
+    #the task that mentions the word most ranks first; the last word is also a prefix
+    assert [task['id'] for task in search(client, 'invoice')['tasks']]==[tasks[1], tasks[0], tasks[3]]
+
+
+def test_every_word_must_match(client, tasks):
+    assert [task['id'] for task in search(client, 'quarterly review')['tasks']]==[tasks[2], tasks[3]]
+    assert [task['id'] for task in search(client, 'pay review')['tasks']]==[]
+
+
+def test_prefix_of_the_last_word(client, tasks):
+    assert {task['id'] for task in search(client, 'quart')['tasks']}=={tasks[2], tasks[3]}
+
+
+def test_search_syntax_in_the_query_is_treated_as_words(client, tasks):
+    assert [task['id'] for task in search(client, 'pay" OR task:*')['tasks']]==[]
+    assert [task['id'] for task in search(client, 'invoice NOT pay')['tasks']]==[]
+
+
+def test_other_users_tasks_are_not_found(app, client, tasks):
+    from .conftest import sign_up
+    bob=app.test_client()
+    sign_up(bob, 'bob', 'bob@example.com')
+    assert search(bob, 'invoice')['tasks']==[]
+
+
+def test_edits_and_deletes_update_the_index(client, tasks):
+    client.patch(f'/task/{tasks[0]}', json={'updated_task':'pay the rent'})
+    client.delete(f'/task/{tasks[1]}')
+    assert [task['id'] for task in search(client, 'invoice')['tasks']]==[tasks[3]]
+    assert [task['id'] for task in search(client, 'rent')['tasks']]==[tasks[0]]
+
+
+def test_pages_with_next_offset(client, tasks):
+    first=search(client, 'invoice', limit=2)
+    assert len(first['tasks'])==2 and first['next_offset']==2
+    second=search(client, 'invoice', limit=2, offset=2)
+    assert [task['id'] for task in second['tasks']]==[tasks[3]] and second['next_offset'] is None
+
+
+@pytest.mark.parametrize('q', ['', '   ', '!!'])
+def test_nothing_searchable_is_rejected(client, user, q):
+    response=client.get('/tasks/search', query_string={'q':q})
+    assert response.status_code==400
+    assert response.get_json()=={'error':'Provide a search query with q'}
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def mixed(client, user):
+    #tasks 1-5 on 2025-01-01..05 in Work; two more in Personal, one of them done
+    client.patch('/task/1', json={'is_complete':True})
+    client.patch('/task/2', json={'is_complete':True})
+    client.post('/tasks/batch', json={'tasks':[
+        {'task':'p', 'date':'2025-02-10', 'time':'9:00', 'category_id':2, 'is_complete':True},
+        {'task':'q', 'date':'2025-02-11', 'time':'9:00', 'category_id':2},
+    ]})
+
+
+def test_totals_and_categories(client, mixed):
+    response=client.get('/tasks/stats')
+    assert response.status_code==200
+    body=response.get_json()
+    assert {key:body[key] for key in ('total', 'completed', 'percentage', 'bucket')}=={'total':7, 'completed':3, 'percentage':42.9, 'bucket':'day'}
+    categories={category['name']:category for category in body['categories']}
+    assert categories['Work']=={'category_id':1, 'name':'Work', 'total':5, 'completed':2, 'percentage':40.0}
+    assert categories['Personal']['total']==2 and categories['Personal']['completed']==1
+    #empty categories are listed too
+    assert categories['Health']=={'category_id':4, 'name':'Health', 'total':0, 'completed':0, 'percentage':0}
+
+
+@pytest.mark.parametrize('bucket,expected', [
+    ('day', [('2025-01-01', 1, 1), ('2025-01-02', 1, 1), ('2025-01-03', 1, 0), ('2025-01-04', 1, 0), ('2025-01-05', 1, 0), ('2025-02-10', 1, 1), ('2025-02-11', 1, 0)]),
+    ('week', [('2025-W01', 5, 2), ('2025-W07', 2, 1)]),
+    ('month', [('2025-01', 5, 2), ('2025-02', 2, 1)]),
+])
+def test_date_buckets(client, mixed, bucket, expected):
+    dates=client.get(f'/tasks/stats?bucket={bucket}').get_json()['dates']
+    assert [(entry['bucket'], entry['total'], entry['completed']) for entry in dates]==expected
+
+
+def test_cached_stats_follow_writes(client, mixed, statements):
+    client.get('/tasks/stats')
+    statements.clear()
+    assert client.get('/tasks/stats').get_json()['completed']==3
+    #only the data version lookup, the aggregates come from the cache
+    assert len(statements)==1, statements
+
+    client.patch('/task/3', json={'is_complete':True})
+    assert client.get('/tasks/stats').get_json()['completed']==4
+
+
+def test_unknown_bucket_is_rejected(client, user):
+    response=client.get('/tasks/stats?bucket=year')
+    assert response.status_code==400
+    assert response.get_json()=={'error':'Unsupported bucket "year", use one of: day, week, month'}
@@ -0,0 +1,87 @@
+import time
+import pytest
+from models.pagination import encode_sync_cursor
+
+
+def sync(client, since=None):
+    response=client.get('/sync', query_string={'since':since} if since else None)
+    assert response.status_code==200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_first_sync_asks_for_a_reset(client, user):
+    body=sync(client)
+    assert body['reset'] is True
+    assert body['tasks']==[] and body['cursor']
+
+
+def test_nothing_changed_returns_nothing(client, user):
+    cursor=sync(client)['cursor']
+    body=sync(client, cursor)
+    assert body['reset'] is False
+    assert body['tasks']==body['categories']==body['recurrences']==[]
+    assert body['deleted']=={'tasks':[], 'categories':[], 'recurrences':[]}
+    assert body['cursor']==cursor
+
+
+def test_changes_after_the_cursor(client, user):
+    cursor=sync(client)['cursor']
+    client.patch('/task/2', json={'is_complete':True})
+    new_id=client.post('/tasks', json={'task':'new', 'date':'2025-02-01', 'time':'9:00', 'category_id':1}).get_json()['id']
+    client.delete('/task/3')
+    client.patch('/category/2', json={'updated_name':'Home'})
+
+    body=sync(client, cursor)
+    assert body['reset'] is False
+    assert sorted(task['id'] for task in body['tasks'])==[2, new_id]
+    assert [category['name'] for category in body['categories']]==['Home']
+    assert body['deleted']=={'tasks':[3], 'categories':[], 'recurrences':[]}
+
+    #the returned cursor only sees what comes after it
+    body=sync(client, body['cursor'])
+    assert body['tasks']==[] and body['deleted']['tasks']==[]
+
+
+def test_deleted_category_tombstones_its_tasks_and_rules(client, user):
+    rule=client.post('/recurrences', json={'task':'gym', 'time':'7:00', 'category_id':1, 'frequency':'daily', 'starts_on':'2025-01-06'}).get_json()
+    cursor=sync(client)['cursor']
+    assert client.delete('/category/1').status_code==200
+    deleted=sync(client, cursor)['deleted']
+    assert sorted(deleted['tasks'])==[1, 2, 3, 4, 5]
+    assert deleted['categories']==[1]
+    assert deleted['recurrences']==[rule['id']]
+
+
+def test_batch_changes_share_one_version(client, user):
+    cursor=sync(client)['cursor']
+    client.patch('/tasks/batch', json={'tasks':[{'id':1, 'is_complete':True}, {'id':4, 'is_complete':True}]})
+    client.delete('/tasks/batch', json={'ids':[2, 5]})
+    body=sync(client, cursor)
+    assert sorted(task['id'] for task in body['tasks'])==[1, 4]
+    assert sorted(body['deleted']['tasks'])==[2, 5]
+
+
+def test_other_users_changes_are_not_included(app, client, user):
+    from .conftest import sign_up
+    cursor=sync(client)['cursor']
+    bob=app.test_client()
+    sign_up(bob, 'bob', 'bob@example.com')
+    category_id=bob.get('/categories').get_json()[0]['id']
+    assert bob.post('/tasks', json={'task':'bob', 'date':'2025-02-01', 'time':'9:00', 'category_id':category_id}).status_code==201
+    assert sync(client, cursor)['tasks']==[]
+
+
+@pytest.mark.parametrize('cursor', [
+    encode_sync_cursor(1, time.time() - 31 * 86400),  # older than the tombstone retention
+    encode_sync_cursor(10**6, time.time()),  # ahead of the data, e.g. from another database
+])
+def test_stale_or_foreign_cursor_asks_for_a_reset(client, user, cursor):
+    body=sync(client, cursor)
+    assert body['reset'] is True
+    assert body['tasks']==[]
+
+
+def test_invalid_cursor_is_rejected(client, user):
+    response=client.get('/sync?since=garbage')
+    assert response.status_code==400
+    assert response.get_json()=={'error':'Invalid cursor'}
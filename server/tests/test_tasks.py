@@ -0,0 +1,87 @@
+import pytest
+from .conftest import sign_up
+
+TIME_ERROR='Time must be a string, e.g. "14:30" or "after lunch"'
+
+
+@pytest.mark.parametrize('time', [10, 7.5, True, ['10:00'], {'h':10}])
+def test_non_string_time_is_rejected(client, user, time):
+    response=client.post('/tasks', json={'task':'a', 'date':'2025-01-01', 'time':time, 'category_id':1})
+    assert response.status_code==400
+    assert response.get_json()=={'error':TIME_ERROR}
+
+    response=client.patch('/task/1', json={'updated_time':time})
+    assert response.status_code==400
+
+    response=client.post('/tasks/batch', json={'tasks':[
+        {'task':'a', 'date':'2025-01-01', 'time':time, 'category_id':1},
+        {'task':'b', 'date':'2025-01-01', 'time':'10:00', 'category_id':1},
+    ]})
+    assert [result['status'] for result in response.get_json()['results']]==[400, 201]
+
+    response=client.patch('/tasks/batch', json={'tasks':[{'id':1, 'time':time}]})
+    assert response.get_json()['results'][0]=={'index':0, 'status':400, 'error':TIME_ERROR}
+
+
+def test_import_reports_non_string_time_per_row(client, user):
+    body='{"task":"i","date":"2025-01-01","time":7,"category_name":"Work"}\n{"task":"j","date":"2025-01-01","time":"7 pm","category_name":"Work"}\n'
+    response=client.post('/tasks/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code==200
+    assert response.get_json()=={'imported':1, 'failed':1, 'errors':[{'line':1, 'error':TIME_ERROR}]}
+
+
+def test_due_at_is_utc_from_the_owner_timezone(client):
+    response=client.post('/users', json={'name':'paris', 'email':'paris@example.com', 'password':'password123', 'timezone':'Europe/Paris'})
+    assert response.get_json()['timezone']=='Europe/Paris'
+    client.post('/login', json={'email':'paris@example.com', 'password':'password123'})
+    response=client.post('/tasks', json={'task':'standup', 'date':'2025-07-01', 'time':'9:00', 'category_id':1})
+    assert response.get_json()['due_at']=='2025-07-01 07:00:00'
+    response=client.post('/tasks/batch', json={'tasks':[{'task':'lunch', 'date':'2025-01-15', 'time':'12:30', 'category_id':1}]})
+    assert client.get(f'/task/{response.get_json()["results"][0]["id"]}').status_code==200
+    assert [task['due_at'] for task in client.get('/tasks').get_json()['tasks']]==['2025-01-15 11:30:00', '2025-07-01 07:00:00']
+
+
+def test_timezone_change_moves_every_due_at(client, user):
+    etag=client.get('/tasks').headers['ETag']
+    response=client.patch(f'/user/{user["id"]}', json={'timezone':'America/New_York'})
+    assert response.status_code==200
+    response=client.get('/tasks', headers={'If-None-Match':etag})
+    assert response.status_code==200
+    assert response.get_json()['tasks'][0]['due_at']=='2025-01-01 15:00:00'
+    assert client.get('/check_session').get_json()['timezone']=='America/New_York'
+
+    #a one-sided edit is combined with the stored date or time in the new timezone
+    client.patch('/task/1', json={'updated_time':'8:00'})
+    assert client.get('/tasks').get_json()['tasks'][0]['due_at']=='2025-01-01 13:00:00'
+
+
+@pytest.mark.parametrize('timezone', ['Mars/Olympus', '', 5])
+def test_unknown_timezone_is_rejected(client, user, timezone):
+    response=client.patch(f'/user/{user["id"]}', json={'timezone':timezone})
+    assert response.status_code==400
+    response=client.post('/users', json={'name':'bobby', 'email':'bob@example.com', 'password':'password123', 'timezone':timezone})
+    assert response.status_code==400
+
+
+@pytest.mark.parametrize('owner', ['nobody', 'bob'])
+def test_create_rejects_a_category_the_user_does_not_own(client, user, owner):
+    bob=client.application.test_client()
+    sign_up(bob, 'bob', 'bob@example.com')
+    category_id=bob.get('/categories').get_json()[0]['id'] if owner=='bob' else 999
+    response=client.post('/tasks', json={'task':'a', 'date':'2025-01-01', 'time':'10:00', 'category_id':category_id})
+    assert response.status_code==400
+    assert response.get_json()=={'error':f'Category {category_id} does not exist or does not belong to you'}
+    assert len(client.get('/tasks').get_json()['tasks'])==5
+
+
+@pytest.mark.parametrize('date,error', [
+    (None, 'Date is required'),
+    ('01/02/2025', "Invalid isoformat string: '01/02/2025'"),
+    (20250102, 'Date must be a string in YYYY-MM-DD format'),
+])
+def test_create_rejects_a_bad_date_like_a_batch_item(client, user, date, error):
+    item={'task':'a', 'date':date, 'time':'10:00', 'category_id':1}
+    response=client.post('/tasks', json=item)
+    assert response.status_code==400
+    batch=client.post('/tasks/batch', json={'tasks':[item]}).get_json()['results'][0]
+    assert response.get_json()['error']==batch['error']==error
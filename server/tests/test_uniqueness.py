@@ -0,0 +1,57 @@
+import pytest
+
+from .conftest import sign_up, PASSWORD
+
+DUPLICATE_CATEGORY={'error':'You already have a category with this name'}
+
+
+def test_duplicate_signup_is_409(client):
+    sign_up(client)
+    response=client.post('/users', json={'name':'other', 'email':'alice@example.com', 'password':PASSWORD})
+    assert response.status_code==409
+    assert response.get_json()=={'msg':'User already exists'}
+    #the first account is untouched and the failed signup left no categories behind
+    assert client.post('/login', json={'email':'alice@example.com', 'password':PASSWORD}).status_code==200
+    assert [category['name'] for category in client.get('/categories').get_json()]==['Work', 'Personal', 'Shopping', 'Health']
+
+
+def test_duplicate_category_is_409(client):
+    sign_up(client)
+    response=client.post('/categories', json={'name':'Work'})
+    assert response.status_code==409
+    assert response.get_json()==DUPLICATE_CATEGORY
+    #the session is still usable after the conflict
+    assert client.post('/categories', json={'name':'Home'}).status_code==201
+
+
+def test_renaming_onto_an_existing_category_is_409(client):
+    sign_up(client)
+    categories={category['name']:category['id'] for category in client.get('/categories').get_json()}
+    response=client.patch(f"/category/{categories['Personal']}", json={'updated_name':'Work'})
+    assert response.status_code==409
+    assert response.get_json()==DUPLICATE_CATEGORY
+    assert client.get(f"/category/{categories['Personal']}").get_json()['name']=='Personal'
+
+
+def test_category_names_are_unique_per_user(client, app):
+    sign_up(client)
+    other=app.test_client()
+    sign_up(other, 'bob', 'bob@example.com')
+    assert client.post('/categories', json={'name':'Home'}).status_code==201
+    assert other.post('/categories', json={'name':'Home'}).status_code==201
+
+
+@pytest.fixture
+def no_on_conflict(monkeypatch):
+    #as on a dialect without ON CONFLICT DO NOTHING, the savepoint fallback
+    monkeypatch.setattr('models.conflicts.CONFLICT_INSERTS', {})
+
+
+def test_duplicates_without_on_conflict_are_409(client, no_on_conflict):
+    sign_up(client)
+    response=client.post('/categories', json={'name':'Work'})
+    assert response.status_code==409
+    assert response.get_json()==DUPLICATE_CATEGORY
+    assert client.post('/categories', json={'name':'Home'}).status_code==201
+    response=client.post('/users', json={'name':'other', 'email':'alice@example.com', 'password':PASSWORD})
+    assert response.status_code==409